@@ -0,0 +1,44 @@
+"""coin_ledger journal and coin_balances snapshot
+
+Revision ID: 20261017_0002
+Revises: 20251014_0001, 20251014_add_tree_fields_and_check
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0002"
+down_revision = ("20251014_0001", "20251014_add_tree_fields_and_check")
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("coin_ledger"):
+        op.create_table(
+            "coin_ledger",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("delta", sa.Integer(), nullable=False),
+            sa.Column("reason", sa.String(length=50), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_coin_ledger_user_id_id", "coin_ledger", ["user_id", "id"])
+        op.create_index("ix_coin_ledger_created_at", "coin_ledger", ["created_at"])
+
+    if not inspector.has_table("coin_balances"):
+        op.create_table(
+            "coin_balances",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("balance", sa.Integer(), nullable=False),
+            sa.Column("last_entry_id", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+        op.create_index("ix_coin_balances_last_entry_id", "coin_balances", ["last_entry_id"])
+
+def downgrade():
+    op.drop_table("coin_balances")
+    op.drop_table("coin_ledger")
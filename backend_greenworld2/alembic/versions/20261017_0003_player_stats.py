@@ -0,0 +1,37 @@
+"""player_stats aggregates for the leaderboard
+
+Revision ID: 20261017_0003
+Revises: 20261017_0002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0003"
+down_revision = "20261017_0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("player_stats"):
+        op.create_table(
+            "player_stats",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("total_score", sa.Integer(), nullable=False),
+            sa.Column("games_played", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        )
+        op.create_index("ix_player_stats_updated_at", "player_stats", ["updated_at"])
+
+        # однократный перенос уже записанных результатов
+        op.execute(
+            "INSERT INTO player_stats (user_id, total_score, games_played) "
+            "SELECT user_id, COALESCE(SUM(score), 0), COUNT(*) FROM games_result GROUP BY user_id"
+        )
+
+def downgrade():
+    op.drop_table("player_stats")
@@ -0,0 +1,29 @@
+"""games_result.ingest_id for idempotent batched ingestion
+
+Revision ID: 20261017_0004
+Revises: 20261017_0003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0004"
+down_revision = "20261017_0003"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("games_result")}
+
+    if "ingest_id" not in columns:
+        with op.batch_alter_table("games_result") as batch:
+            batch.add_column(sa.Column("ingest_id", sa.String(length=36), nullable=True))
+        op.create_index("ix_games_result_ingest_id", "games_result", ["ingest_id"], unique=True)
+
+def downgrade():
+    op.drop_index("ix_games_result_ingest_id", table_name="games_result")
+    with op.batch_alter_table("games_result") as batch:
+        batch.drop_column("ingest_id")
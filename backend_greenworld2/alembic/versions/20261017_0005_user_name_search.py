@@ -0,0 +1,56 @@
+"""substring search index on users.full_name (pg_trgm GIN / SQLite FTS5 trigram)
+
+Revision ID: 20261017_0005
+Revises: 20261017_0004
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0005"
+down_revision = "20261017_0004"
+branch_labels = None
+depends_on = None
+
+# Снимок DDL на момент этой ревизии: миграция не должна меняться вслед за приложением.
+# Новая схема индекса - новая миграция; app/user_search.py создает индекс только
+# для баз без Alembic (create_all) и держит актуальную версию.
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "full_name, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF full_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name); "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); END",
+]
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # CONCURRENTLY не блокирует запись в users; требует выполнения вне транзакции
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_full_name_trgm "
+                "ON users USING gin (full_name gin_trgm_ops)"
+            )
+    elif dialect == "sqlite":
+        for ddl in SQLITE_FTS_DDL:
+            op.execute(ddl)
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_full_name_trgm")
+    elif dialect == "sqlite":
+        for name in ("users_fts_ai", "users_fts_ad", "users_fts_au"):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS users_fts")
@@ -0,0 +1,39 @@
+"""trees.is_ready and partial index on pending next_upgrade_at for the growth scheduler
+
+Revision ID: 20261017_0006
+Revises: 20261017_0005
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0006"
+down_revision = "20261017_0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("trees")}
+
+    if "is_ready" not in columns:
+        with op.batch_alter_table("trees") as batch:
+            batch.add_column(sa.Column("is_ready", sa.Boolean(), nullable=False, server_default=sa.false()))
+        # уже созревшие деревья не должны разом получить уведомления после миграции
+        op.execute(sa.text("UPDATE trees SET is_ready = :ready WHERE next_upgrade_at <= CURRENT_TIMESTAMP")
+                   .bindparams(ready=True))
+
+    # предикат - то же выражение, что в запросах планировщика (is_ready = false / is_ready = 0),
+    # иначе SQLite не сопоставит частичный индекс с WHERE
+    pending = sa.column("is_ready", sa.Boolean()) == sa.false()
+    op.create_index(
+        "ix_trees_growth_due", "trees", ["next_upgrade_at"],
+        postgresql_where=pending, sqlite_where=pending,
+    )
+
+def downgrade():
+    op.drop_index("ix_trees_growth_due", table_name="trees")
+    with op.batch_alter_table("trees") as batch:
+        batch.drop_column("is_ready")
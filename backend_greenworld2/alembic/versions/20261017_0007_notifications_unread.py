@@ -0,0 +1,39 @@
+"""partial index for the unread notification feed
+
+Revision ID: 20261017_0007
+Revises: 20261017_0006
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0007"
+down_revision = "20261017_0006"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        # CONCURRENTLY не блокирует запись уведомлений; требует выполнения вне транзакции
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_notifications_unread "
+                "ON notifications (user_id, id) WHERE is_read = false"
+            )
+    else:
+        # предикат - то же выражение, что в запросах ленты, иначе SQLite не выберет индекс
+        op.create_index(
+            "ix_notifications_unread", "notifications", ["user_id", "id"],
+            sqlite_where=sa.column("is_read", sa.Boolean()) == sa.false(),
+        )
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_notifications_unread")
+    else:
+        op.drop_index("ix_notifications_unread", table_name="notifications")
@@ -0,0 +1,42 @@
+"""coin_ledger.idempotency_key: Idempotency-Key of a debit, unique
+
+Revision ID: 20261017_0008
+Revises: 20261017_0007
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0008"
+down_revision = "20261017_0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("coin_ledger")}
+
+    if "idempotency_key" not in columns:
+        with op.batch_alter_table("coin_ledger") as batch:
+            batch.add_column(sa.Column("idempotency_key", sa.String(length=32), nullable=True))
+
+    if dialect == "postgresql":
+        # CONCURRENTLY не блокирует запись в журнал; требует выполнения вне транзакции
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_coin_ledger_idempotency_key "
+                "ON coin_ledger (idempotency_key)"
+            )
+    else:
+        op.create_index("ix_coin_ledger_idempotency_key", "coin_ledger", ["idempotency_key"], unique=True)
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_coin_ledger_idempotency_key")
+    else:
+        op.drop_index("ix_coin_ledger_idempotency_key", table_name="coin_ledger")
+    with op.batch_alter_table("coin_ledger") as batch:
+        batch.drop_column("idempotency_key")
@@ -0,0 +1,26 @@
+"""player_stats.total_score: BIGINT
+
+Revision ID: 20261017_0009
+Revises: 20261017_0008
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "20261017_0009"
+down_revision = "20261017_0008"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # в SQLite INTEGER и так 64-битный: менять нужно только PostgreSQL
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column("player_stats", "total_score", type_=sa.BigInteger(), existing_type=sa.Integer(),
+                        existing_nullable=False)
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        op.alter_column("player_stats", "total_score", type_=sa.Integer(), existing_type=sa.BigInteger(),
+                        existing_nullable=False)
@@ -1,14 +1,129 @@
+import glob
+import hashlib
+import os
+import time
+import uuid
 from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
+from app.cache import TTLCache
 from app.schemas.tokens import TokenData
 from dotenv import load_dotenv
-import os
 
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
+QUIZ_SESSION_EXPIRE_MINUTES = int(os.getenv("QUIZ_SESSION_EXPIRE_MINUTES", "60"))
+
+# Асимметричные алгоритмы (RS*/ES*): приватный ключ текущей версии и публичные ключи всех действующих версий
+JWT_KEY_ID = os.getenv("JWT_KEY_ID")
+JWT_PRIVATE_KEY_FILE = os.getenv("JWT_PRIVATE_KEY_FILE")
+JWT_PUBLIC_KEYS_DIR = os.getenv("JWT_PUBLIC_KEYS_DIR")  # файлы <kid>.pem
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class TokenCodec:
+    """
+    Подпись и проверка JWT с кэшем уже проверенных токенов.
+
+    Для HS* используется общий секрет. Для RS*/ES* токен подписывается
+    приватным ключом с заголовком kid, а проверяется публичным ключом,
+    выбранным по kid, что позволяет ротировать ключи и проверять токены
+    в других сервисах без секрета.
+    """
+
+    def __init__(self, algorithm: str, signing_key, verification_keys: dict, kid: str | None = None,
+                 cache_size: int = TOKEN_CACHE_SIZE, cache_ttl: float = TOKEN_CACHE_TTL):
+        self.algorithm = algorithm
+        self.kid = kid
+        self._signing_key = signing_key
+        self._verification_keys = verification_keys
+        self._cache = TTLCache(cache_size, cache_ttl) if cache_size > 0 else None
+
+    @property
+    def symmetric(self) -> bool:
+        return self.algorithm.startswith("HS")
+
+    @classmethod
+    def from_env(cls) -> "TokenCodec":
+        if ALGORITHM.startswith("HS"):
+            return cls(ALGORITHM, SECRET_KEY, {None: SECRET_KEY})
+
+        verification_keys = {}
+        if JWT_PUBLIC_KEYS_DIR:
+            for path in glob.glob(os.path.join(JWT_PUBLIC_KEYS_DIR, "*.pem")):
+                kid = os.path.splitext(os.path.basename(path))[0]
+                verification_keys[kid] = jwk.construct(_read(path), ALGORITHM)
+
+        signing_key = None
+        if JWT_PRIVATE_KEY_FILE:
+            signing_key = jwk.construct(_read(JWT_PRIVATE_KEY_FILE), ALGORITHM)
+            verification_keys.setdefault(JWT_KEY_ID, signing_key.public_key())
+        return cls(ALGORITHM, signing_key, verification_keys, kid=JWT_KEY_ID)
+
+    def encode(self, claims: dict) -> str:
+        if self._signing_key is None:
+            raise RuntimeError("No signing key configured")
+        headers = {"kid": self.kid} if self.kid and not self.symmetric else None
+        return jwt.encode(claims, self._signing_key, algorithm=self.algorithm, headers=headers)
+
+    def _verification_key(self, token: str):
+        if self.symmetric:
+            return self._verification_keys[None]
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = self._verification_keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown key id: {kid}")
+        return key
+
+    def decode(self, token: str) -> dict:
+        """Проверенные claims; бросает JWTError"""
+        if self._cache is None:
+            return jwt.decode(token, self._verification_key(token), algorithms=[self.algorithm])
+
+        cache_key = hashlib.sha256(token.encode()).digest()
+        claims = self._cache.get(cache_key)
+        if claims is not None:
+            return claims
+
+        claims = jwt.decode(token, self._verification_key(token), algorithms=[self.algorithm])
+        ttl = self._cache.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            # запись не должна пережить сам токен
+            ttl = min(ttl, exp - time.time())
+        if ttl > 0:
+            self._cache.set(cache_key, claims, ttl=ttl)
+        return claims
+
+    def jwks(self) -> dict:
+        """Публичные ключи в формате JWKS (пусто для HS*, секрет не публикуется)"""
+        if self.symmetric:
+            return {"keys": []}
+        keys = []
+        for kid, key in self._verification_keys.items():
+            data = key.to_dict()
+            data.update({"kid": kid, "use": "sig"})
+            keys.append(data)
+        return {"keys": keys}
+
+
+_codec: TokenCodec | None = None
+
+
+def get_token_codec() -> TokenCodec:
+    global _codec
+    if _codec is None:
+        _codec = TokenCodec.from_env()
+    return _codec
 
 
 """СОЗДАНИЕ ТОКЕНА"""
@@ -16,17 +131,37 @@ def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = get_token_codec().encode(to_encode)
     return encoded_jwt
 
 
 """ВЕРИФИКАЦИЯ ТОКЕНА"""
 def verify_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = get_token_codec().decode(token)
         email: str = payload.get("sub")
         if email is None:
             return None
         return TokenData(email=email)
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+
+"""ТОКЕН СЕССИИ ВИКТОРИНЫ"""
+def create_quiz_token(question_ids: list[int], user_id: int) -> str:
+    # без "sub": такой токен не может быть принят как токен доступа;
+    # uid привязывает сессию к игроку, jti делает ее одноразовой (app/quiz_sessions.py)
+    expire = datetime.utcnow() + timedelta(minutes=QUIZ_SESSION_EXPIRE_MINUTES)
+    return get_token_codec().encode({"qids": question_ids, "uid": user_id, "jti": uuid.uuid4().hex, "exp": expire})
+
+
+def verify_quiz_token(token: str) -> dict | None:
+    """Полезная нагрузка токена сессии (qids, uid, jti, exp) или None"""
+    try:
+        payload = get_token_codec().decode(token)
+    except JWTError:
+        return None
+    if not isinstance(payload.get("qids"), list) or not isinstance(payload.get("uid"), int) \
+            or not isinstance(payload.get("jti"), str):
+        return None
+    return payload
@@ -0,0 +1,56 @@
+# app/bootstrap.py
+import os
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from dotenv import load_dotenv
+
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.crud import init_tree_catalog
+from app.logging_config import logger
+from app.user_search import ensure_search_index
+
+load_dotenv()
+
+# выставляет мастер-процесс gunicorn после bootstrap(): воркеры не повторяют его
+BOOTSTRAPPED_ENV = "APP_BOOTSTRAPPED"
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+
+class SchemaNotAtHead(RuntimeError):
+    pass
+
+
+def _schema_state(conn) -> tuple[set, set]:
+    """(текущие ревизии БД, head-ревизии миграций); пустое первое - схема не под Alembic"""
+    current = set(MigrationContext.configure(conn).get_current_heads())
+    heads = set(ScriptDirectory(ALEMBIC_DIR).get_heads())
+    return current, heads
+
+
+async def bootstrap():
+    """
+    Подготовка БД, один раз на запуск: схема и начальный каталог деревьев.
+
+    Если схема ведется Alembic и стоит на head, create_all не выполняется;
+    если отстает - запуск прерывается (сначала alembic upgrade head).
+    Схема без Alembic (dev, тесты) создается через create_all, как раньше.
+    """
+    async with engine.begin() as conn:
+        current, heads = await conn.run_sync(_schema_state)
+        if not current:
+            logger.info("Schema is not managed by Alembic, running create_all")
+            await conn.run_sync(Base.metadata.create_all)
+        elif current != heads:
+            raise SchemaNotAtHead(
+                f"Database schema at {sorted(current)}, migrations head is {sorted(heads)}: run alembic upgrade head"
+            )
+        else:
+            logger.info("Schema at Alembic head %s, skipping create_all", ", ".join(sorted(heads)))
+        await conn.run_sync(ensure_search_index)
+
+    async with AsyncSessionLocal() as db:
+        await init_tree_catalog(db)
+
+
+def is_bootstrapped() -> bool:
+    return os.getenv(BOOTSTRAPPED_ENV) == "1"
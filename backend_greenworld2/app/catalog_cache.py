@@ -0,0 +1,76 @@
+# app/catalog_cache.py
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from app.models.tree_catalog import TreeCatalog
+from app.responses import dumps
+from app.schemas.tree_catalog import TreeCatalogOut
+
+load_dotenv()
+
+# Каталог меняется редко; TTL нужен только чтобы другие воркеры подхватили запись
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+
+class CatalogSnapshot:
+    """Снимок каталога с заранее сериализованным телом ответа"""
+
+    __slots__ = ("version", "items", "by_id", "body", "etag", "modified_at", "last_modified", "loaded_at")
+
+    def __init__(self, items: list, version: int):
+        self.version = version
+        self.items = tuple(items)
+        self.by_id = {item.id: item for item in self.items}
+        self.body = dumps([item.dict() for item in self.items])
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"'
+        self.modified_at = datetime.now(timezone.utc).replace(microsecond=0)
+        self.last_modified = format_datetime(self.modified_at, usegmt=True)
+        self.loaded_at = time.monotonic()
+
+    def get(self, tree_type_id: int) -> TreeCatalogOut | None:
+        return self.by_id.get(tree_type_id)
+
+    def not_modified(self, if_none_match: str | None, if_modified_since: str | None) -> bool:
+        """Условный GET: If-None-Match имеет приоритет над If-Modified-Since (RFC 9110)"""
+        if if_none_match is not None:
+            tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+        if if_modified_since is not None:
+            try:
+                return parsedate_to_datetime(if_modified_since) >= self.modified_at
+            except (TypeError, ValueError):
+                return False
+        return False
+
+
+_snapshot: CatalogSnapshot | None = None
+_version = 0
+
+
+async def load_catalog(db: AsyncSession) -> CatalogSnapshot:
+    """Перечитать каталог из БД и заменить снимок (при старте и после записи в каталог)"""
+    global _snapshot, _version
+    result = await db.execute(select(TreeCatalog).order_by(TreeCatalog.id))
+    items = [TreeCatalogOut.from_orm(row) for row in result.scalars().all()]
+    snapshot = CatalogSnapshot(items, _version + 1)
+    if _snapshot is not None and _snapshot.etag == snapshot.etag:
+        # содержимое не изменилось - оставляем прежнюю версию и дату, чтобы клиенты получали 304
+        _snapshot.loaded_at = snapshot.loaded_at
+        return _snapshot
+    _version += 1
+    _snapshot = snapshot
+    return _snapshot
+
+
+async def get_catalog_snapshot(db: AsyncSession) -> CatalogSnapshot:
+    snapshot = _snapshot
+    if snapshot is None or time.monotonic() - snapshot.loaded_at > CATALOG_CACHE_TTL:
+        snapshot = await load_catalog(db)
+    return snapshot
+
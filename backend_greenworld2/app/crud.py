@@ -1,17 +1,32 @@
 # app/crud.py
+import math
 from datetime import datetime, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import select, update, insert
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException
-from passlib.context import CryptContext 
 from dotenv import load_dotenv
 
-from app.logging_config import logger
+from app.logging_config import get_logger, logger
 from app.models.users import User
 from app.schemas.users import UserCreate, UserUpdate
+from app.schemas.trees import TreeOut
 from app.models.trees import Tree
 from app.models.gamesResults import GamesResult
 from app.models.tree_catalog import TreeCatalog
+from app.weak_passwords import is_weak_password
+from app.hashing import hash_password, verify_password
+from app.identity_cache import invalidate_user
+from app.login_guard import get_login_guard
+from app.catalog_cache import get_catalog_snapshot, load_catalog
+from app.ledger import balance_column, credit_coins, debit_coins, get_balance, with_balance
+from app.leaderboard import get_leaderboard, record_games
+from app.user_search import with_name_search
+from app.growth import get_growth_scheduler
+from app.realtime import publish_event, publish_events, request_recheck
+
+# попытки входа - самые частые записи; семплируются через LOG_SAMPLING=app.auth=...
+auth_logger = get_logger("auth")
 
 def now_utc() -> datetime:
     return datetime.now(timezone.utc)
@@ -22,6 +37,10 @@ def calc_cost(base_price: int, lvl: int) -> int:
 def cooldown(lvl: int) -> timedelta:
     return timedelta(minutes=15 * lvl)
 
+def coins_event(balance: int, delta: int, reason: str) -> dict:
+    """Событие для сокетов пользователя (app/realtime.py) об изменении баланса"""
+    return {"type": "coins", "balance": balance, "delta": delta, "reason": reason}
+
 async def get_tree_catalog(db: AsyncSession):
     """Получить весь каталог деревьев"""
     result = await db.execute(select(TreeCatalog))
@@ -32,40 +51,50 @@ async def get_tree_catalog_item(db: AsyncSession, tree_type_id: int):
     result = await db.execute(select(TreeCatalog).where(TreeCatalog.id == tree_type_id))
     return result.scalar_one_or_none()
 
-async def buy_and_plant_tree(db: AsyncSession, user_id: int, tree_type_id: int, custom_name: str = None):
+async def buy_and_plant_tree(db: AsyncSession, user_id: int, tree_type_id: int, custom_name: str = None,
+                             idempotency_key: str | None = None) -> TreeOut:
     """
-    Покупка и посадка дерева из каталога
+    Покупка и посадка дерева из каталога.
+    Монеты списываются записью в журнал с проверкой баланса (см. app/ledger.py).
     """
-    # Получаем тип дерева из каталога
-    tree_catalog = await get_tree_catalog_item(db, tree_type_id)
+    # Получаем тип дерева из снимка каталога (без запроса к БД)
+    tree_catalog = (await get_catalog_snapshot(db)).get(tree_type_id)
     if not tree_catalog:
         raise HTTPException(status_code=404, detail="Tree type not found")
     
-    # Получаем пользователя
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one()
-    
-    # Проверяем достаточно ли монет
-    if user.coins < tree_catalog.price:
-        raise HTTPException(status_code=402, detail="Not enough coins")
+    # Списываем монеты, только если их достаточно
+    balance = await debit_coins(db, user_id, tree_catalog.price, reason="buy_tree", idempotency_key=idempotency_key)
     
     # Создаем дерево
     tree_name = custom_name or tree_catalog.name
-    tree = Tree(
+    created = await db.execute(
+        insert(Tree)
+        .values(
+            created_by=user_id,
+            tree_type_id=tree_type_id,
+            name=tree_name,
+            price=tree_catalog.price,  # Сохраняем цену покупки
+            lvl=1,
+            is_ready=True,  # новое дерево сразу можно улучшить, уведомлять не о чем
+        )
+        .returning(Tree.id, Tree.next_upgrade_at, Tree.created_at)
+    )
+    tree_id, next_upgrade_at, created_at = created.one()
+    await db.commit()
+    await invalidate_user(user_id)
+    await publish_event(user_id, coins_event(balance, -tree_catalog.price, "buy_tree"))
+    
+    return TreeOut(
+        id=tree_id,
         created_by=user_id,
         tree_type_id=tree_type_id,
         name=tree_name,
-        price=tree_catalog.price  # Сохраняем цену покупки
+        price=tree_catalog.price,
+        lvl=1,
+        next_upgrade_at=next_upgrade_at,
+        created_at=created_at,
+        tree_type_name=tree_catalog.name,
     )
-    
-    # Вычитаем монеты
-    user.coins -= tree_catalog.price
-    
-    db.add(tree)
-    await db.commit()
-    await db.refresh(tree)
-    
-    return tree
 
 async def init_tree_catalog(db: AsyncSession):
     """Инициализация каталога деревьев (вызвать один раз при старте)"""
@@ -102,72 +131,108 @@ async def init_tree_catalog(db: AsyncSession):
             db.add(tree)
         
         await db.commit()
-        print("Tree catalog initialized")
+        logger.info("Tree catalog initialized")
+
+    await load_catalog(db)
 
-async def create_tree(db: AsyncSession, user_id: int, tree_type_id: int, custom_name: str = None) -> Tree:
+async def create_tree(db: AsyncSession, user_id: int, tree_type_id: int, custom_name: str = None) -> TreeOut:
     """Создание дерева из каталога (альтернатива buy_and_plant_tree)"""
     return await buy_and_plant_tree(db, user_id, tree_type_id, custom_name)
 
-async def list_trees(db: AsyncSession, user_id: int):
-    result = await db.execute(select(Tree).where(Tree.created_by == user_id))
-    return result.scalars().all()
-
-async def get_tree_owned(db: AsyncSession, user_id: int, tree_id: int) -> Tree:
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
-    tree = result.scalar_one_or_none()
-    if not tree or tree.created_by != user_id:
+# Колонки TreeOut без tree_type_name: имя типа берется из снимка каталога, без JOIN
+TREE_COLUMNS = (
+    Tree.id, Tree.created_by, Tree.tree_type_id, Tree.name, Tree.price,
+    Tree.lvl, Tree.next_upgrade_at, Tree.created_at,
+)
+
+def tree_out(row, catalog) -> dict:
+    """Ответ TreeOut из строки TREE_COLUMNS"""
+    tree_type = catalog.get(row.tree_type_id)
+    data = dict(row._mapping)
+    data["tree_type_name"] = tree_type.name if tree_type else "Unknown"
+    return data
+
+async def list_trees(db: AsyncSession, user_id: int) -> list[dict]:
+    catalog = await get_catalog_snapshot(db)
+    result = await db.execute(select(*TREE_COLUMNS).where(Tree.created_by == user_id).order_by(Tree.id))
+    return [tree_out(row, catalog) for row in result]
+
+async def get_tree_owned(db: AsyncSession, user_id: int, tree_id: int) -> dict:
+    catalog = await get_catalog_snapshot(db)
+    result = await db.execute(select(*TREE_COLUMNS).where(Tree.id == tree_id, Tree.created_by == user_id))
+    row = result.first()
+    if row is None:
         raise HTTPException(status_code=404, detail="Tree not found")
-    return tree
+    return tree_out(row, catalog)
 
-async def update_tree(db: AsyncSession, user_id: int, tree_id: int, name: str | None, price: int | None) -> Tree:
-    result = await db.execute(select(Tree).where(Tree.id == tree_id))
-    tree = result.scalar_one_or_none()
-    if not tree or tree.created_by != user_id:
-        raise HTTPException(status_code=404, detail="Tree not found")
-    
+async def update_tree(db: AsyncSession, user_id: int, tree_id: int, name: str | None, price: int | None) -> dict:
+    values = {}
     if name is not None:
-        tree.name = name
+        values["name"] = name
     if price is not None:
-        tree.price = price
-    
+        values["price"] = price
+    if not values:
+        return await get_tree_owned(db, user_id, tree_id)
+
+    catalog = await get_catalog_snapshot(db)
+    result = await db.execute(
+        update(Tree).where(Tree.id == tree_id, Tree.created_by == user_id).values(**values).returning(*TREE_COLUMNS)
+    )
+    row = result.first()
+    if row is None:
+        await db.rollback()
+        raise HTTPException(status_code=404, detail="Tree not found")
     await db.commit()
-    await db.refresh(tree)
-    return tree
+    return tree_out(row, catalog)
 
-async def upgrade_tree(db: AsyncSession, user_id: int, tree_id: int, use_coins: bool = True) -> dict:
-    # Получаем дерево и пользователя
-    tree_result = await db.execute(select(Tree).where(Tree.id == tree_id))
-    tree = tree_result.scalar_one_or_none()
+async def upgrade_tree(db: AsyncSession, user_id: int, tree_id: int, use_coins: bool = True,
+                       idempotency_key: str | None = None) -> dict:
+    """
+    Улучшение дерева: один SELECT, условный UPDATE и списание в одной транзакции.
+    Уровень дерева обновляется только если он не изменился с момента чтения,
+    монеты списываются только если их хватает.
+    """
+    tree_result = await db.execute(
+        select(Tree.created_by, Tree.price, Tree.lvl, Tree.next_upgrade_at).where(Tree.id == tree_id)
+    )
+    tree = tree_result.first()
     if not tree or tree.created_by != user_id:
         raise HTTPException(status_code=404, detail="Tree not found")
 
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one()
-    
     if tree.lvl >= 5:
         raise HTTPException(status_code=409, detail="Tree at max level")
 
-    if use_coins:
-        cost = calc_cost(tree.price, tree.lvl)
-        if (user.coins or 0) < cost:
-            raise HTTPException(status_code=402, detail="Not enough coins")
-        user.coins = (user.coins or 0) - cost
+    now = now_utc()
+    new_lvl = tree.lvl + 1
+    next_upgrade_at = now + cooldown(new_lvl)
 
-    if tree.next_upgrade_at and now_utc() < tree.next_upgrade_at:
+    upgraded = await db.execute(
+        update(Tree)
+        .where(Tree.id == tree_id, Tree.lvl == tree.lvl, Tree.next_upgrade_at <= now)
+        .values(lvl=new_lvl, next_upgrade_at=next_upgrade_at, is_ready=False)
+        .returning(Tree.id)
+    )
+    if upgraded.first() is None:
+        await db.rollback()
         raise HTTPException(status_code=409, detail="Upgrade not available yet")
 
-    tree.lvl += 1
-    tree.next_upgrade_at = now_utc() + cooldown(tree.lvl)
-    
+    cost = calc_cost(tree.price, tree.lvl) if use_coins else 0
+    if use_coins:
+        balance = await debit_coins(db, user_id, cost, reason="upgrade_tree", idempotency_key=idempotency_key)
+
     await db.commit()
-    await db.refresh(tree)
-    
-    return {"lvl": tree.lvl, "next_upgrade_at": tree.next_upgrade_at.isoformat()}
+    events = [(user_id, {"type": "tree", "id": tree_id, "lvl": new_lvl, "next_upgrade_at": next_upgrade_at})]
+    if use_coins:
+        await invalidate_user(user_id)
+        events.append((user_id, coins_event(balance, -cost, "upgrade_tree")))
+    get_growth_scheduler().schedule(tree_id, next_upgrade_at)
+    await publish_events(events)
+
+    return {"lvl": new_lvl, "next_upgrade_at": next_upgrade_at.isoformat()}
 
 load_dotenv()
 
 SPECIAL_CHARS = '!@#$%^&*()_-+=№;%:?*'
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(
@@ -200,28 +265,23 @@ def password_check(user: UserCreate) -> bool:
     if upper_count + lower_count <= 2:
         return False
     
-    try:
-        with open('top_passwords.txt', 'r', encoding='utf-8') as f:
-            weak_passwords = {line.strip() for line in f}
-        if password in weak_passwords:
-            return False
-    except FileNotFoundError:
-        pass
+    if is_weak_password(password):
+        return False
     
     return True
 
 async def create_user(db: AsyncSession, user: UserCreate) -> User:
-    logger.info(f"Attempting to create user: {user.full_name}")
+    logger.info("Attempting to create user: %s", user.full_name)
     
     existing_user = await get_user_by_email(db, user.email_user)
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     if not password_check(user):
-        logger.warning(f"Weak password for user: {user.full_name}")
+        logger.warning("Weak password for user: %s", user.full_name)
         raise HTTPException(status_code=400, detail="Weak password")
     
-    hashed_password = pwd_context.hash(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = User(
         sex=user.sex,
         email_user=user.email_user,
@@ -234,12 +294,14 @@ async def create_user(db: AsyncSession, user: UserCreate) -> User:
     db.add(db_user)
     await db.commit()
     await db.refresh(db_user)
-    logger.info(f"Created new user: {db_user.email_user}, ID: {db_user.id}")
+    logger.info("Created new user: %s, ID: %s", db_user.email_user, db_user.id)
     return db_user
 
 async def get_user(db: AsyncSession, user_id: int):
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalar_one_or_none()
+    """Публичные поля пользователя; coins - точный баланс по журналу, а не зеркало users.coins"""
+    result = await db.execute(with_balance(select(*USER_PUBLIC_COLUMNS)).where(User.id == user_id))
+    row = result.first()
+    return row._mapping if row is not None else None
 
 async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate):
     result = await db.execute(select(User).where(User.id == user_id))
@@ -248,66 +310,116 @@ async def update_user(db: AsyncSession, user_id: int, user_update: UserUpdate):
         raise HTTPException(status_code=404, detail="User not found")
     
     update_data = user_update.dict(exclude_unset=True)
+    email_changed = "email_user" in update_data and update_data["email_user"] != db_user.email_user
     for field, value in update_data.items():
         setattr(db_user, field, value)
     
     await db.commit()
-    await db.refresh(db_user)
-    return db_user
-
-async def search_users(db: AsyncSession, full_name: str = None, sex: str = None):
-    query = select(User)
+    await invalidate_user(user_id)
+    if email_changed:
+        # токены выданы на старый email: открытые сокеты пользователя закрываются
+        await request_recheck(user_id)
+    return await get_user(db, user_id)
+
+# Только поля UserInDB: без hashed_password и без загрузки ORM-объектов.
+# users.coins отстает от журнала до следующей компакции, поэтому coins считается по журналу
+# (запрос должен присоединять coin_balances через with_balance)
+USER_PUBLIC_COLUMNS = (
+    User.id, User.full_name, User.sex, User.email_user, balance_column().label("coins"),
+    User.is_active, User.login_attempts, User.created_at,
+)
+
+async def search_users(db: AsyncSession, full_name: str = None, sex: str = None,
+                       limit: int = 50, cursor: int = None) -> tuple[list, int | None]:
+    """Страница результатов по возрастанию id (keyset) и курсор следующей страницы"""
+    query, key = with_balance(select(*USER_PUBLIC_COLUMNS)), User.id
 
     if full_name:
-        query = query.where(User.full_name.ilike(f"%{full_name}%"))
+        query, key = with_name_search(query, full_name)
+
+    if cursor is not None:
+        query = query.where(key > cursor)
 
     if sex:
         if sex not in ["М", "Ж"]:
             raise HTTPException(status_code=422, detail="Invalid sex value. Must be 'М' or 'Ж'")
         query = query.where(User.sex == sex)
 
-    result = await db.execute(query)
-    return result.scalars().all()
+    rows = (await db.execute(query.order_by(key).limit(limit + 1))).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [row._mapping for row in rows[:limit]], next_cursor
+
+async def authenticate_user(db: AsyncSession, email: str, password: str, ip: str | None = None):
+    auth_logger.debug("Authentication attempt for email: %s", email)
+    guard = get_login_guard()
+    # под задержкой попытка отклоняется без запроса в БД и bcrypt
+    retry_after = await guard.retry_after(email, ip)
+    if retry_after > 0:
+        auth_logger.debug("Authentication rejected for %s from %s: backoff %.1f s", email, ip, retry_after)
+        raise HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
 
-async def authenticate_user(db: AsyncSession, email: str, password: str):
-    logger.info(f"Authentication attempt for email: {email}")
     user = await get_user_by_email(db, email)
     
     if not user or not user.is_active:
-        logger.warning(f"Authentication failed for {email}: User not found or inactive")
+        await guard.failure(email, ip)
+        auth_logger.warning("Authentication failed for %s: User not found or inactive", email)
         return False
     
-    if not pwd_context.verify(password, user.hashed_password):
-        user.login_attempts += 1
-        logger.warning(f"Authentication failed for {email}: Incorrect password, attempts: {user.login_attempts}")
+    if not await verify_password(password, user.hashed_password):
+        failures = await guard.failure(email, ip)
+        auth_logger.warning("Authentication failed for %s: Incorrect password, attempts: %d", email, failures)
         
-        if user.login_attempts >= 5:
+        # строка пользователя меняется только при переходе в заблокированное состояние
+        if guard.should_lock(failures):
             user.is_active = False
-            logger.error(f"User {email} blocked due to too many login attempts")
-        
-        await db.commit()
+            user.login_attempts = int(failures)
+            await db.commit()
+            await invalidate_user(user.id)
+            # открытые сокеты заблокированного пользователя закрываются
+            await request_recheck(user.id)
+            guard.lockouts += 1
+            auth_logger.error("User %s blocked due to too many login attempts", email)
         return False
     
-    user.login_attempts = 0
-    await db.commit()
-    logger.info(f"User {email} authenticated successfully")
+    await guard.success(email)
+    if user.login_attempts:
+        user.login_attempts = 0
+        await db.commit()
+        await invalidate_user(user.id)
+    auth_logger.info("User %s authenticated successfully", email)
     return user
 
-async def award_coins_atomic(db: AsyncSession, user_id: int, coins: int, result_payload: dict) -> GamesResult:
+async def award_coins_atomic(db: AsyncSession, user_id: int, coins: int, result_payload: dict,
+                             ingest_id: str | None = None) -> GamesResult:
+    """Результат игры, начисление и агрегаты одной транзакцией; ingest_id уникален (повтор - 409)"""
     if coins < 0:
         raise HTTPException(status_code=400, detail="Coins must be non-negative")
 
-    user_result = await db.execute(select(User).where(User.id == user_id))
-    user = user_result.scalar_one_or_none()
-    if not user:
+    # начисление не блокирует строку пользователя, но запись в журнал без нее бессмысленна
+    exists = await db.execute(select(User.id).where(User.id == user_id))
+    if exists.first() is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    result = GamesResult(user_id=user_id, **result_payload)
+    result = GamesResult(user_id=user_id, ingest_id=ingest_id, **result_payload)
     db.add(result)
-
-    user.coins = (user.coins or 0) + coins
+    try:
+        await db.flush()
+    except IntegrityError:
+        await db.rollback()
+        if ingest_id is None:
+            raise
+        raise HTTPException(status_code=409, detail="Request with this Idempotency-Key was already applied")
+    await credit_coins(db, user_id, coins, reason="game_result")
+    total_score = await record_games(db, user_id, result_payload.get("score") or 0)
+    balance = await get_balance(db, user_id)
 
     await db.commit()
-    await db.refresh(result)
+    await invalidate_user(user_id)
+    await get_leaderboard().update(user_id, total_score)
+    await publish_event(user_id, coins_event(balance, coins, "game_result"))
     
-    return result
\ No newline at end of file
+    return result
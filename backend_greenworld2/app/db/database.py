@@ -1,21 +1,116 @@
 # app/db/database.py
+import logging
 import os
+import time
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+load_dotenv()
 
 # Для SQLite используем aiosqlite, для PostgreSQL - asyncpg
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./app.db")
+# реплика для читающих GET-эндпоинтов (каталог, вопросы, поиск пользователей); без нее читаем основную БД
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"  # логирование SQL - только для отладки
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# соединения старше этого закрываются при выдаче (idle timeout сервера, балансировщики)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# pre-ping - лишний round trip на каждую выдачу; включать, если соединения рвутся раньше recycle
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() == "true"
+# кэш подготовленных запросов asyncpg на соединение; 0 - за pgbouncer в режиме transaction
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+# SQLite: сколько секунд писатель ждет блокировку записи, прежде чем получить "database is locked"
+DB_SQLITE_BUSY_TIMEOUT = float(os.getenv("DB_SQLITE_BUSY_TIMEOUT", "30"))
+
+
+# логгер пула - дочерний к "app" и унаследовал бы INFO
+logging.getLogger(f"{__name__}.MeteredPool").setLevel(logging.WARNING)
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """Пул соединений со счетчиками выдач и ожидания свободного соединения"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        self.checkouts += 1
+        if self.checkedout() < self.size() + max(self._max_overflow, 0):
+            return super()._do_get()
+        # все соединения выданы, overflow исчерпан: ждем возврата
+        self.waits += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def recreate(self):
+        # после dispose() пул пересоздается; счетчики переносятся
+        pool = super().recreate()
+        pool.checkouts, pool.waits, pool.timeouts = self.checkouts, self.waits, self.timeouts
+        pool.wait_time, pool.max_wait = self.wait_time, self.max_wait
+        return pool
+
+
+def engine_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW) -> tuple[str, dict]:
+    """URL и параметры create_async_engine из настроек окружения"""
+    parsed = make_url(url)
+    options = {"echo": DB_ECHO, "pool_pre_ping": DB_POOL_PRE_PING}
+    if parsed.get_backend_name() == "sqlite":
+        # пул по умолчанию для aiosqlite (NullPool / StaticPool): соединение с файлом дешевое,
+        # а соединение в пуле держит поток, который не дает процессу завершиться без dispose()
+        # SQLite сериализует писателей: при одновременных покупках очередь за блокировкой дольше 5 с по умолчанию
+        options["connect_args"] = {"timeout": DB_SQLITE_BUSY_TIMEOUT}
+        return url, options
+
+    options.update(
+        poolclass=MeteredPool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # кэш asyncpg и кэш подготовленных запросов диалекта SQLAlchemy
+        options["connect_args"] = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        parsed = parsed.update_query_dict({"prepared_statement_cache_size": str(DB_STATEMENT_CACHE_SIZE)})
+    return parsed.render_as_string(hide_password=False), options
 
-engine = create_async_engine(
-    DATABASE_URL,
-    future=True,
-    echo=True,  # Логирование SQL запросов (можно убрать в продакшене)
-    pool_pre_ping=True,
-)
+
+def _create_engine(url: str):
+    url, options = engine_options(url)
+    return create_async_engine(url, **options)
+
+
+engine = _create_engine(DATABASE_URL)
+replica_engine = _create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
 
 AsyncSessionLocal = async_sessionmaker(
-    bind=engine, 
-    expire_on_commit=False, 
+    bind=engine,
+    expire_on_commit=False,
+    class_=AsyncSession
+)
+# сессии только для чтения; данные реплики могут отставать от основной БД
+ReadSessionLocal = async_sessionmaker(
+    bind=replica_engine or engine,
+    expire_on_commit=False,
     class_=AsyncSession
 )
 Base = declarative_base()
@@ -25,4 +120,43 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db():
+    """Сессия для GET-эндпоинтов без записи: реплика, если настроена"""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def dispose_engines():
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
+
+
+def pool_stats(target=None) -> dict:
+    pool = (target or engine).pool
+    if not isinstance(pool, MeteredPool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": "queue",
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": pool.checkouts,
+        "waits": pool.waits,
+        "timeouts": pool.timeouts,
+        "wait_ms_total": round(pool.wait_time * 1000, 2),
+        "wait_ms_max": round(pool.max_wait * 1000, 2),
+    }
+
+
+def database_stats() -> dict:
+    stats = {"primary": pool_stats(engine)}
+    if replica_engine is not None:
+        stats["replica"] = pool_stats(replica_engine)
+    return stats
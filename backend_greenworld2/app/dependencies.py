@@ -5,23 +5,38 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.auth import verify_token
 from app.crud import get_user_by_email
+from app.identity_cache import get_identity_cache
+from app.ledger import get_balance
+from app.schemas.users import UserInDB
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme), 
-    db: AsyncSession = Depends(get_db)
-):
+async def user_from_token(token: str, db: AsyncSession) -> UserInDB:
+    """Пользователь по access-токену (через кэш идентичности); 401, если токен или пользователь невалиден"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    token_data = verify_token(token)
+    token_data = verify_token(token) if token else None
     if token_data is None:
         raise credentials_exception
     
-    user = await get_user_by_email(db, email=token_data.email)
-    if user is None or not user.is_active:
+    cache = get_identity_cache()
+    user = await cache.get(token_data.email)
+    if user is None:
+        db_user = await get_user_by_email(db, email=token_data.email)
+        if db_user is None:
+            raise credentials_exception
+        # users.coins - лишь зеркало снимка, точный баланс считается по журналу
+        user = UserInDB.from_orm(db_user).copy(update={"coins": await get_balance(db, db_user.id)})
+        await cache.set(user)
+    if not user.is_active:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme), 
+    db: AsyncSession = Depends(get_db)
+):
+    return await user_from_token(token, db)
\ No newline at end of file
@@ -0,0 +1,217 @@
+# app/game_ingest.py
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import defaultdict
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_redis
+from app.crud import award_coins_atomic
+from app.identity_cache import invalidate_user
+from app.leaderboard import get_leaderboard, record_games_many
+from app.ledger import append_entries
+from app.logging_config import logger
+from app.models.gamesResults import GamesResult
+
+load_dotenv()
+
+# immediate - результат и монеты пишутся в запросе; eventual - результат ставится в очередь,
+# воркер Celery пишет накопленные результаты пачками
+GAME_RESULT_MODE = os.getenv("GAME_RESULT_MODE", "immediate")
+GAME_INGEST_BATCH_SIZE = int(os.getenv("GAME_INGEST_BATCH_SIZE", "500"))
+GAME_INGEST_FLUSH_MS = int(os.getenv("GAME_INGEST_FLUSH_MS", "200"))
+# пачка, которую воркер не закрыл за это время, считается брошенной и обрабатывается повторно
+GAME_INGEST_STALE_SECONDS = float(os.getenv("GAME_INGEST_STALE_SECONDS", "300"))
+# запланированная запись, не начавшаяся за это время (задача потеряна), планируется заново
+GAME_INGEST_FLUSH_TIMEOUT = float(os.getenv("GAME_INGEST_FLUSH_TIMEOUT", "30"))
+# столько раз пачка может упасть при записи; дальше ее результаты пишутся по одному,
+# а не записавшиеся уходят в DEAD_KEY и не задерживают очередь
+GAME_INGEST_MAX_ATTEMPTS = int(os.getenv("GAME_INGEST_MAX_ATTEMPTS", "3"))
+
+PENDING_KEY = "games:pending"
+FLUSH_SCHEDULED_KEY = "games:flush_scheduled"  # есть запланированная, еще не начатая запись
+BATCHES_KEY = "games:batches"  # zset: batch_id -> время взятия
+BATCH_KEY_PREFIX = "games:batch:"
+ATTEMPTS_KEY = "games:batch_attempts"  # hash: batch_id -> число неудачных попыток
+DEAD_KEY = "games:dead"  # результаты, которые не удалось записать; разбираются вручную
+
+# Атомарно перенести до ARGV[1] результатов из очереди в список пачки и зарегистрировать пачку
+_TAKE_BATCH = """
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items == 0 then return items end
+redis.call('LTRIM', KEYS[1], #items, -1)
+redis.call('RPUSH', KEYS[2], unpack(items))
+redis.call('ZADD', KEYS[3], ARGV[2], ARGV[3])
+return items
+"""
+
+
+def _schedule_flush(countdown: float) -> bool:
+    from app.tasks import flush_game_results
+    try:
+        flush_game_results.apply_async(countdown=countdown)
+        return True
+    except Exception:
+        logger.exception("Failed to schedule game result flush")
+        return False
+
+
+async def enqueue_game_result(redis, user_id: int, coins: int, result_payload: dict,
+                              ingest_id: str | None = None) -> str:
+    """Поставить результат в очередь; возвращает ingest_id (повтор с тем же ingest_id запишется один раз)"""
+    ingest_id = ingest_id or uuid.uuid4().hex
+    item = {"ingest_id": ingest_id, "user_id": user_id, "coins": coins, **result_payload}
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.rpush(PENDING_KEY, json.dumps(item))
+        # первый результат без запланированной записи запускает таймер
+        pipe.set(FLUSH_SCHEDULED_KEY, ingest_id, nx=True, px=int(GAME_INGEST_FLUSH_TIMEOUT * 1000))
+        queued, first = await pipe.execute()
+    if first:
+        if not await asyncio.to_thread(_schedule_flush, GAME_INGEST_FLUSH_MS / 1000):
+            # снять отметку, иначе очередь ждала бы ее истечения: запланирует следующий результат
+            await redis.delete(FLUSH_SCHEDULED_KEY)
+    elif queued % GAME_INGEST_BATCH_SIZE == 0:
+        # полная пачка - немедленная запись
+        await asyncio.to_thread(_schedule_flush, 0)
+    return ingest_id
+
+
+async def accept_game_result(db: AsyncSession, user_id: int, coins: int, result_payload: dict,
+                             ingest_id: str | None = None) -> dict:
+    """
+    Принять результат в режиме GAME_RESULT_MODE; без Redis - всегда immediate.
+    ingest_id (хэш Idempotency-Key) уникален в games_result в обоих режимах.
+    """
+    redis = get_redis() if GAME_RESULT_MODE == "eventual" else None
+    if redis is not None:
+        try:
+            ingest_id = await enqueue_game_result(redis, user_id, coins, result_payload, ingest_id)
+            return {"ok": True, "awarded": coins, "queued": True, "ingest_id": ingest_id}
+        except RedisError as e:
+            logger.warning("Game result queue unavailable, crediting immediately: %s", e)
+
+    result = await award_coins_atomic(db=db, user_id=user_id, coins=coins, result_payload=result_payload,
+                                      ingest_id=ingest_id)
+    return {"ok": True, "awarded": coins, "queued": False, "result_id": result.id}
+
+
+async def ingest_batch(db: AsyncSession, items: list[dict]) -> int:
+    """
+    Записать пачку результатов одной транзакцией: многострочный INSERT результатов,
+    одна запись журнала монет и один upsert агрегатов на пользователя.
+
+    Результаты с уже записанным ingest_id пропускаются, поэтому пачку можно
+    обработать повторно. Возвращает число новых результатов.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    # executemany с RETURNING: один скомпилированный оператор, строки уходят пачками (insertmanyvalues)
+    stmt = (
+        dialect.insert(GamesResult.__table__)
+        .on_conflict_do_nothing(index_elements=[GamesResult.ingest_id])
+        .returning(GamesResult.ingest_id)
+    )
+    result = await db.execute(stmt, [
+        {
+            "ingest_id": item["ingest_id"],
+            "user_id": item["user_id"],
+            "title": item["title"],
+            "score": item["score"],
+            "duration_sec": item["duration_sec"],
+        }
+        for item in items
+    ])
+    inserted = set(result.scalars().all())
+
+    coins = defaultdict(int)
+    totals = defaultdict(lambda: [0, 0])
+    for item in items:
+        if item["ingest_id"] not in inserted:
+            continue
+        coins[item["user_id"]] += item["coins"]
+        totals[item["user_id"]][0] += item["score"] or 0
+        totals[item["user_id"]][1] += 1
+
+    await append_entries(db, [
+        {"user_id": user_id, "delta": amount, "reason": "game_result"}
+        for user_id, amount in coins.items() if amount
+    ])
+    new_totals = await record_games_many(db, {user_id: tuple(t) for user_id, t in totals.items()})
+    await db.commit()
+
+    board = get_leaderboard()
+    for user_id, total_score in new_totals.items():
+        await invalidate_user(user_id)
+        await board.update(user_id, total_score)
+    return len(inserted)
+
+
+async def _ingest_raw(session_factory, raw: list[str]) -> int:
+    async with session_factory() as db:
+        return await ingest_batch(db, [json.loads(r) for r in raw])
+
+
+async def _salvage(redis, session_factory, batch_id: str, raw: list[str]) -> int:
+    """Записать результаты пачки по одному; не записавшиеся - в DEAD_KEY"""
+    count = 0
+    for item in raw:
+        try:
+            count += await _ingest_raw(session_factory, [item])
+        except Exception:
+            logger.exception("Game result from batch %s moved to %s: %s", batch_id, DEAD_KEY, item)
+            await redis.rpush(DEAD_KEY, item)
+    return count
+
+
+async def _process_batch(redis, session_factory, batch_id: str, raw: list[str]) -> int:
+    """
+    Записать пачку и снять ее с учета. Упавшая пачка остается в BATCHES_KEY и повторяется
+    как зависшая; после GAME_INGEST_MAX_ATTEMPTS неудач разбирается по одному результату.
+    """
+    try:
+        count = await _ingest_raw(session_factory, raw) if raw else 0
+    except Exception:
+        attempts = await redis.hincrby(ATTEMPTS_KEY, batch_id, 1)
+        if attempts < GAME_INGEST_MAX_ATTEMPTS:
+            logger.exception("Game result batch %s failed (attempt %d), will retry", batch_id, attempts)
+            return 0
+        logger.exception("Game result batch %s failed %d times, writing items one by one", batch_id, attempts)
+        count = await _salvage(redis, session_factory, batch_id, raw)
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.delete(BATCH_KEY_PREFIX + batch_id)
+        pipe.zrem(BATCHES_KEY, batch_id)
+        pipe.hdel(ATTEMPTS_KEY, batch_id)
+        await pipe.execute()
+    return count
+
+
+async def flush_pending(redis, session_factory, batch_size: int = GAME_INGEST_BATCH_SIZE) -> int:
+    """
+    Разобрать очередь пачками до опустошения; возвращает число записанных результатов.
+    Ошибка записи одной пачки не останавливает разбор остальных (см. _process_batch).
+    """
+    total = 0
+    # результаты, поставленные после этого момента, запланируют следующую запись
+    await redis.delete(FLUSH_SCHEDULED_KEY)
+
+    # пачки воркеров, упавших между взятием и коммитом
+    stale = await redis.zrangebyscore(BATCHES_KEY, "-inf", time.time() - GAME_INGEST_STALE_SECONDS)
+    for batch_id in stale:
+        await redis.zadd(BATCHES_KEY, {batch_id: time.time()}, xx=True)
+        raw = await redis.lrange(BATCH_KEY_PREFIX + batch_id, 0, -1)
+        logger.warning("Reprocessing stale game result batch %s (%d items)", batch_id, len(raw))
+        total += await _process_batch(redis, session_factory, batch_id, raw)
+
+    while True:
+        batch_id = uuid.uuid4().hex
+        raw = await redis.eval(
+            _TAKE_BATCH, 3, PENDING_KEY, BATCH_KEY_PREFIX + batch_id, BATCHES_KEY,
+            batch_size, time.time(), batch_id,
+        )
+        if not raw:
+            return total
+        total += await _process_batch(redis, session_factory, batch_id, raw)
@@ -0,0 +1,161 @@
+# app/growth.py
+import asyncio
+import heapq
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from sqlalchemy import and_, or_, select, update
+
+from app.logging_config import logger
+from app.models.trees import Tree
+from app.notifications import insert_notifications, push_notifications
+
+load_dotenv()
+
+GROWTH_SCHEDULER = os.getenv("GROWTH_SCHEDULER", "on")  # on | off
+# в памяти держатся только дедлайны ближайшего окна; дальние подгружаются сканированием индекса
+GROWTH_HORIZON = float(os.getenv("GROWTH_HORIZON", "600"))
+GROWTH_SCAN_INTERVAL = float(os.getenv("GROWTH_SCAN_INTERVAL", "30"))
+GROWTH_BATCH = int(os.getenv("GROWTH_BATCH", "1000"))
+MAX_TREE_LVL = 5
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite возвращает naive datetime в UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def growth_message(name: str, tree_id: int, lvl: int) -> str:
+    if lvl >= MAX_TREE_LVL:
+        return f"Дерево «{name}» (#{tree_id}) полностью выросло"
+    return f"Дерево «{name}» (#{tree_id}) готово к улучшению до уровня {lvl + 1}"
+
+
+class GrowthScheduler:
+    """
+    Куча ближайших дедлайнов next_upgrade_at для деревьев, которые еще не созрели.
+
+    Окно (loaded_until, now + GROWTH_HORIZON] читается из частичного индекса
+    ix_trees_growth_due, поэтому память и работа пропорциональны числу дедлайнов
+    в окне, а не числу деревьев. Каждое сканирование также подбирает просроченные
+    дедлайны (дерево улучшили в другом воркере, процесс был перезапущен).
+    Созревание - условный UPDATE ... WHERE NOT is_ready, так что планировщики
+    в нескольких воркерах не создают дублей.
+    """
+
+    def __init__(self, horizon: float = GROWTH_HORIZON, batch: int = GROWTH_BATCH):
+        self.horizon = horizon
+        self.batch = batch
+        self._heap = []  # (timestamp, tree_id)
+        self._loaded_until = None
+        self._wakeup = asyncio.Event()
+        self.fired = 0
+        self.scanned = 0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, tree_id: int, deadline: datetime):
+        """Добавить дедлайн, записанный этим процессом (после коммита)"""
+        if self._loaded_until is None or deadline > self._loaded_until:
+            return  # дальний дедлайн попадет в кучу при сканировании своего окна
+        ts = _timestamp(deadline)
+        if not self._heap or ts < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (ts, tree_id))
+
+    async def scan(self, db, now: datetime | None = None) -> int:
+        """Подгрузить следующее окно дедлайнов и просроченные деревья"""
+        now = now or datetime.now(timezone.utc)
+        until = now + timedelta(seconds=self.horizon)
+        window = Tree.next_upgrade_at <= until
+        if self._loaded_until is not None:
+            window = and_(window, or_(Tree.next_upgrade_at <= now, Tree.next_upgrade_at > self._loaded_until))
+        result = await db.stream(
+            select(Tree.id, Tree.next_upgrade_at).where(Tree.is_ready == False, window)  # noqa: E712
+            .execution_options(yield_per=self.batch)
+        )
+        count = 0
+        async for tree_id, deadline in result:
+            heapq.heappush(self._heap, (_timestamp(deadline), tree_id))
+            count += 1
+        self._loaded_until = until
+        self.scanned += count
+        return count
+
+    def _pop_due(self, now_ts: float) -> list[int]:
+        due = []
+        while self._heap and self._heap[0][0] <= now_ts and len(due) < self.batch:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    async def fire(self, db, tree_ids: list[int], now: datetime) -> int:
+        """Отметить созревшие деревья и записать уведомления одной транзакцией"""
+        result = await db.execute(
+            update(Tree)
+            .where(Tree.id.in_(tree_ids), Tree.is_ready == False, Tree.next_upgrade_at <= now)  # noqa: E712
+            .values(is_ready=True)
+            .returning(Tree.id, Tree.created_by, Tree.name, Tree.lvl)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        inserted = await insert_notifications(db, [
+            {"user_id": created_by, "message": growth_message(name, tree_id, lvl)}
+            for tree_id, created_by, name, lvl in rows
+        ])
+        await db.commit()
+        await push_notifications(inserted)
+        self.fired += len(rows)
+        return len(rows)
+
+    async def run(self, session_factory, scan_interval: float = GROWTH_SCAN_INTERVAL):
+        """Фоновая задача: спит до ближайшего дедлайна или следующего сканирования"""
+        next_scan = 0.0
+        while True:
+            try:
+                if time.monotonic() >= next_scan:
+                    async with session_factory() as db:
+                        await self.scan(db)
+                    next_scan = time.monotonic() + scan_interval
+
+                now = datetime.now(timezone.utc)
+                due = self._pop_due(now.timestamp())
+                if due:
+                    async with session_factory() as db:
+                        fired = await self.fire(db, due, now)
+                    if fired:
+                        logger.info("Tree growth: %d trees matured", fired)
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Tree growth scheduler failed")
+                next_scan = time.monotonic() + scan_interval
+
+            timeout = next_scan - time.monotonic()
+            if self._heap:
+                timeout = min(timeout, self._heap[0][0] - time.time())
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0.01))
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {"pending": len(self._heap), "scanned": self.scanned, "fired": self.fired}
+
+
+_scheduler = GrowthScheduler()
+
+
+def get_growth_scheduler() -> GrowthScheduler:
+    return _scheduler
+
+
+async def run_growth_loop(session_factory):
+    if GROWTH_SCHEDULER != "on":
+        return
+    await _scheduler.run(session_factory)
@@ -0,0 +1,137 @@
+# app/hashing.py
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+load_dotenv()
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _timed(fn, *args):
+    """Выполняется в воркере: возвращает результат и чистое время bcrypt"""
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(password, hashed_password)
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class PasswordHasher:
+    """
+    Выносит bcrypt из event loop в ограниченный пул потоков/процессов.
+
+    Одновременно принимается не больше workers + queue_size операций;
+    остальные сразу получают 503, чтобы очередь не росла бесконечно.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, queue_size: int = PASSWORD_HASH_QUEUE,
+                 kind: str = PASSWORD_HASH_EXECUTOR):
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwd-hash")
+        self.kind = kind
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._hash_sec = deque(maxlen=1024)
+        self._wait_sec = deque(maxlen=1024)
+
+    async def _run(self, fn, *args):
+        # event loop однопоточный, поэтому счетчик не требует блокировок
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_sec = await loop.run_in_executor(self._executor, _timed, fn, *args)
+        finally:
+            self.in_flight -= 1
+        self.completed += 1
+        self._hash_sec.append(hash_sec)
+        self._wait_sec.append(time.perf_counter() - started - hash_sec)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, password, hashed_password)
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.workers)
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.kind,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_ms_p50": round(_percentile(self._hash_sec, 0.50) * 1000, 2),
+            "hash_ms_p99": round(_percentile(self._hash_sec, 0.99) * 1000, 2),
+            "wait_ms_p50": round(_percentile(self._wait_sec, 0.50) * 1000, 2),
+            "wait_ms_p99": round(_percentile(self._wait_sec, 0.99) * 1000, 2),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher: PasswordHasher | None = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher()
+    return _hasher
+
+
+async def hash_password(password: str) -> str:
+    return await get_password_hasher().hash(password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await get_password_hasher().verify(password, hashed_password)
+
+
+def shutdown_password_hasher():
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
@@ -0,0 +1,174 @@
+# app/idempotency.py
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache, get_redis
+from app.dependencies import get_current_user
+from app.logging_config import logger
+
+load_dotenv()
+
+IDEMPOTENCY_BACKEND = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # memory | redis
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+# сколько держится отметка "запрос выполняется", если процесс упал, не завершив его
+IDEMPOTENCY_LOCK_TTL = float(os.getenv("IDEMPOTENCY_LOCK_TTL", "60"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+
+class MemoryIdempotencyStore:
+    """Ответы по ключам идемпотентности в памяти процесса (LRU + TTL)"""
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE):
+        self._records = TTLCache(maxsize, IDEMPOTENCY_TTL)
+        self.replays = 0
+
+    async def begin(self, key: str, fingerprint: str) -> dict | None:
+        """Занять ключ; если он уже занят или выполнен - вернуть его запись"""
+        record = self._records.get(key)
+        if record is not None:
+            return record
+        self._records.set(key, {"fingerprint": fingerprint, "status": None}, ttl=IDEMPOTENCY_LOCK_TTL)
+        return None
+
+    async def complete(self, key: str, record: dict):
+        self._records.set(key, record)
+
+    async def abandon(self, key: str):
+        self._records.pop(key)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "replays": self.replays, **self._records.stats()}
+
+
+class RedisIdempotencyStore:
+    """Общее для всех воркеров хранилище в Redis; при недоступности Redis запросы выполняются без защиты"""
+
+    def __init__(self, redis, prefix: str = "idempotency"):
+        self._redis = redis
+        self._prefix = prefix
+        self.replays = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self._prefix}:{key}"
+
+    async def begin(self, key: str, fingerprint: str) -> dict | None:
+        pending = json.dumps({"fingerprint": fingerprint, "status": None})
+        try:
+            if await self._redis.set(self._key(key), pending, nx=True, ex=int(IDEMPOTENCY_LOCK_TTL)):
+                return None
+            raw = await self._redis.get(self._key(key))
+        except RedisError as e:
+            logger.warning("Idempotency store begin failed: %s", e)
+            return None
+        # ключ мог истечь между SET NX и GET
+        return json.loads(raw) if raw else None
+
+    async def complete(self, key: str, record: dict):
+        try:
+            await self._redis.set(self._key(key), json.dumps(record), ex=int(IDEMPOTENCY_TTL))
+        except RedisError as e:
+            logger.warning("Idempotency store complete failed: %s", e)
+
+    async def abandon(self, key: str):
+        try:
+            await self._redis.delete(self._key(key))
+        except RedisError as e:
+            logger.warning("Idempotency store abandon failed: %s", e)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "replays": self.replays}
+
+
+_store = None
+
+
+def get_idempotency_store():
+    global _store
+    if _store is None:
+        redis = get_redis() if IDEMPOTENCY_BACKEND == "redis" else None
+        _store = RedisIdempotencyStore(redis) if redis is not None else MemoryIdempotencyStore()
+    return _store
+
+
+class IdempotentRequest:
+    """Выполняет обработчик не более одного раза на ключ; повтор получает сохраненный ответ"""
+
+    def __init__(self, key: str | None, fingerprint: str | None, response: Response):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.response = response
+
+    @property
+    def record_key(self) -> str | None:
+        """
+        Ключ для уникальной колонки в БД (coin_ledger.idempotency_key, games_result.ingest_id).
+        Пишется в одной транзакции с изменением: если процесс упал после коммита, но до
+        complete(), повтор после IDEMPOTENCY_LOCK_TTL не выполнит списание второй раз.
+        """
+        return hashlib.sha256(self.key.encode()).hexdigest()[:32] if self.key else None
+
+    def _replay(self, record: dict):
+        if record["fingerprint"] != self.fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was used with a different request")
+        if record["status"] is None:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is in progress")
+        get_idempotency_store().replays += 1
+        return JSONResponse(
+            content=record["body"],
+            status_code=record["status"],
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def run(self, handler):
+        """handler - корутина-функция без аргументов, выполняющая запись"""
+        if self.key is None:
+            return await handler()
+
+        store = get_idempotency_store()
+        record = await store.begin(self.key, self.fingerprint)
+        if record is not None:
+            return self._replay(record)
+
+        try:
+            result = await handler()
+        except HTTPException as e:
+            # 4xx - окончательный ответ на этот запрос; 5xx можно повторить с тем же ключом
+            if e.status_code < 500:
+                await store.complete(self.key, {
+                    "fingerprint": self.fingerprint, "status": e.status_code, "body": {"detail": e.detail},
+                })
+            else:
+                await store.abandon(self.key)
+            raise
+        except BaseException:
+            await store.abandon(self.key)
+            raise
+
+        await store.complete(self.key, {
+            "fingerprint": self.fingerprint,
+            "status": self.response.status_code or 200,
+            "body": jsonable_encoder(result),
+        })
+        return result
+
+
+async def idempotency(request: Request, response: Response, user=Depends(get_current_user)) -> IdempotentRequest:
+    """Зависимость для пишущих эндпоинтов: ключ из заголовка Idempotency-Key, область - пользователь и путь"""
+    key = request.headers.get("idempotency-key")
+    if key is None:
+        return IdempotentRequest(None, None, response)
+    if not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+    body = await request.body()
+    fingerprint = hashlib.sha256(
+        b"\0".join([request.method.encode(), request.url.path.encode(), request.url.query.encode(), body])
+    ).hexdigest()
+    return IdempotentRequest(f"{user.id}:{request.url.path}:{key}", fingerprint, response)
@@ -0,0 +1,106 @@
+# app/identity_cache.py
+import os
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache, get_redis
+from app.logging_config import logger
+from app.schemas.users import UserInDB
+
+load_dotenv()
+
+IDENTITY_CACHE_BACKEND = os.getenv("IDENTITY_CACHE_BACKEND", "memory")  # memory | redis
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+
+class MemoryIdentityCache:
+    """Снимки пользователей по email (sub токена) в памяти процесса"""
+
+    def __init__(self, maxsize: int = IDENTITY_CACHE_SIZE, ttl: float = IDENTITY_CACHE_TTL):
+        self._by_email = TTLCache(maxsize, ttl)
+        self._email_by_id = TTLCache(maxsize, ttl)
+
+    async def get(self, email: str) -> UserInDB | None:
+        user = self._by_email.get(email)
+        if user is None:
+            return None
+        # обратный индекс тоже поднимаем в LRU: без него invalidate(user_id) не найдет снимок
+        if self._email_by_id.get(user.id) != email:
+            self._by_email.pop(email)
+            return None
+        return user
+
+    async def set(self, user: UserInDB):
+        self._by_email.set(user.email_user, user)
+        self._email_by_id.set(user.id, user.email_user)
+
+    async def invalidate(self, user_id: int):
+        email = self._email_by_id.pop(user_id)
+        if email is not None:
+            self._by_email.pop(email)
+
+    def stats(self) -> dict:
+        return {"backend": "memory", **self._by_email.stats()}
+
+
+class RedisIdentityCache:
+    """Общий для всех воркеров кэш в Redis; при недоступности Redis работает как промах"""
+
+    def __init__(self, redis, ttl: float = IDENTITY_CACHE_TTL, prefix: str = "identity"):
+        self._redis = redis
+        self._ttl = int(ttl)
+        self._prefix = prefix
+
+    def _email_key(self, email: str) -> str:
+        return f"{self._prefix}:email:{email}"
+
+    def _id_key(self, user_id: int) -> str:
+        return f"{self._prefix}:id:{user_id}"
+
+    async def get(self, email: str) -> UserInDB | None:
+        try:
+            raw = await self._redis.get(self._email_key(email))
+        except RedisError as e:
+            logger.warning("Identity cache get failed: %s", e)
+            return None
+        return UserInDB.parse_raw(raw) if raw else None
+
+    async def set(self, user: UserInDB):
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.set(self._email_key(user.email_user), user.json(), ex=self._ttl)
+                pipe.set(self._id_key(user.id), user.email_user, ex=self._ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Identity cache set failed: %s", e)
+
+    async def invalidate(self, user_id: int):
+        try:
+            email = await self._redis.getdel(self._id_key(user_id))
+            if email:
+                await self._redis.delete(self._email_key(email))
+        except RedisError as e:
+            logger.warning("Identity cache invalidate failed: %s", e)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "ttl": self._ttl}
+
+
+_identity_cache = None
+
+
+def get_identity_cache():
+    global _identity_cache
+    if _identity_cache is None:
+        redis = get_redis() if IDENTITY_CACHE_BACKEND == "redis" else None
+        if redis is not None:
+            _identity_cache = RedisIdentityCache(redis)
+        else:
+            _identity_cache = MemoryIdentityCache()
+    return _identity_cache
+
+
+async def invalidate_user(user_id: int):
+    """Сбросить снимок пользователя после изменения его строки в БД"""
+    await get_identity_cache().invalidate(user_id)
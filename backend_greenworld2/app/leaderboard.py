@@ -0,0 +1,328 @@
+# app/leaderboard.py
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cache import get_redis
+from app.logging_config import logger
+from app.models.player_stats import PlayerStats
+from app.models.users import User
+
+load_dotenv()
+
+LEADERBOARD_BACKEND = os.getenv("LEADERBOARD_BACKEND", "memory")  # memory | redis
+# как часто локальный рейтинг подтягивает изменения других воркеров
+LEADERBOARD_SYNC_INTERVAL = float(os.getenv("LEADERBOARD_SYNC_INTERVAL", "10"))
+# перекрытие окна синхронизации: updated_at ставится в начале транзакции, а не при коммите
+LEADERBOARD_SYNC_GRACE = 60.0
+LEADERBOARD_LOAD_CHUNK = 10000
+
+
+async def record_games_many(db: AsyncSession, totals: dict[int, tuple[int, int]]) -> dict[int, int]:
+    """
+    Прибавить к агрегатам игроков {user_id: (очки, игры)} одним многострочным upsert.
+    Коммит - на вызывающей стороне. Возвращает новые total_score по user_id.
+    """
+    if not totals:
+        return {}
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(PlayerStats.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PlayerStats.user_id],
+        set_={
+            "total_score": PlayerStats.total_score + stmt.excluded.total_score,
+            "games_played": PlayerStats.games_played + stmt.excluded.games_played,
+            "updated_at": func.now(),
+        },
+    ).returning(PlayerStats.user_id, PlayerStats.total_score)
+    result = await db.execute(stmt, [
+        {"user_id": user_id, "total_score": score, "games_played": games}
+        for user_id, (score, games) in totals.items()
+    ])
+    return dict(result.all())
+
+
+async def record_games(db: AsyncSession, user_id: int, score: int, games: int = 1) -> int:
+    """Прибавить результаты к агрегатам одного игрока; возвращает новый total_score"""
+    return (await record_games_many(db, {user_id: (score, games)}))[user_id]
+
+
+class RankIndex:
+    """
+    Отсортированный список ключей, разбитый на корзины по ~LOAD элементов.
+
+    Вставка и удаление сдвигают одну корзину, а не весь список. Размеры корзин
+    хранятся в дереве Фенвика, поэтому позиция ключа и поиск по позиции - O(log n).
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        self._buckets = []
+        self._maxes = []
+        self._tree = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _rebuild_tree(self):
+        tree = [len(b) for b in self._buckets]
+        for i in range(len(tree)):
+            j = i | (i + 1)
+            if j < len(tree):
+                tree[j] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, i: int, delta: int):
+        tree = self._tree
+        while i < len(tree):
+            tree[i] += delta
+            i |= i + 1
+
+    def _prefix(self, i: int) -> int:
+        """Число ключей в корзинах [0, i)"""
+        total = 0
+        tree = self._tree
+        while i > 0:
+            total += tree[i - 1]
+            i &= i - 1
+        return total
+
+    def _locate(self, pos: int) -> tuple[int, int]:
+        """(корзина, смещение) для позиции pos"""
+        tree = self._tree
+        b, step = 0, 1 << len(tree).bit_length()
+        while step:
+            nxt = b + step
+            if nxt <= len(tree) and tree[nxt - 1] <= pos:
+                pos -= tree[nxt - 1]
+                b = nxt
+            step >>= 1
+        return b, pos
+
+    def load(self, keys):
+        keys = sorted(keys)
+        self._buckets = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [b[-1] for b in self._buckets]
+        self._len = len(keys)
+        self._rebuild_tree()
+
+    def add(self, key):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._rebuild_tree()
+            return
+        b = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[b]
+        insort(bucket, key)
+        self._maxes[b] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self.LOAD:
+            self._buckets[b:b + 1] = [bucket[:self.LOAD], bucket[self.LOAD:]]
+            self._maxes[b:b + 1] = [bucket[self.LOAD - 1], bucket[-1]]
+            self._rebuild_tree()
+        else:
+            self._tree_add(b, 1)
+
+    def remove(self, key):
+        b = bisect_left(self._maxes, key)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, key)]
+        self._len -= 1
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._tree_add(b, -1)
+        else:
+            del self._buckets[b]
+            del self._maxes[b]
+            self._rebuild_tree()
+
+    def position(self, key) -> int:
+        """Число ключей меньше key"""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            return self._len
+        return self._prefix(b) + bisect_left(self._buckets[b], key)
+
+    def slice(self, start: int, stop: int) -> list:
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return []
+        b, i = self._locate(start)
+        out = []
+        while len(out) < stop - start:
+            bucket = self._buckets[b]
+            out.extend(bucket[i:i + stop - start - len(out)])
+            b, i = b + 1, 0
+        return out
+
+
+class MemoryLeaderboard:
+    """Рейтинг в памяти процесса; изменения других воркеров догружаются по updated_at"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._keys = {}  # user_id -> (-total_score, user_id)
+        self._index = RankIndex()
+        self.synced_at = 0.0
+        self._synced_until = None
+
+    async def load(self, db: AsyncSession):
+        started = datetime.now(timezone.utc)
+        result = await db.stream(
+            select(PlayerStats.user_id, PlayerStats.total_score).execution_options(yield_per=LEADERBOARD_LOAD_CHUNK)
+        )
+        self.replace([row async for row in result])
+        self._synced_until = started
+        self.synced_at = time.monotonic()
+
+    def replace(self, rows):
+        """Заменить весь рейтинг парами (user_id, total_score)"""
+        self._keys = {user_id: (-score, user_id) for user_id, score in rows}
+        self._index.load(self._keys.values())
+
+    async def sync(self, db: AsyncSession):
+        if self._synced_until is None:
+            return await self.load(db)
+        started = datetime.now(timezone.utc)
+        since = self._synced_until - timedelta(seconds=LEADERBOARD_SYNC_GRACE)
+        result = await db.execute(
+            select(PlayerStats.user_id, PlayerStats.total_score).where(PlayerStats.updated_at >= since)
+        )
+        for user_id, score in result:
+            await self.update(user_id, score)
+        self._synced_until = started
+        self.synced_at = time.monotonic()
+
+    async def update(self, user_id: int, total_score: int):
+        key = (-total_score, user_id)
+        old = self._keys.get(user_id)
+        # сумма очков только растет: запоздавшее обновление с меньшей суммой устарело
+        if old is not None and old <= key:
+            return
+        if old is not None:
+            self._index.remove(old)
+        self._index.add(key)
+        self._keys[user_id] = key
+
+    async def rank(self, user_id: int) -> int | None:
+        key = self._keys.get(user_id)
+        return None if key is None else self._index.position(key)
+
+    async def entries(self, start: int, stop: int) -> list[tuple[int, int]]:
+        return [(user_id, -neg_score) for neg_score, user_id in self._index.slice(start, stop)]
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "players": len(self._index)}
+
+
+class RedisLeaderboard:
+    """Общий для всех воркеров рейтинг в sorted set Redis"""
+
+    backend = "redis"
+
+    def __init__(self, redis, key: str = "leaderboard:score"):
+        self._redis = redis
+        self._key = key
+        self.synced_at = float("inf")  # синхронизация не нужна
+
+    async def load(self, db: AsyncSession):
+        """Заполнить sorted set из БД, если его еще нет (первый запуск или сброс Redis)"""
+        try:
+            if await self._redis.exists(self._key):
+                return
+            result = await db.stream(
+                select(PlayerStats.user_id, PlayerStats.total_score).execution_options(yield_per=LEADERBOARD_LOAD_CHUNK)
+            )
+            async for rows in result.partitions():
+                await self._redis.zadd(self._key, {str(user_id): score for user_id, score in rows})
+        except RedisError as e:
+            logger.warning("Leaderboard load failed: %s", e)
+
+    async def sync(self, db: AsyncSession):
+        pass
+
+    async def update(self, user_id: int, total_score: int):
+        try:
+            # GT: сумма только растет, и обновление, пришедшее после более нового, не откатит ее
+            await self._redis.zadd(self._key, {str(user_id): total_score}, gt=True)
+        except RedisError as e:
+            # значение в БД верное; sorted set исправится при следующем результате игрока
+            logger.warning("Leaderboard update failed: %s", e)
+
+    async def rank(self, user_id: int) -> int | None:
+        try:
+            return await self._redis.zrevrank(self._key, str(user_id))
+        except RedisError as e:
+            logger.warning("Leaderboard rank failed: %s", e)
+            raise HTTPException(status_code=503, detail="Leaderboard unavailable")
+
+    async def entries(self, start: int, stop: int) -> list[tuple[int, int]]:
+        if stop <= start:
+            return []
+        try:
+            rows = await self._redis.zrevrange(self._key, max(start, 0), stop - 1, withscores=True)
+        except RedisError as e:
+            logger.warning("Leaderboard range failed: %s", e)
+            raise HTTPException(status_code=503, detail="Leaderboard unavailable")
+        return [(int(member), int(score)) for member, score in rows]
+
+    def stats(self) -> dict:
+        return {"backend": self.backend}
+
+
+_leaderboard = None
+
+
+def get_leaderboard():
+    global _leaderboard
+    if _leaderboard is None:
+        redis = get_redis() if LEADERBOARD_BACKEND == "redis" else None
+        _leaderboard = RedisLeaderboard(redis) if redis is not None else MemoryLeaderboard()
+    return _leaderboard
+
+
+async def load_leaderboard(db: AsyncSession):
+    await get_leaderboard().load(db)
+
+
+async def get_synced_leaderboard(db: AsyncSession):
+    board = get_leaderboard()
+    if time.monotonic() - board.synced_at > LEADERBOARD_SYNC_INTERVAL:
+        await board.sync(db)
+    return board
+
+
+async def describe_entries(db: AsyncSession, start: int, entries: list[tuple[int, int]]) -> list[dict]:
+    """Дополнить страницу рейтинга именами и числом игр (один запрос по первичным ключам)"""
+    if not entries:
+        return []
+    result = await db.execute(
+        select(User.id, User.full_name, PlayerStats.games_played)
+        .join(PlayerStats, PlayerStats.user_id == User.id)
+        .where(User.id.in_([user_id for user_id, _ in entries]))
+    )
+    info = {user_id: (name, games) for user_id, name, games in result}
+    out = []
+    for offset, (user_id, score) in enumerate(entries):
+        name, games = info.get(user_id, (None, 0))
+        out.append({
+            "rank": start + offset + 1,
+            "user_id": user_id,
+            "nickname": name,
+            "total_score": score,
+            "games_played": games,
+            "avg_score": round(score / games, 2) if games else 0.0,
+        })
+    return out
@@ -0,0 +1,207 @@
+# app/ledger.py
+import asyncio
+import os
+from fastapi import HTTPException
+from sqlalchemy import Text, bindparam, cast, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from app.logging_config import logger
+from app.models.coin_ledger import CoinLedger, CoinBalance
+from app.models.users import User
+
+load_dotenv()
+
+COIN_COMPACTION_INTERVAL = float(os.getenv("COIN_COMPACTION_INTERVAL", "30"))
+COIN_COMPACTION_BATCH = int(os.getenv("COIN_COMPACTION_BATCH", "50000"))
+
+LEDGER_INSERT_CHUNK = 1000
+_COMPACTION_LOCK_ID = 70041  # pg_advisory_xact_lock
+
+# PostgreSQL: (max id, xmax снимка) - граница, которую можно свернуть после завершения
+# всех транзакций, начатых до снимка (см. _settled_cutoff)
+_pending_cutoff = None
+
+
+def balance_column():
+    """
+    Баланс строки users = снимок (или users.coins, пока снимка нет) + хвост журнала после снимка.
+    Запрос должен присоединять coin_balances (with_balance); хвост - диапазон (user_id, id) в coin_ledger.
+    """
+    tail = (
+        select(func.coalesce(func.sum(CoinLedger.delta), 0))
+        .where(CoinLedger.user_id == User.id, CoinLedger.id > func.coalesce(CoinBalance.last_entry_id, 0))
+        .scalar_subquery()
+    )
+    return func.coalesce(CoinBalance.balance, User.coins, 0) + tail
+
+
+def with_balance(query):
+    return query.outerjoin(CoinBalance, CoinBalance.user_id == User.id)
+
+
+def balance_select(user_id: int):
+    """Один индексный поиск по coin_balances и диапазон (user_id, id) в coin_ledger"""
+    return with_balance(select(balance_column()).select_from(User)).where(User.id == user_id)
+
+
+async def get_balance(db: AsyncSession, user_id: int) -> int | None:
+    result = await db.execute(balance_select(user_id))
+    return result.scalar_one_or_none()
+
+
+async def append_entries(db: AsyncSession, entries: list[dict]):
+    """Пакетная запись в журнал (executemany одним кэшируемым оператором); коммит - на вызывающей стороне"""
+    if db.bind.dialect.name == "postgresql":
+        # xid транзакции назначается до выдачи id записей: на этом держится граница компакции
+        await db.execute(select(func.pg_current_xact_id()))
+    for start in range(0, len(entries), LEDGER_INSERT_CHUNK):
+        await db.execute(insert(CoinLedger.__table__), entries[start:start + LEDGER_INSERT_CHUNK])
+
+
+async def credit_coins(db: AsyncSession, user_id: int, amount: int, reason: str):
+    """Начисление не читает и не блокирует строку пользователя"""
+    if amount:
+        await append_entries(db, [{"user_id": user_id, "delta": amount, "reason": reason}])
+
+
+async def debit_coins(db: AsyncSession, user_id: int, amount: int, reason: str,
+                      idempotency_key: str | None = None) -> int:
+    """
+    Списание с проверкой баланса. Возвращает новый баланс или откатывает транзакцию с 402.
+
+    idempotency_key пишется в запись журнала той же транзакцией: запрос, чье списание
+    уже закоммичено, получает 409, даже если хранилище ключей идемпотентности этого не знает.
+
+    PostgreSQL: FOR NO KEY UPDATE на строке пользователя сериализует списания,
+    не мешая начислениям (им нужен только KEY SHARE для внешнего ключа).
+    SQLite: INSERT в журнал берет блокировку записи до чтения баланса.
+    """
+    await db.execute(select(User.id).where(User.id == user_id).with_for_update(key_share=True))
+    try:
+        await append_entries(db, [
+            {"user_id": user_id, "delta": -amount, "reason": reason, "idempotency_key": idempotency_key}
+        ])
+    except IntegrityError:
+        await db.rollback()
+        if idempotency_key is None:
+            raise
+        raise HTTPException(status_code=409, detail="Request with this Idempotency-Key was already applied")
+    balance = await get_balance(db, user_id)
+    if balance is None or balance < 0:
+        await db.rollback()
+        raise HTTPException(status_code=402, detail="Not enough coins")
+    return balance
+
+
+async def _acquire_compaction_lock(db: AsyncSession) -> bool:
+    if db.bind.dialect.name == "postgresql":
+        result = await db.execute(select(func.pg_try_advisory_xact_lock(_COMPACTION_LOCK_ID)))
+        return bool(result.scalar())
+    # SQLite: пустой UPDATE открывает транзакцию записи, остальные компакторы ждут
+    await db.execute(update(CoinBalance).where(CoinBalance.user_id == -1).values(balance=CoinBalance.balance))
+    return True
+
+
+async def _settled_cutoff(db: AsyncSession, watermark: int, batch: int) -> int | None:
+    """
+    Граница окна свертки: все записи журнала с id <= cutoff уже закоммичены или откачены.
+
+    id выдается при вставке, а видимой запись становится при коммите: транзакция, открытая
+    раньше, может закоммитить меньший id после более позднего. Поэтому max(id) нельзя брать
+    как есть. SQLite: компакция уже держит блокировку записи, других писателей нет.
+    PostgreSQL: max(id) запоминается вместе с xmax снимка и сворачивается при следующем
+    проходе, когда xmin текущего снимка дорос до этого xmax, то есть завершились все
+    транзакции, которые к моменту снимка могли получить id (см. append_entries).
+    """
+    global _pending_cutoff
+    window = select(func.max(CoinLedger.id)).where(CoinLedger.id > watermark, CoinLedger.id <= watermark + batch)
+    if db.bind.dialect.name != "postgresql":
+        return (await db.execute(window)).scalar_one()
+
+    snapshot = func.pg_current_snapshot()
+    candidate, xmin, xmax = (await db.execute(
+        select(window.scalar_subquery(), cast(func.pg_snapshot_xmin(snapshot), Text),
+               cast(func.pg_snapshot_xmax(snapshot), Text))
+    )).one()
+    cutoff = None
+    if _pending_cutoff is not None:
+        pending, pending_xmax = _pending_cutoff
+        if int(xmin) >= pending_xmax:
+            cutoff = pending if pending > watermark else None
+            _pending_cutoff = None
+    if _pending_cutoff is None and candidate is not None and candidate > (cutoff or watermark):
+        _pending_cutoff = (candidate, int(xmax))
+    return cutoff
+
+
+async def compact_balances(db: AsyncSession, batch: int = COIN_COMPACTION_BATCH) -> int:
+    """
+    Свернуть очередное окно журнала (watermark, cutoff] в coin_balances.
+
+    watermark - максимальный last_entry_id: все записи до него уже учтены для всех пользователей,
+    поэтому окно читается диапазоном по первичному ключу. Возвращает число обновленных пользователей.
+    """
+    if not await _acquire_compaction_lock(db):
+        await db.rollback()
+        return 0
+
+    watermark = (await db.execute(select(func.coalesce(func.max(CoinBalance.last_entry_id), 0)))).scalar_one()
+    cutoff = await _settled_cutoff(db, watermark, batch)
+    if cutoff is None:
+        await db.rollback()
+        return 0
+
+    rows = (await db.execute(
+        select(CoinLedger.user_id, func.sum(CoinLedger.delta), CoinBalance.balance, User.coins)
+        .join(User, User.id == CoinLedger.user_id)
+        .outerjoin(CoinBalance, CoinBalance.user_id == CoinLedger.user_id)
+        .where(CoinLedger.id > watermark, CoinLedger.id <= cutoff)
+        .group_by(CoinLedger.user_id, CoinBalance.balance, User.coins)
+    )).all()
+
+    existing, created, mirrored = [], [], []
+    for user_id, delta, balance, coins in rows:
+        new_balance = (coins or 0) + delta if balance is None else balance + delta
+        if balance is None:
+            created.append({"user_id": user_id, "balance": new_balance, "last_entry_id": cutoff})
+        else:
+            existing.append({"b_user_id": user_id, "b_balance": new_balance})
+        mirrored.append({"u_id": user_id, "u_coins": new_balance})
+
+    try:
+        if created:
+            await db.execute(insert(CoinBalance).values(created))
+        if existing:
+            await db.execute(
+                update(CoinBalance.__table__)
+                .where(CoinBalance.user_id == bindparam("b_user_id"))
+                .values(balance=bindparam("b_balance"), last_entry_id=cutoff),
+                existing,
+            )
+        # users.coins - зеркало снимка для чтений, которым не нужен точный баланс
+        await db.execute(
+            update(User.__table__).where(User.id == bindparam("u_id")).values(coins=bindparam("u_coins")),
+            mirrored,
+        )
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        return 0
+    return len(rows)
+
+
+async def run_compaction_loop(session_factory, interval: float = COIN_COMPACTION_INTERVAL):
+    """Фоновая задача: периодически сворачивает журнал, пока ее не отменят"""
+    while True:
+        try:
+            async with session_factory() as db:
+                folded = await compact_balances(db)
+            if folded:
+                logger.info("Coin ledger compaction: %d balances folded", folded)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Coin ledger compaction failed")
+        await asyncio.sleep(interval)
@@ -1,30 +1,217 @@
+import atexit
+import copy
+import json
 import logging
 import os
-from datetime import datetime
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from dotenv import load_dotenv
+
+load_dotenv()
 
 script_dir = os.path.dirname(os.path.abspath(__file__))
-log_dir = os.path.join(script_dir, "logs")
 
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir, exist_ok=True)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_DIR = os.getenv("LOG_DIR", os.path.join(script_dir, "logs"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+# файл с ротацией; при нескольких воркерах gunicorn.conf.py выключает его - пишем в stdout,
+# ротацию делает платформа. Если включить явно, каждый воркер пишет в свой <name>.<слот>.log
+LOG_FILE = os.getenv("LOG_FILE", "true").lower() == "true"
+# ротация по размеру, если LOG_MAX_BYTES > 0, иначе по времени (LOG_ROTATE_WHEN)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", "0"))
+LOG_ROTATE_WHEN = os.getenv("LOG_ROTATE_WHEN", "midnight")
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+# записи ждут фонового писателя в ограниченной очереди; при переполнении отбрасываются
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# доля сохраняемых записей INFO и ниже по логгерам, например "app.auth=0.1,app.access=0.01"
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+_plain = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает долю rate записей уровня INFO и ниже для логгера и его потомков; WARNING и выше - всегда"""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        # длинные имена первыми: app.auth.login важнее app.auth
+        self.rates = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self.sampled_out = 0
+
+    def _rate(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0 or random.random() < rate:
+            return True
+        self.sampled_out += 1
+        return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler, который не ждет и не пишет в stderr при переполнении очереди"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # аргументы подставляются здесь, пока объекты не изменились; трейсбек - отдельно от текста
+        record = copy.copy(record)
+        record.message = record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _plain.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sampling(spec: str) -> dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def _file_handler(log_file: str) -> logging.Handler:
+    if LOG_MAX_BYTES > 0:
+        return RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    return TimedRotatingFileHandler(log_file, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+                                    encoding="utf-8", utc=True)
+
+
+_queue_handler = None
+_listener = None
+_sampling = None
+_log_name = None
+_formatter = None
+
 
 def setup_logger(name="app"):
+    """
+    Логгер, который только кладет записи в очередь; файл (с ротацией) и консоль
+    пишет фоновый поток QueueListener, так что event loop не ждет диск.
+    """
+    global _queue_handler, _listener, _sampling, _log_name, _formatter
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    
+    logger.setLevel(LOG_LEVEL)
+
     if not logger.handlers:
-        log_file = os.path.join(log_dir, f"app_{datetime.now().strftime('%Y-%m-%d')}.log")
-        
-        file_handler = logging.FileHandler(log_file, mode="a", encoding="utf-8")
-        formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
-        file_handler.setFormatter(formatter)
-        
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-    
+        _formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+        _log_name = name
+
+        handlers = []
+        if LOG_FILE:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            handlers.append(_file_handler(os.path.join(LOG_DIR, f"{name}.log")))
+        if LOG_CONSOLE:
+            handlers.append(logging.StreamHandler())
+        for handler in handlers:
+            handler.setFormatter(_formatter)
+
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        _queue_handler = NonBlockingQueueHandler(log_queue)
+        _sampling = SamplingFilter(parse_sampling(LOG_SAMPLING))
+        _queue_handler.addFilter(_sampling)
+        logger.addHandler(_queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        # дописать очередь при завершении процесса
+        atexit.register(_listener.stop)
+
     return logger
 
-logger = setup_logger("app")
\ No newline at end of file
+
+def _console_handlers() -> list[logging.Handler]:
+    return [handler for handler in _listener.handlers if not isinstance(handler, logging.FileHandler)]
+
+
+def _restart_listener_after_fork():
+    """
+    В дочернем процессе (gunicorn --preload, пул хэширования, Celery prefork) потока-писателя
+    нет, а очередь могла остаться захваченной: новая очередь и новый QueueListener.
+    Файл мастера дочерний процесс не пишет - ротация из нескольких процессов затирает
+    архивы друг друга: записи идут в консоль, воркер gunicorn открывает свой файл (open_worker_log).
+    """
+    global _listener
+    if _listener is None:
+        return
+    handlers = _console_handlers()
+    if not handlers and LOG_FILE:
+        handler = logging.StreamHandler()
+        handler.setFormatter(_formatter)
+        handlers = [handler]
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def open_worker_log(slot: int):
+    """
+    Файл <name>.<slot>.log воркера gunicorn (post_fork в gunicorn.conf.py). Слот переходит
+    к воркеру, заменившему упавший или перезапущенный, так что число файлов не растет.
+    """
+    if _listener is None or not LOG_FILE:
+        return
+    handler = _file_handler(os.path.join(LOG_DIR, f"{_log_name}.{slot}.log"))
+    handler.setFormatter(_formatter)
+    # поток-писатель читает handlers на каждой записи: подмена кортежа атомарна
+    _listener.handlers = (handler, *(_console_handlers() if LOG_CONSOLE else ()))
+
+
+os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Дочерний логгер app.<name>: пишет через общую очередь, семплируется по своему имени"""
+    return logging.getLogger(f"app.{name}")
+
+
+def logging_stats() -> dict:
+    if _queue_handler is None:
+        return {}
+    return {
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+        "sampled_out": _sampling.sampled_out,
+    }
+
+logger = setup_logger("app")
@@ -0,0 +1,212 @@
+# app/login_guard.py
+import os
+import time
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache, get_redis
+from app.logging_config import logger
+
+load_dotenv()
+
+LOGIN_GUARD_BACKEND = os.getenv("LOGIN_GUARD_BACKEND", "memory")  # memory | redis
+# неудачные попытки считаются в скользящем окне
+LOGIN_FAILURE_WINDOW = int(os.getenv("LOGIN_FAILURE_WINDOW", "900"))
+# сколько неудач подряд проходит без задержки: для аккаунта и для адреса (за ним бывает NAT)
+LOGIN_ACCOUNT_FREE_ATTEMPTS = int(os.getenv("LOGIN_ACCOUNT_FREE_ATTEMPTS", "3"))
+LOGIN_IP_FREE_ATTEMPTS = int(os.getenv("LOGIN_IP_FREE_ATTEMPTS", "20"))
+# задержка после каждой следующей неудачи: base, 2*base, 4*base ... не больше max
+LOGIN_BACKOFF_BASE = float(os.getenv("LOGIN_BACKOFF_BASE", "1"))
+LOGIN_BACKOFF_MAX = float(os.getenv("LOGIN_BACKOFF_MAX", "900"))
+# после стольких неудач в окне аккаунт блокируется в БД (is_active = false); 0 - не блокировать
+LOGIN_LOCKOUT_ATTEMPTS = int(os.getenv("LOGIN_LOCKOUT_ATTEMPTS", "5"))
+LOGIN_GUARD_CACHE_SIZE = int(os.getenv("LOGIN_GUARD_CACHE_SIZE", "100000"))
+
+
+def sliding_count(previous: int, current: int, window: int, now: float) -> float:
+    """Оценка числа событий за последние window секунд по двум соседним фиксированным окнам"""
+    elapsed = (now % window) / window
+    return previous * (1 - elapsed) + current
+
+
+def backoff_delay(failures: float, free_attempts: int) -> float:
+    excess = int(failures) - free_attempts
+    if excess <= 0:
+        return 0.0
+    return min(LOGIN_BACKOFF_MAX, LOGIN_BACKOFF_BASE * 2 ** min(excess - 1, 32))
+
+
+class MemoryFailureStore:
+    """Счетчики неудач и блокировки в памяти процесса"""
+
+    backend = "memory"
+
+    def __init__(self, window: int = LOGIN_FAILURE_WINDOW, maxsize: int = LOGIN_GUARD_CACHE_SIZE):
+        self.window = window
+        self._counters = TTLCache(maxsize, 2 * window)  # key -> (номер окна, в текущем, в предыдущем)
+        self._blocks = TTLCache(maxsize, LOGIN_BACKOFF_MAX)  # key -> заблокирован до (time.time)
+
+    async def blocked_for(self, keys: list[str]) -> float:
+        now = time.time()
+        return max((self._blocks.get(key, now) - now for key in keys), default=0.0)
+
+    async def add_failure(self, keys: list[str]) -> list[float]:
+        now = time.time()
+        index = int(now // self.window)
+        counts = []
+        for key in keys:
+            window_index, current, previous = self._counters.get(key, (index, 0, 0))
+            if window_index != index:
+                previous = current if window_index == index - 1 else 0
+                current = 0
+            current += 1
+            self._counters.set(key, (index, current, previous))
+            counts.append(sliding_count(previous, current, self.window, now))
+        return counts
+
+    async def block(self, blocks: dict[str, float]):
+        now = time.time()
+        for key, seconds in blocks.items():
+            self._blocks.set(key, now + seconds, ttl=seconds)
+
+    async def reset(self, keys: list[str]):
+        for key in keys:
+            self._counters.pop(key)
+            self._blocks.pop(key)
+
+
+class RedisFailureStore:
+    """
+    Общие для всех воркеров счетчики: INCR ключа текущего окна и GET предыдущего
+    в одном pipeline; блокировка - ключ с TTL. При недоступности Redis попытки не ограничиваются.
+    """
+
+    backend = "redis"
+
+    def __init__(self, redis, window: int = LOGIN_FAILURE_WINDOW, prefix: str = "login"):
+        self._redis = redis
+        self.window = window
+        self._prefix = prefix
+
+    def _block_key(self, key: str) -> str:
+        return f"{self._prefix}:block:{key}"
+
+    def _count_key(self, key: str, index: int) -> str:
+        return f"{self._prefix}:fail:{key}:{index}"
+
+    async def blocked_for(self, keys: list[str]) -> float:
+        try:
+            blocked_until = await self._redis.mget([self._block_key(key) for key in keys])
+        except RedisError as e:
+            logger.warning("Login guard check failed: %s", e)
+            return 0.0
+        now = time.time()
+        return max((float(until) - now for until in blocked_until if until), default=0.0)
+
+    async def add_failure(self, keys: list[str]) -> list[float]:
+        now = time.time()
+        index = int(now // self.window)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.incr(self._count_key(key, index))
+                    pipe.expire(self._count_key(key, index), 2 * self.window)
+                    pipe.get(self._count_key(key, index - 1))
+                replies = await pipe.execute()
+        except RedisError as e:
+            logger.warning("Login guard failure count failed: %s", e)
+            return [0.0 for _ in keys]
+        return [
+            sliding_count(int(replies[i + 2] or 0), int(replies[i]), self.window, now)
+            for i in range(0, len(replies), 3)
+        ]
+
+    async def block(self, blocks: dict[str, float]):
+        if not blocks:
+            return
+        now = time.time()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, seconds in blocks.items():
+                    pipe.set(self._block_key(key), now + seconds, px=max(1, int(seconds * 1000)))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Login guard block failed: %s", e)
+
+    async def reset(self, keys: list[str]):
+        index = int(time.time() // self.window)
+        try:
+            await self._redis.delete(*(
+                name for key in keys
+                for name in (self._block_key(key), self._count_key(key, index), self._count_key(key, index - 1))
+            ))
+        except RedisError as e:
+            logger.warning("Login guard reset failed: %s", e)
+
+
+class LoginGuard:
+    """
+    Неудачные входы по аккаунту и по адресу клиента с экспоненциальной задержкой.
+
+    Заблокированная попытка отклоняется до чтения пользователя из БД и проверки
+    пароля; в БД пишется только переход аккаунта в заблокированное состояние.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.rejected = 0
+        self.failures = 0
+        self.lockouts = 0
+
+    @staticmethod
+    def _keys(email: str, ip: str | None) -> list[str]:
+        keys = [f"account:{email.lower()}"]
+        if ip:
+            keys.append(f"ip:{ip}")
+        return keys
+
+    async def retry_after(self, email: str, ip: str | None) -> float:
+        """0, если попытку можно проверять, иначе - сколько секунд ждать"""
+        wait = await self.store.blocked_for(self._keys(email, ip))
+        if wait > 0:
+            self.rejected += 1
+        return max(wait, 0.0)
+
+    async def failure(self, email: str, ip: str | None) -> float:
+        """Учесть неудачу и назначить задержку; вернуть число неудач аккаунта в окне"""
+        self.failures += 1
+        keys = self._keys(email, ip)
+        counts = await self.store.add_failure(keys)
+        free = [LOGIN_ACCOUNT_FREE_ATTEMPTS, LOGIN_IP_FREE_ATTEMPTS]
+        blocks = {}
+        for key, count, free_attempts in zip(keys, counts, free):
+            delay = backoff_delay(count, free_attempts)
+            if delay > 0:
+                blocks[key] = delay
+        await self.store.block(blocks)
+        return counts[0]
+
+    def should_lock(self, failures: float) -> bool:
+        return LOGIN_LOCKOUT_ATTEMPTS > 0 and failures >= LOGIN_LOCKOUT_ATTEMPTS
+
+    async def success(self, email: str):
+        await self.store.reset(self._keys(email, None))
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.store.backend,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "lockouts": self.lockouts,
+        }
+
+
+_login_guard = None
+
+
+def get_login_guard() -> LoginGuard:
+    global _login_guard
+    if _login_guard is None:
+        redis = get_redis() if LOGIN_GUARD_BACKEND == "redis" else None
+        _login_guard = LoginGuard(RedisFailureStore(redis) if redis is not None else MemoryFailureStore())
+    return _login_guard
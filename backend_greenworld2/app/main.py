@@ -1,25 +1,28 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.util import get_remote_address
-from slowapi.errors import RateLimitExceeded
 
 from app.routers.all_routers import api_router
-from app.db.database import engine, Base, AsyncSessionLocal
-from app.crud import init_tree_catalog
+from app.db.database import engine, AsyncSessionLocal, dispose_engines
+from app.bootstrap import bootstrap, is_bootstrapped
+from app.weak_passwords import load_weak_passwords
+from app.hashing import shutdown_password_hasher
+from app.ledger import run_compaction_loop
+from app.growth import run_growth_loop
+from app.question_bank import refresh_question_bank
+from app.leaderboard import load_leaderboard
+from app.user_search import ensure_search_index
+from app.realtime import get_broker
+from app.responses import ORJSONResponse
 
 from dotenv import load_dotenv
+import asyncio
 import os
 
 load_dotenv()
 
 REDIS_URL = os.getenv("REDIS_URL")
-limiter = Limiter(key_func=get_remote_address, default_limits=["100 per minute"]) 
 
-app = FastAPI(swagger_ui_parameters={"oauth2RedirectUrl": None})
-
-app.state.limiter = limiter
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app = FastAPI(swagger_ui_parameters={"oauth2RedirectUrl": None}, default_response_class=ORJSONResponse)
 
 # Настройка CORS
 app.add_middleware(
@@ -28,14 +31,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # курсор следующей страницы поиска и уведомлений приходит в заголовке
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(api_router)
 
 @app.on_event("startup")
 async def create_all():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    load_weak_passwords()
+
+    if is_bootstrapped():
+        # схему и каталог подготовил мастер-процесс (gunicorn.conf.py); воркеру - только свое состояние
+        async with engine.begin() as conn:
+            await conn.run_sync(ensure_search_index)
+    else:
+        await bootstrap()
 
     async with AsyncSessionLocal() as db:
-        await init_tree_catalog(db)
\ No newline at end of file
+        await refresh_question_bank(db)
+        await load_leaderboard(db)
+
+    await get_broker().start()
+    app.state.compaction_task = asyncio.create_task(run_compaction_loop(AsyncSessionLocal))
+    app.state.growth_task = asyncio.create_task(run_growth_loop(AsyncSessionLocal))
+    app.state.ready = True
+
+@app.on_event("shutdown")
+async def shutdown():
+    # /health/ready отвечает 503, пока воркер дорабатывает
+    app.state.ready = False
+    app.state.compaction_task.cancel()
+    app.state.growth_task.cancel()
+    await get_broker().stop()
+    await dispose_engines()
+    shutdown_password_hasher()
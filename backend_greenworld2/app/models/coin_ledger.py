@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+class CoinLedger(Base):
+    """Журнал изменений баланса: строки только добавляются"""
+    __tablename__ = "coin_ledger"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    delta = Column(Integer, nullable=False)          # + начисление, - списание
+    reason = Column(String(50), nullable=False)      # game_result, buy_tree, upgrade_tree, ...
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # хэш ключа Idempotency-Key списания: повтор после сбоя упирается в уникальный индекс
+    idempotency_key = Column(String(32), nullable=True)
+
+    # хвост журнала пользователя после снимка читается по (user_id, id > last_entry_id)
+    __table_args__ = (
+        Index("ix_coin_ledger_user_id_id", "user_id", "id"),
+        Index("ix_coin_ledger_created_at", "created_at"),
+        Index("ix_coin_ledger_idempotency_key", "idempotency_key", unique=True),
+    )
+
+class CoinBalance(Base):
+    """Материализованный баланс: сумма журнала до last_entry_id включительно"""
+    __tablename__ = "coin_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    balance = Column(Integer, nullable=False, default=0)
+    last_entry_id = Column(Integer, nullable=False, default=0, index=True)  # max() = watermark компакции
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -11,6 +11,8 @@ class GamesResult(Base):
     score = Column(Integer)
     duration_sec = Column(Integer)              # если используешь длительность — ок
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # id из очереди приема результатов: повторная обработка пачки не создает дублей
+    ingest_id = Column(String(36), unique=True, index=True, nullable=True)
 
     # КЛЮЧЕВОЕ: имя обратной стороны должно существовать в User
     user = relationship("User", back_populates="games_results")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, UniqueConstraint, Index, false
 from sqlalchemy.sql import func
 
 from app.db.database import Base
@@ -12,4 +12,9 @@ class Notification(Base):
     is_read = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    __table_args__ = (UniqueConstraint('user_id', 'message', name='uix_user_message'),)
\ No newline at end of file
+    __table_args__ = (
+        UniqueConstraint('user_id', 'message', name='uix_user_message'),
+        # лента непрочитанных: в индексе только непрочитанные, id дает порядок страниц
+        Index("ix_notifications_unread", "user_id", "id",
+              postgresql_where=(is_read == false()), sqlite_where=(is_read == false())),
+    )
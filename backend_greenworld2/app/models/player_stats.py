@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.db.database import Base
+
+class PlayerStats(Base):
+    """Агрегаты игрока для рейтинга; обновляются вместе с записью результата игры"""
+    __tablename__ = "player_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_score = Column(BigInteger, nullable=False, default=0)  # сумма за все игры перерастает Integer
+    games_played = Column(Integer, nullable=False, default=0)
+    # по нему воркеры с локальным рейтингом догружают чужие изменения
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
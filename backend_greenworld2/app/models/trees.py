@@ -1,5 +1,5 @@
 # app/models/trees.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, CheckConstraint
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, func, CheckConstraint, Index, false
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -15,8 +15,18 @@ class Tree(Base):
     lvl = Column(Integer, nullable=False, default=1)
     next_upgrade_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # true, когда next_upgrade_at прошел и планировщик роста уже отметил дерево (app/growth.py)
+    is_ready = Column(Boolean, nullable=False, default=False, server_default=false())
 
-    user = relationship("User", lazy="joined")
-    tree_type = relationship("TreeCatalog", lazy="joined")  # Связь с каталогом
+    # Связи не загружаются неявно: запросы деревьев выбирают нужные колонки,
+    # имя типа берется из снимка каталога (app/catalog_cache.py).
+    # Если связь нужна, ее загрузку задают в запросе: options(selectinload(Tree.tree_type))
+    user = relationship("User", back_populates="trees", lazy="raise")
+    tree_type = relationship("TreeCatalog", lazy="raise")  # Связь с каталогом
 
-    __table_args__ = (CheckConstraint("lvl BETWEEN 1 AND 5", name="chk_tree_lvl_1_5"),)
\ No newline at end of file
+    __table_args__ = (
+        CheckConstraint("lvl BETWEEN 1 AND 5", name="chk_tree_lvl_1_5"),
+        # частичный индекс: в нем только ожидающие деревья, окно дедлайнов читается диапазоном
+        Index("ix_trees_growth_due", "next_upgrade_at",
+              postgresql_where=(is_ready == false()), sqlite_where=(is_ready == false())),
+    )
\ No newline at end of file
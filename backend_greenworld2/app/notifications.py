@@ -0,0 +1,101 @@
+# app/notifications.py
+import os
+from itertools import islice
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import String, literal, select, true, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.notifications import Notification
+from app.models.users import User
+from app.realtime import broadcast_event, publish_events
+
+load_dotenv()
+
+# сколько строк уходит одним executemany; весь fan-out - одна транзакция вызывающего
+NOTIFICATION_BATCH = int(os.getenv("NOTIFICATION_BATCH", "5000"))
+NOTIFICATION_COLUMNS = (Notification.id, Notification.message, Notification.created_at)
+
+
+def _insert(db: AsyncSession):
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    return dialect.insert(Notification.__table__)
+
+
+async def insert_notifications(db: AsyncSession, rows, batch_size: int = NOTIFICATION_BATCH) -> list:
+    """
+    Записать уведомления {user_id, message} пачками по batch_size; rows может быть генератором.
+    Дубликаты (user_id, message) пропускаются. Коммит - на вызывающей стороне.
+    Возвращает новые уведомления (для push_notifications после коммита).
+    """
+    stmt = _insert(db).on_conflict_do_nothing(
+        index_elements=[Notification.user_id, Notification.message]
+    ).returning(Notification.user_id, *NOTIFICATION_COLUMNS)
+    rows = iter(rows)
+    inserted = []
+    while chunk := list(islice(rows, batch_size)):
+        result = await db.execute(stmt, chunk)
+        inserted.extend(result.all())
+    return inserted
+
+
+async def push_notifications(inserted: list):
+    """Отправить новые уведомления в сокеты получателей; вызывать после коммита"""
+    await publish_events([
+        (row.user_id, {"type": "notification", "id": row.id, "message": row.message, "created_at": row.created_at})
+        for row in inserted
+    ])
+
+
+async def push_broadcast(message: str):
+    """Сообщение broadcast() в сокеты всех пользователей; вызывать после коммита"""
+    await broadcast_event({"type": "notification", "message": message})
+
+
+async def fan_out(db: AsyncSession, user_ids, message: str, batch_size: int = NOTIFICATION_BATCH) -> list:
+    """Одно сообщение списку пользователей; коммит - на вызывающей стороне"""
+    return await insert_notifications(db, ({"user_id": u, "message": message} for u in user_ids), batch_size)
+
+
+async def broadcast(db: AsyncSession, message: str) -> int:
+    """
+    Сообщение всем пользователям одним INSERT ... SELECT: строки не проходят через приложение.
+    Коммит - на вызывающей стороне.
+    """
+    # WHERE true обязателен для SQLite: без него ON CONFLICT читается как часть JOIN
+    source = select(User.id, literal(message, String)).where(true())
+    stmt = _insert(db).from_select(["user_id", "message"], source).on_conflict_do_nothing(
+        index_elements=[Notification.user_id, Notification.message]
+    )
+    result = await db.execute(stmt)
+    return result.rowcount
+
+
+async def unread_feed(db: AsyncSession, user_id: int, limit: int = 50,
+                      cursor: int = None) -> tuple[list, int | None]:
+    """
+    Страница непрочитанных от новых к старым (keyset по id) и курсор следующей страницы.
+    Читается по частичному индексу ix_notifications_unread.
+    """
+    query = select(*NOTIFICATION_COLUMNS).where(
+        Notification.user_id == user_id, Notification.is_read == False  # noqa: E712
+    )
+    if cursor is not None:
+        query = query.where(Notification.id < cursor)
+    rows = (await db.execute(query.order_by(Notification.id.desc()).limit(limit + 1))).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return [row._mapping for row in rows[:limit]], next_cursor
+
+
+async def mark_read(db: AsyncSession, user_id: int, ids: list[int] = None, up_to: int = None) -> int:
+    """Отметить прочитанными уведомления ids или все до up_to включительно одним UPDATE"""
+    if (ids is None) == (up_to is None):
+        raise HTTPException(status_code=422, detail="Specify either ids or up_to")
+    stmt = update(Notification).where(
+        Notification.user_id == user_id, Notification.is_read == False  # noqa: E712
+    )
+    stmt = stmt.where(Notification.id.in_(ids)) if ids is not None else stmt.where(Notification.id <= up_to)
+    result = await db.execute(stmt.values(is_read=True).execution_options(synchronize_session=False))
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,132 @@
+# app/question_bank.py
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from sqlalchemy import Text, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from app.models.questions import Question
+
+load_dotenv()
+
+# как часто подтягивать вопросы, добавленные другими воркерами
+QUESTION_BANK_REFRESH = float(os.getenv("QUESTION_BANK_REFRESH", "60"))
+
+
+class QuestionBank:
+    """
+    Плотный массив id всех вопросов в памяти (8 байт на вопрос) и ключ ответов к ним.
+
+    Случайная выборка N вопросов - O(N) по индексам массива, без OFFSET и
+    без сортировки таблицы. Правильный ответ ищется бинарным поиском по
+    отсортированному массиву id, так что проверка викторины не ходит в БД.
+    Новые вопросы догружаются инкрементально (id > settled_id).
+
+    id выдается при вставке, а видимым вопрос становится при коммите: на PostgreSQL
+    параллельный импорт может закоммитить меньший id после большего. Поэтому граница
+    settled_id (все вопросы до нее уже загружены) отстает от max_id и сдвигается так же,
+    как граница компакции журнала монет (app/ledger.py, _settled_cutoff).
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._answers = []  # параллельно _ids
+        self.max_id = 0
+        self.settled_id = 0
+        self._pending = None  # (max_id, xmax снимка после чтения) - кандидат в settled_id
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def refresh(self, db: AsyncSession) -> int:
+        postgres = db.bind.dialect.name == "postgresql"
+        if postgres:
+            xmin, _ = await _snapshot_bounds(db)
+        result = await db.execute(
+            select(Question.id, Question.correct_answer).where(Question.id > self.settled_id).order_by(Question.id)
+        )
+        added = 0
+        for question_id, correct_answer in result.all():
+            # уже загружен: прошлым чтением хвоста или параллельным refresh, пока мы ждали БД
+            if question_id in self:
+                continue
+            self._insert(question_id, correct_answer)
+            added += 1
+
+        if not postgres:
+            # SQLite: писатель держит блокировку до коммита, id коммитятся по порядку
+            self.settled_id = self.max_id
+        else:
+            # все транзакции, которые могли держать id <= кандидата, завершились до чтения выше
+            if self._pending is not None and xmin >= self._pending[1]:
+                self.settled_id = max(self.settled_id, self._pending[0])
+                self._pending = None
+            if self._pending is None and self.max_id > self.settled_id:
+                _, xmax = await _snapshot_bounds(db)
+                self._pending = (self.max_id, xmax)
+        self.refreshed_at = time.monotonic()
+        return added
+
+    def _insert(self, question_id: int, correct_answer: str):
+        if question_id > self.max_id:
+            self._ids.append(question_id)
+            self._answers.append(correct_answer)
+            self.max_id = question_id
+            return
+        # поздно закоммиченный меньший id
+        i = bisect_left(self._ids, question_id)
+        self._ids.insert(i, question_id)
+        self._answers.insert(i, correct_answer)
+
+    def sample(self, n: int, rnd: random.Random = random) -> list[int]:
+        ids = self._ids
+        n = min(n, len(ids))
+        return [ids[i] for i in rnd.sample(range(len(ids)), n)]
+
+    def __contains__(self, question_id: int) -> bool:
+        return self._position(question_id) is not None
+
+    def _position(self, question_id: int) -> int | None:
+        ids = self._ids
+        i = bisect_left(ids, question_id)
+        return i if i < len(ids) and ids[i] == question_id else None
+
+    def answer(self, question_id: int) -> str | None:
+        i = self._position(question_id)
+        return None if i is None else self._answers[i]
+
+    def score(self, question_ids: list[int], answers: dict) -> int:
+        """Число верных ответов; answers - {str(question_id): ответ}, как в QuizSubmission"""
+        correct = 0
+        for question_id in question_ids:
+            i = self._position(question_id)
+            if i is not None and answers.get(str(question_id)) == self._answers[i]:
+                correct += 1
+        return correct
+
+
+async def _snapshot_bounds(db: AsyncSession) -> tuple[int, int]:
+    """xmin и xmax текущего снимка PostgreSQL"""
+    snapshot = func.pg_current_snapshot()
+    xmin, xmax = (await db.execute(
+        select(cast(func.pg_snapshot_xmin(snapshot), Text), cast(func.pg_snapshot_xmax(snapshot), Text))
+    )).one()
+    return int(xmin), int(xmax)
+
+
+_bank = QuestionBank()
+
+
+async def get_question_bank(db: AsyncSession) -> QuestionBank:
+    if not _bank.refreshed_at or time.monotonic() - _bank.refreshed_at > QUESTION_BANK_REFRESH:
+        await _bank.refresh(db)
+    return _bank
+
+
+async def refresh_question_bank(db: AsyncSession) -> int:
+    """Подгрузить новые вопросы (при старте и после импорта)"""
+    return await _bank.refresh(db)
@@ -0,0 +1,70 @@
+# app/quiz_sessions.py
+import os
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from app.auth import QUIZ_SESSION_EXPIRE_MINUTES
+from app.cache import TTLCache, get_redis
+from app.logging_config import logger
+
+load_dotenv()
+
+QUIZ_SESSION_BACKEND = os.getenv("QUIZ_SESSION_BACKEND", "memory")  # memory | redis
+QUIZ_SESSION_CACHE_SIZE = int(os.getenv("QUIZ_SESSION_CACHE_SIZE", "100000"))
+
+
+class MemoryUsedSessions:
+    """jti уже сданных сессий викторины в памяти процесса; запись живет до истечения токена"""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = QUIZ_SESSION_CACHE_SIZE):
+        self._used = TTLCache(maxsize, QUIZ_SESSION_EXPIRE_MINUTES * 60)
+        self.replays = 0
+
+    async def claim(self, jti: str, ttl: float) -> bool:
+        """True, если сессия сдается впервые"""
+        if self._used.get(jti) is not None:
+            self.replays += 1
+            return False
+        self._used.set(jti, True, ttl=max(ttl, 1))
+        return True
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "replays": self.replays, **self._used.stats()}
+
+
+class RedisUsedSessions:
+    """Общие для всех воркеров отметки (SET NX с TTL); при недоступности Redis - отметки процесса"""
+
+    backend = "redis"
+
+    def __init__(self, redis, prefix: str = "quiz:used"):
+        self._redis = redis
+        self._prefix = prefix
+        self._fallback = MemoryUsedSessions()
+        self.replays = 0
+
+    async def claim(self, jti: str, ttl: float) -> bool:
+        try:
+            claimed = await self._redis.set(f"{self._prefix}:{jti}", 1, nx=True, ex=max(int(ttl) + 1, 1))
+        except RedisError as e:
+            logger.warning("Quiz session claim failed: %s", e)
+            return await self._fallback.claim(jti, ttl)
+        if not claimed:
+            self.replays += 1
+        return bool(claimed)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "replays": self.replays + self._fallback.replays}
+
+
+_used_sessions = None
+
+
+def get_used_quiz_sessions():
+    global _used_sessions
+    if _used_sessions is None:
+        redis = get_redis() if QUIZ_SESSION_BACKEND == "redis" else None
+        _used_sessions = RedisUsedSessions(redis) if redis is not None else MemoryUsedSessions()
+    return _used_sessions
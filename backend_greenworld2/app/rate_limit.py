@@ -0,0 +1,253 @@
+# app/rate_limit.py
+import asyncio
+import math
+import os
+import re
+import time
+from dotenv import load_dotenv
+from fastapi import Depends, HTTPException, Request
+from redis.exceptions import RedisError
+
+from app.cache import TTLCache, get_redis
+from app.dependencies import get_current_user
+from app.logging_config import logger
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | redis
+# доля лимита, которую воркер забирает из общего бакета за одно обращение к Redis
+RATE_LIMIT_LEASE_FRACTION = float(os.getenv("RATE_LIMIT_LEASE_FRACTION", "0.1"))
+# столько секунд воркер тратит пачку; пачка не больше пополнения бакета за это время
+RATE_LIMIT_LEASE_TTL = float(os.getenv("RATE_LIMIT_LEASE_TTL", "5"))
+RATE_LIMIT_CACHE_SIZE = int(os.getenv("RATE_LIMIT_CACHE_SIZE", "100000"))
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_SPEC = re.compile(r"^\s*(\d+)\s*(?:/|per)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$")
+
+
+class Limit:
+    """amount запросов за period секунд: token bucket емкостью amount, пополняется amount/period в секунду"""
+
+    def __init__(self, spec: str):
+        match = _SPEC.match(spec)
+        if match is None:
+            raise ValueError(f"Invalid rate limit: {spec!r}")
+        self.spec = spec
+        self.amount = int(match.group(1))
+        self.period = int(match.group(2) or 1) * _PERIODS[match.group(3)]
+        self.rate = self.amount / self.period
+
+    def lease_size(self, fraction: float, ttl: float) -> int:
+        """
+        Токенов в пачке воркера: доля лимита, но не больше, чем бакет пополняется за ttl пачки.
+        Пачку, которую воркер не успел истратить, бакет восполняет за ее же ttl, поэтому
+        брошенные пачки всех воркеров не отнимают у пользователя заметную часть лимита.
+        Для медленных лимитов ("50/hour") это 1: каждый запрос идет в Redis, токены не залеживаются.
+        """
+        return max(1, min(int(self.amount * fraction), int(self.rate * ttl)))
+
+
+class MemoryRateLimiter:
+    """Token bucket на ключ в памяти процесса: лимит действует отдельно в каждом воркере"""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = RATE_LIMIT_CACHE_SIZE):
+        # полностью пополненный бакет не отличается от нового: запись живет period
+        self._buckets = TTLCache(maxsize, 60)
+        self.allowed = 0
+        self.denied = 0
+
+    def take(self, key: str, limit: Limit) -> float:
+        """0, если запрос разрешен, иначе - через сколько секунд появится токен"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens = limit.amount if bucket is None else min(limit.amount, bucket[0] + (now - bucket[1]) * limit.rate)
+        if tokens < 1:
+            self.denied += 1
+            return (1 - tokens) / limit.rate
+        self._buckets.set(key, (tokens - 1, now), ttl=limit.period)
+        self.allowed += 1
+        return 0.0
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        return self.take(key, limit)
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, "keys": len(self._buckets), "allowed": self.allowed, "denied": self.denied}
+
+
+# KEYS[1] - бакет; ARGV: емкость, пополнение в секунду, сколько токенов взять, сколько вернуть.
+# Время берется у Redis, чтобы часы воркеров не влияли на пополнение.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate + refund)
+local granted = math.min(want, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+local retry = 0
+if granted == 0 then
+    retry = (1 - tokens) / rate
+end
+return {granted, tostring(retry)}
+"""
+
+
+class Lease:
+    """Локальная пачка токенов ключа; refill - идущий запрос в Redis, его ждут остальные запросы ключа"""
+
+    __slots__ = ("tokens", "expires_at", "denied_until", "refill")
+
+    def __init__(self):
+        self.tokens = 0
+        self.expires_at = 0.0
+        self.denied_until = 0.0
+        self.refill = None
+
+
+class RedisRateLimiter:
+    """
+    Общий для всех воркеров token bucket в Redis (атомарный Lua-скрипт).
+
+    Воркер забирает из бакета сразу пачку токенов и тратит их локально, поэтому
+    большинство разрешенных запросов не ходит в Redis. Лимит не превышается:
+    токены пачки уже списаны из общего бакета, неистраченные возвращаются при
+    следующем обращении. Пачка не больше пополнения бакета за lease_ttl (Limit.lease_size),
+    так что остатки в воркерах, которые этот ключ больше не видят, не режут лимит.
+    После отказа ключ отклоняется локально до пополнения.
+    Если Redis недоступен, работает лимит в памяти воркера.
+    """
+
+    backend = "redis"
+
+    def __init__(self, redis, lease_fraction: float = RATE_LIMIT_LEASE_FRACTION,
+                 lease_ttl: float = RATE_LIMIT_LEASE_TTL, maxsize: int = RATE_LIMIT_CACHE_SIZE,
+                 prefix: str = "ratelimit"):
+        self._script = redis.register_script(TOKEN_BUCKET_LUA)
+        self._lease_fraction = lease_fraction
+        self._lease_ttl = lease_ttl
+        self._leases = TTLCache(maxsize, 60)
+        self._fallback = MemoryRateLimiter(maxsize)
+        self._prefix = prefix
+        self.local = 0
+        self.remote = 0
+        self.denied = 0
+        self.errors = 0
+
+    async def hit(self, key: str, limit: Limit) -> float:
+        lease = self._leases.get(key)
+        if lease is None:
+            lease = Lease()
+            self._leases.set(key, lease, ttl=limit.period)
+        while True:
+            now = time.monotonic()
+            if lease.denied_until > now:
+                self.denied += 1
+                return lease.denied_until - now
+            if lease.tokens > 0 and lease.expires_at > now:
+                lease.tokens -= 1
+                self.local += 1
+                return 0.0
+            if lease.refill is None:
+                break
+            # пачку уже запрашивает другой запрос этого ключа
+            await lease.refill.wait()
+
+        lease.refill = asyncio.Event()
+        try:
+            return await self._refill(key, lease, limit)
+        finally:
+            lease.refill.set()
+            lease.refill = None
+
+    async def _refill(self, key: str, lease: Lease, limit: Limit) -> float:
+        # остаток просроченной пачки возвращается в бакет тем же вызовом
+        refund, lease.tokens = lease.tokens, 0
+        try:
+            granted, retry = await self._script(
+                keys=[f"{self._prefix}:{key}"],
+                args=[limit.amount, limit.rate, limit.lease_size(self._lease_fraction, self._lease_ttl), refund],
+            )
+        except RedisError as e:
+            self.errors += 1
+            logger.warning("Rate limiter falls back to local buckets: %s", e)
+            return self._fallback.take(key, limit)
+
+        self.remote += 1
+        granted = int(granted)
+        if granted == 0:
+            retry = float(retry)
+            lease.denied_until = time.monotonic() + retry
+            self.denied += 1
+            return retry
+        lease.tokens = granted - 1
+        lease.expires_at = time.monotonic() + self._lease_ttl
+        return 0.0
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "keys": len(self._leases),
+            "allowed_local": self.local,
+            "redis_calls": self.remote,
+            "denied": self.denied,
+            "errors": self.errors,
+        }
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    global _rate_limiter
+    if _rate_limiter is None:
+        redis = get_redis() if RATE_LIMIT_BACKEND == "redis" else None
+        _rate_limiter = RedisRateLimiter(redis) if redis is not None else MemoryRateLimiter()
+    return _rate_limiter
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def check_rate_limit(limit: Limit, key: str):
+    retry = await get_rate_limiter().hit(key, limit)
+    if retry > 0:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded: {limit.spec}",
+            headers={"Retry-After": str(math.ceil(retry))},
+        )
+
+
+def rate_limit(spec: str, name: str, per: str = "user"):
+    """
+    Зависимость с лимитом: per="user" - на пользователя (эндпоинт с авторизацией),
+    per="ip" - на адрес клиента. name разделяет бакеты разных эндпоинтов.
+    """
+    limit = Limit(spec)
+    if per == "ip":
+        async def dependency(request: Request):
+            if RATE_LIMIT_ENABLED:
+                await check_rate_limit(limit, f"{name}:ip:{client_ip(request)}")
+    elif per == "user":
+        async def dependency(user=Depends(get_current_user)):
+            if RATE_LIMIT_ENABLED:
+                await check_rate_limit(limit, f"{name}:user:{user.id}")
+    else:
+        raise ValueError(f"Unknown rate limit key: {per!r}")
+    return dependency
@@ -0,0 +1,328 @@
+# app/realtime.py
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict
+from dotenv import load_dotenv
+from redis.exceptions import RedisError
+
+from app.cache import get_redis
+from app.logging_config import logger
+
+load_dotenv()
+
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "memory")  # memory | redis
+# сколько исходящих сообщений ждет отправки в одном сокете; переполнение закрывает сокет
+REALTIME_BUFFER = int(os.getenv("REALTIME_BUFFER", "64"))
+REALTIME_MAX_CONNECTIONS = int(os.getenv("REALTIME_MAX_CONNECTIONS", "10000"))
+REALTIME_SEND_TIMEOUT = float(os.getenv("REALTIME_SEND_TIMEOUT", "10"))
+
+USER_CHANNEL_PREFIX = "realtime:user:"
+BROADCAST_CHANNEL = "realtime:all"
+
+# 1013 Try Again Later: клиент переподключается и перечитывает состояние по HTTP
+CLOSE_OVERFLOW = 1013
+# 1008 Policy Violation: токен истек или пользователь больше не может входить
+CLOSE_UNAUTHORIZED = 1008
+
+# служебное сообщение в канале пользователя: сокеты перепроверяют токен, клиенту не уходит
+RECHECK_MESSAGE = '{"type":"_recheck"}'
+
+
+def encode_event(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False, separators=(",", ":"), default=lambda v: v.isoformat())
+
+
+class Subscriber:
+    """
+    Один сокет: ограниченная очередь исходящих сообщений.
+
+    Брокер только кладет в очередь и никогда не ждет сокет. Медленный клиент,
+    переполнивший очередь, отключается, вместо того чтобы копить память.
+    """
+
+    def __init__(self, user_id: int, maxsize: int = REALTIME_BUFFER):
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize)
+        self.close_code = None  # задан - сокет закрывается, новые сообщения не принимаются
+        self.recheck = asyncio.Event()
+
+    def offer(self, message: str) -> bool:
+        if self.close_code is not None:
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.close_code = CLOSE_OVERFLOW
+            return False
+
+    def revoke(self, code: int = CLOSE_UNAUTHORIZED):
+        """Закрыть сокет с кодом code, не дожидаясь следующего события"""
+        if self.close_code is not None:
+            return
+        self.close_code = code
+        try:
+            self.queue.put_nowait(None)  # разбудить pump(); полная очередь разбудит его и так
+        except asyncio.QueueFull:
+            pass
+
+    async def pump(self, websocket):
+        """Отправлять сообщения из очереди, пока сокет жив; при переполнении или отзыве закрыть его"""
+        try:
+            while True:
+                message = await self.queue.get()
+                if self.close_code is not None:
+                    await websocket.close(code=self.close_code)
+                    return
+                await asyncio.wait_for(websocket.send_text(message), REALTIME_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # клиент пропал или не читает; чтение в serve() увидит отключение
+            await _close_quietly(websocket)
+
+
+async def _close_quietly(websocket):
+    try:
+        await websocket.close(code=CLOSE_OVERFLOW)
+    except Exception:
+        pass
+
+
+class LocalBroker:
+    """Доставка событий сокетам этого процесса"""
+
+    backend = "memory"
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)  # user_id -> {Subscriber}
+        self.connections = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    async def subscribe(self, subscriber: Subscriber):
+        self._subscribers[subscriber.user_id].add(subscriber)
+        self.connections += 1
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        subscribers = self._subscribers.get(subscriber.user_id)
+        if subscribers is None or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        self.connections -= 1
+        if not subscribers:
+            del self._subscribers[subscriber.user_id]
+
+    def deliver(self, user_id: int, message: str):
+        if message == RECHECK_MESSAGE:
+            for subscriber in self._subscribers.get(user_id, ()):
+                subscriber.recheck.set()
+            return
+        for subscriber in self._subscribers.get(user_id, ()):
+            if subscriber.offer(message):
+                self.delivered += 1
+            else:
+                self.dropped += 1
+
+    def deliver_all(self, message: str):
+        for user_id in list(self._subscribers):
+            self.deliver(user_id, message)
+
+    async def publish_many(self, events: list[tuple[int, str]]):
+        """events - пары (user_id, закодированное событие)"""
+        for user_id, message in events:
+            self.deliver(user_id, message)
+
+    async def broadcast(self, message: str):
+        self.deliver_all(message)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "connections": self.connections,
+            "users": len(self._subscribers),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+class RedisBroker(LocalBroker):
+    """
+    События публикуются в Redis-канал пользователя; каждый воркер подписан на каналы
+    пользователей, у которых в нем открыт сокет, и на общий канал рассылок.
+    Если Redis недоступен, события доставляются хотя бы сокетам этого воркера.
+    """
+
+    backend = "redis"
+
+    def __init__(self, redis):
+        super().__init__()
+        self._redis = redis
+        self._pubsub = None
+        self._listener = None
+
+    async def subscribe(self, subscriber: Subscriber):
+        first = subscriber.user_id not in self._subscribers
+        await super().subscribe(subscriber)
+        if first:
+            try:
+                await self._pubsub.subscribe(USER_CHANNEL_PREFIX + str(subscriber.user_id))
+            except RedisError as e:
+                logger.warning("Realtime subscribe failed: %s", e)
+
+    async def unsubscribe(self, subscriber: Subscriber):
+        await super().unsubscribe(subscriber)
+        if subscriber.user_id not in self._subscribers:
+            try:
+                await self._pubsub.unsubscribe(USER_CHANNEL_PREFIX + str(subscriber.user_id))
+            except RedisError as e:
+                logger.warning("Realtime unsubscribe failed: %s", e)
+
+    async def publish_many(self, events: list[tuple[int, str]]):
+        if not events:
+            return
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for user_id, message in events:
+                    pipe.publish(USER_CHANNEL_PREFIX + str(user_id), message)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Realtime publish failed, delivering locally: %s", e)
+            await super().publish_many(events)
+
+    async def broadcast(self, message: str):
+        try:
+            await self._redis.publish(BROADCAST_CHANNEL, message)
+        except RedisError as e:
+            logger.warning("Realtime broadcast failed, delivering locally: %s", e)
+            self.deliver_all(message)
+
+    async def start(self):
+        await self._connect()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.close()
+
+    async def _connect(self):
+        """Новое pub/sub-соединение с подписками на все текущие каналы"""
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        channels = [USER_CHANNEL_PREFIX + str(user_id) for user_id in self._subscribers]
+        await self._pubsub.subscribe(BROADCAST_CHANNEL, *channels)
+
+    async def _listen(self):
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                channel, data = message["channel"], message["data"]
+                if isinstance(channel, bytes):
+                    channel, data = channel.decode(), data.decode()
+                if channel == BROADCAST_CHANNEL:
+                    self.deliver_all(data)
+                else:
+                    self.deliver(int(channel[len(USER_CHANNEL_PREFIX):]), data)
+            except asyncio.CancelledError:
+                raise
+            except RedisError as e:
+                logger.warning("Realtime listener lost Redis, reconnecting: %s", e)
+                await asyncio.sleep(1)
+                try:
+                    await self._connect()
+                except RedisError:
+                    pass
+            except Exception:
+                logger.exception("Realtime listener failed")
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        redis = get_redis() if REALTIME_BACKEND == "redis" else None
+        _broker = RedisBroker(redis) if redis is not None else LocalBroker()
+    return _broker
+
+
+async def publish_event(user_id: int, event: dict):
+    """Отправить событие сокетам пользователя; вызывать после коммита"""
+    await get_broker().publish_many([(user_id, encode_event(event))])
+
+
+async def publish_events(events: list[tuple[int, dict]]):
+    await get_broker().publish_many([(user_id, encode_event(event)) for user_id, event in events])
+
+
+async def broadcast_event(event: dict):
+    await get_broker().broadcast(encode_event(event))
+
+
+async def request_recheck(user_id: int):
+    """
+    Попросить открытые сокеты пользователя во всех воркерах перепроверить токен и пользователя.
+    Только для смен, влияющих на вход (блокировка, деактивация, смена email): каждая
+    проверка - запрос в БД на сокет.
+    """
+    await get_broker().publish_many([(user_id, RECHECK_MESSAGE)])
+
+
+async def _guard(subscriber: Subscriber, authorize, expires_at: float | None):
+    """Отозвать сокет, когда истечет токен или authorize() после recheck вернет False"""
+    while True:
+        timeout = None if expires_at is None else max(expires_at - time.time(), 0)
+        try:
+            await asyncio.wait_for(subscriber.recheck.wait(), timeout)
+        except asyncio.TimeoutError:
+            subscriber.revoke(CLOSE_UNAUTHORIZED)
+            return
+        subscriber.recheck.clear()
+        if authorize is None:
+            continue
+        try:
+            allowed = await authorize()
+        except Exception:
+            # БД недоступна: сокет остается, следующая проверка будет при следующем сбросе
+            logger.exception("Realtime recheck failed")
+            continue
+        if not allowed:
+            subscriber.revoke(CLOSE_UNAUTHORIZED)
+            return
+
+
+async def serve(websocket, subscriber: Subscriber, authorize=None, expires_at: float | None = None):
+    """
+    Держать принятый сокет: отправка идет из очереди, входящие сообщения игнорируются.
+    expires_at - exp токена (unix time); authorize - корутина-проверка токена и пользователя,
+    вызывается после request_recheck() этого пользователя.
+    """
+    broker = get_broker()
+    await broker.subscribe(subscriber)
+    writer = asyncio.create_task(subscriber.pump(websocket))
+    guard = None
+    if authorize is not None or expires_at is not None:
+        guard = asyncio.create_task(_guard(subscriber, authorize, expires_at))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+    finally:
+        writer.cancel()
+        if guard is not None:
+            guard.cancel()
+        await broker.unsubscribe(subscriber)
+
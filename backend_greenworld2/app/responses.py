@@ -0,0 +1,41 @@
+# app/responses.py
+import json
+from collections.abc import Mapping
+from datetime import date, datetime
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # без orjson тот же JSON через stdlib, медленнее
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Mapping):  # RowMapping из row._mapping
+        return dict(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, "dict"):  # модели pydantic
+        return value.dict()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    """JSON в UTF-8 без пробелов; datetime - в ISO 8601, как у isoformat()"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    Ответ, сериализуемый orjson.
+
+    Класс ответа по умолчанию для приложения. Эндпоинт, который возвращает его
+    сам, обходит проверку response_model и jsonable_encoder: так отдаются
+    доверенные строки из БД, уже имеющие форму схемы ответа (response_model
+    в декораторе остается для OpenAPI).
+    """
+
+    def render(self, content) -> bytes:
+        return dumps(content)
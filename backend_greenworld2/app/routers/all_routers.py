@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import users, auth_main, quizes, trees, tree_catalog
+from . import users, auth_main, quizes, trees, tree_catalog, metrics, leaderboard, notifications, realtime, health
 from .quizes_ import games_router, import_router
 
 api_router = APIRouter()
@@ -12,7 +12,16 @@ api_router.include_router(auth_main.router, prefix="/auth", tags=["auth"])
 api_router.include_router(quizes.router)  # if quizes.router has prefix="/quizes" inside
 api_router.include_router(games_router.router, prefix="/quizes/games", tags=["quiz"])
 api_router.include_router(import_router.router, prefix="/quizes/import", tags=["quiz"])
+api_router.include_router(leaderboard.router)
 
 # trees
 api_router.include_router(trees.router, prefix="/trees", tags=["trees"])
 api_router.include_router(tree_catalog.router, tags=["tree-catalog"])
+
+# notifications
+api_router.include_router(notifications.router)
+api_router.include_router(realtime.router)
+
+# service
+api_router.include_router(metrics.router)
+api_router.include_router(health.router)
@@ -1,20 +1,22 @@
 # app/routers/auth_main.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.tokens import Token
 from app.crud import authenticate_user
-from app.auth import create_access_token
+from app.auth import create_access_token, get_token_codec
 from app.db.database import get_db
+from app.rate_limit import client_ip
 
 router = APIRouter()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(), 
     db: AsyncSession = Depends(get_db)
 ):
-    user = await authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password, ip=client_ip(request))
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -23,4 +25,9 @@ async def login_for_access_token(
         )
     
     access_token = create_access_token(data={"sub": user.email_user})
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/jwks.json")
+async def jwks():
+    """Публичные ключи для проверки токенов другими сервисами"""
+    return get_token_codec().jwks()
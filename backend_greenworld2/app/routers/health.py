@@ -0,0 +1,51 @@
+# app/routers/health.py
+import asyncio
+import os
+from fastapi import APIRouter, Request, Response
+from redis.exceptions import RedisError
+from sqlalchemy import text
+
+from app.cache import get_redis
+from app.db.database import engine
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+async def _database_ok() -> bool:
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    try:
+        await asyncio.wait_for(ping(), HEALTH_CHECK_TIMEOUT)
+        return True
+    except Exception:
+        return False
+
+
+async def _redis_ok(redis) -> bool:
+    try:
+        return bool(await asyncio.wait_for(redis.ping(), HEALTH_CHECK_TIMEOUT))
+    except (RedisError, asyncio.TimeoutError, OSError):
+        return False
+
+
+@router.get("/live")
+async def live():
+    """Liveness: процесс жив и event loop отвечает; зависимости не проверяются"""
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready(request: Request, response: Response):
+    """Readiness: старт завершен, БД (и Redis, если настроен) отвечают; иначе 503"""
+    checks = {"startup": getattr(request.app.state, "ready", False)}
+    checks["database"] = await _database_ok()
+    redis = get_redis()
+    if redis is not None:
+        checks["redis"] = await _redis_ok(redis)
+    ok = all(checks.values())
+    if not ok:
+        response.status_code = 503
+    return {"status": "ok" if ok else "unavailable", "checks": checks}
@@ -0,0 +1,34 @@
+# app/routers/leaderboard.py
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_db
+from app.dependencies import get_current_user
+from app.leaderboard import describe_entries, get_synced_leaderboard
+from app.models.users import User
+from app.responses import ORJSONResponse
+from app.schemas.quizes import LeaderboardAround, LeaderboardEntry
+
+router = APIRouter(prefix="/leaderboard", tags=["leaderboard"])
+
+@router.get("/top", response_model=List[LeaderboardEntry])
+async def get_top(limit: int = Query(10, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    """Первые limit игроков по сумме очков"""
+    board = await get_synced_leaderboard(db)
+    return ORJSONResponse(await describe_entries(db, 0, await board.entries(0, limit)))
+
+@router.get("/me", response_model=LeaderboardAround)
+async def get_around_me(
+    radius: int = Query(5, ge=0, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Место текущего игрока и radius соседей выше и ниже"""
+    board = await get_synced_leaderboard(db)
+    rank = await board.rank(current_user.id)
+    if rank is None:
+        return LeaderboardAround(rank=None, entries=[])
+    start = max(rank - radius, 0)
+    entries = await describe_entries(db, start, await board.entries(start, rank + radius + 1))
+    return LeaderboardAround(rank=rank + 1, entries=entries)
@@ -0,0 +1,53 @@
+# app/routers/metrics.py
+import os
+import secrets
+from dotenv import load_dotenv
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.db.database import database_stats
+from app.growth import get_growth_scheduler
+from app.hashing import get_password_hasher
+from app.identity_cache import get_identity_cache
+from app.idempotency import get_idempotency_store
+from app.leaderboard import get_leaderboard
+from app.logging_config import logging_stats
+from app.login_guard import get_login_guard
+from app.quiz_sessions import get_used_quiz_sessions
+from app.rate_limit import get_rate_limiter
+from app.realtime import get_broker
+
+load_dotenv()
+
+# без токена эндпоинт выключен: метрики раскрывают состояние пулов, кэшей и счетчики входов
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+def require_metrics_token(authorization: str = Header(None)):
+    """Authorization: Bearer <METRICS_TOKEN>"""
+    if not METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@router.get("", dependencies=[Depends(require_metrics_token)])
+async def get_metrics():
+    """Внутренние метрики процесса"""
+    return {
+        "database": database_stats(),
+        "password_hashing": get_password_hasher().stats(),
+        "identity_cache": get_identity_cache().stats(),
+        "leaderboard": get_leaderboard().stats(),
+        "idempotency": get_idempotency_store().stats(),
+        "tree_growth": get_growth_scheduler().stats(),
+        "realtime": get_broker().stats(),
+        "logging": logging_stats(),
+        "rate_limit": get_rate_limiter().stats(),
+        "login_guard": get_login_guard().stats(),
+        "quiz_sessions": get_used_quiz_sessions().stats(),
+    }
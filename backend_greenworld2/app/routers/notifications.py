@@ -0,0 +1,35 @@
+# app/routers/notifications.py
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_db
+from app.dependencies import get_current_user
+from app.models.users import User
+from app.responses import ORJSONResponse
+from app.notifications import mark_read, unread_feed
+from app.schemas.notifications import NotificationOut, NotificationsRead, NotificationsReadResult
+
+router = APIRouter(prefix="/notifications", tags=["notifications"])
+
+@router.get("/unread", response_model=List[NotificationOut])
+async def get_unread(
+    limit: int = Query(50, ge=1, le=100),
+    cursor: int = Query(None, description="X-Next-Cursor из предыдущего ответа"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Непрочитанные уведомления от новых к старым"""
+    notifications, next_cursor = await unread_feed(db, current_user.id, limit=limit, cursor=cursor)
+    headers = {"X-Next-Cursor": str(next_cursor)} if next_cursor is not None else None
+    return ORJSONResponse(notifications, headers=headers)
+
+@router.post("/read", response_model=NotificationsReadResult)
+async def read_notifications(
+    body: NotificationsRead,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Отметить прочитанными переданные ids или все до up_to"""
+    updated = await mark_read(db, current_user.id, ids=body.ids, up_to=body.up_to)
+    return NotificationsReadResult(updated=updated)
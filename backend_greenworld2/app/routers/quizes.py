@@ -1,29 +1,47 @@
 # app/routers/quizes.py
-from fastapi import APIRouter, Depends, HTTPException
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.dependencies import get_current_user
 from app.models.users import User
 from app.models.questions import Question
-from app.schemas.quizes import QuizSubmission, QuizResult
+from app.schemas.quizes import QuizSubmission, QuizResult, QuizSession
+from app.auth import create_quiz_token, verify_quiz_token
+from app.quiz_sessions import get_used_quiz_sessions
+from app.question_bank import get_question_bank, refresh_question_bank
+from app.responses import ORJSONResponse
 
 router = APIRouter(prefix="/quizes", tags=["quizes"])
-limiter = Limiter(key_func=get_remote_address)
 
-@router.get("/questions/")
+QUESTION_COLUMNS = (
+    Question.id, Question.question_text, Question.correct_answer,
+    Question.option1, Question.option2, Question.option3,
+)
+
+@router.get("/questions/", response_model=QuizSession)
 async def get_questions(
-    skip: int = 0, 
-    limit: int = 25,
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(25, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
 ):
-    result = await db.execute(
-        select(Question).offset(skip).limit(limit)
-    )
-    return result.scalars().all()
+    """Случайные вопросы и одноразовый токен сессии игрока со списком выданных id"""
+    bank = await get_question_bank(db)
+    question_ids = bank.sample(limit)
+    if not question_ids:
+        raise HTTPException(status_code=404, detail="Вопросы не найдены")
+
+    result = await db.execute(select(*QUESTION_COLUMNS).where(Question.id.in_(question_ids)))
+    by_id = {row.id: row._mapping for row in result}
+    questions = [by_id[qid] for qid in question_ids if qid in by_id]
+
+    # строки из БД уже в форме QuizSession: без ORM-объектов и проверки схемой
+    return ORJSONResponse({
+        "session_token": create_quiz_token([q["id"] for q in questions], current_user.id),
+        "questions": questions,
+    })
 
 @router.post("/submit/", response_model=QuizResult)
 async def submit_quiz(
@@ -31,21 +49,22 @@ async def submit_quiz(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    result = await db.execute(
-        select(Question).offset(submission.skip).limit(submission.limit)
-    )
-    questions = result.scalars().all()
+    session = verify_quiz_token(submission.session_token)
+    if not session or not session["qids"] or session["uid"] != current_user.id:
+        raise HTTPException(status_code=400, detail="Недействительная сессия викторины")
+    if not await get_used_quiz_sessions().claim(session["jti"], session["exp"] - time.time()):
+        raise HTTPException(status_code=409, detail="Сессия викторины уже сдана")
+    question_ids = session["qids"]
 
-    if not questions:
-        raise HTTPException(status_code=404, detail="Вопросы не найдены")
-
-    correct_count = 0
-    for question in questions:
-        user_answer = submission.answers.get(str(question.id))
-        if user_answer == question.correct_answer:
-            correct_count += 1
+    # проверяем ровно те вопросы, что были выданы, по ключу ответов в памяти
+    bank = await get_question_bank(db)
+    if any(question_id not in bank for question_id in question_ids):
+        # вопрос мог быть импортирован через другой воркер после нашей загрузки
+        await refresh_question_bank(db)
+    correct_count = bank.score(question_ids, submission.answers)
 
     return QuizResult(
         score=correct_count,
-        user_id=current_user.id
-    )
\ No newline at end of file
+        user_id=current_user.id,
+        total_questions=len(question_ids)
+    )
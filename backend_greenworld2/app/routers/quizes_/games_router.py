@@ -1,29 +1,40 @@
 # app/routers/quizes/games_router.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from slowapi import Limiter
-from slowapi.util import get_remote_address
 
 from app.db.database import get_db
 from app.dependencies import get_current_user
-from app.crud import award_coins_atomic
+from app.game_ingest import accept_game_result
+from app.idempotency import IdempotentRequest, idempotency
+from app.schemas.quizes import GameResultCreate
 
 router = APIRouter()
-limiter = Limiter(key_func=get_remote_address)
 
 @router.post("/result")
-async def post_game_result(payload: dict, db: AsyncSession = Depends(get_db), user=Depends(get_current_user)):
-    # Your scoring logic; for example:
-    score = payload.get("score", 0)
-    duration = payload.get("duration_sec", 0)
+async def post_game_result(
+    payload: GameResultCreate,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+    idem: IdempotentRequest = Depends(idempotency),
+):
+    score = payload.score
+    duration = payload.duration_sec
     # Convert score -> coins (tweak formula as needed)
     coins = max(0, score // 2)
 
-    # Persist atomically
-    result = award_coins_atomic(
-        db=db,
-        user_id=user.id,
-        coins=coins,
-        result_payload={"score": score, "duration_sec": duration}
-    )
-    return {"ok": True, "awarded": coins, "result_id": result.id}
+    async def accept():
+        # immediate: результат и монеты записаны атомарно; eventual: результат в очереди (202)
+        result = await accept_game_result(
+            db,
+            user_id=user.id,
+            coins=coins,
+            result_payload={"title": payload.title or "game", "score": score, "duration_sec": duration},
+            ingest_id=idem.record_key,
+        )
+        if result["queued"]:
+            response.status_code = 202
+        return result
+
+    # повтор с тем же Idempotency-Key вернет первый ответ и не начислит монеты второй раз
+    return await idem.run(accept)
@@ -1,47 +1,106 @@
 # app/routers/quizes/import_router.py
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
+import codecs
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.dependencies import get_current_user
+from app.logging_config import logger
 from app.models.questions import Question
+from app.question_bank import refresh_question_bank
 
 router = APIRouter()
 
-def parse_blocks(text: str):
-    # 6 lines per block: Q, correct, wrong1, wrong2, wrong3, blank
-    blocks = []
-    lines = [l.rstrip("\n\r") for l in text.splitlines()]
-    i = 0
-    while i + 5 < len(lines):
-        q = lines[i].strip()
-        correct = lines[i+1].strip()
-        wrongs = [lines[i+2].strip(), lines[i+3].strip(), lines[i+4].strip()]
-        # lines[i+5] is blank separator
-        blocks.append((q, correct, wrongs))
-        i += 6
-    return blocks
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
 
-@router.post("/text", summary="Bulk import questions (6-line blocks)")
-async def import_questions_text(request: Request, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    text = await request.body()
+async def iter_lines(chunks):
+    # Декодируем поток по кускам: многобайтовый символ может быть разрезан между чанками
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    tail = ""
     try:
-        text = text.decode("utf-8")
-    except Exception:
+        async for chunk in chunks:
+            tail += decoder.decode(chunk)
+            *lines, tail = tail.split("\n")
+            for line in lines:
+                yield line.rstrip("\r")
+        tail += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
         raise HTTPException(400, "Expecting UTF-8 text/plain body")
-    blocks = parse_blocks(text)
-    if not blocks:
-        raise HTTPException(400, "No question blocks found")
+    if tail:
+        yield tail.rstrip("\r")
+
+async def iter_blocks(lines):
+    # 6 lines per block: Q, correct, wrong1, wrong2, wrong3, blank
+    block = []
+    async for line in lines:
+        block.append(line.strip())
+        if len(block) == 6:
+            # block[5] is blank separator
+            yield block[0], block[1], block[2:5]
+            block = []
+    if len(block) == 5:
+        # последний блок без завершающей пустой строки
+        yield block[0], block[1], block[2:5]
+
+async def insert_batch(db: AsyncSession, batch: list) -> int:
+    """Вставить пачку вопросов, пропуская уже существующие question_text; возвращает число вставленных"""
+    unique = {}
+    for q, correct, wrongs in batch:
+        unique.setdefault(q, (correct, wrongs))
+
+    existing = await db.execute(select(Question.question_text).where(Question.question_text.in_(list(unique))))
+    for (text,) in existing:
+        unique.pop(text, None)
+    if not unique:
+        return 0
 
-    created = 0
-    for q, correct, wrongs in blocks:
-        item = Question(
-            question_text=q,
-            correct_answer=correct,
-            option1=wrongs[0],
-            option2=wrongs[1],
-            option3=wrongs[2]
-        )
-        db.add(item)
-        created += 1
-    db.commit()
-    return {"ok": True, "created": created}
+    if db.bind.dialect.name == "postgresql":
+        # xid транзакции назначается до выдачи id вопросов: на этом держится граница QuestionBank.settled_id
+        await db.execute(select(func.pg_current_xact_id()))
+    await db.execute(insert(Question), [
+        {
+            "question_text": q,
+            "correct_answer": correct,
+            "option1": wrongs[0],
+            "option2": wrongs[1],
+            "option3": wrongs[2],
+        }
+        for q, (correct, wrongs) in unique.items()
+    ])
+    await db.commit()
+    return len(unique)
+
+@router.post("/text", summary="Bulk import questions (6-line blocks)")
+async def import_questions_text(
+    request: Request,
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=10000),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """Потоковый импорт: тело читается по частям, вопросы пишутся пачками по batch_size"""
+    created = skipped = batches = 0
+    batch = []
+
+    async def flush():
+        nonlocal created, skipped, batches
+        inserted = await insert_batch(db, batch)
+        created += inserted
+        skipped += len(batch) - inserted
+        batches += 1
+        logger.info("Question import batch %d: %d inserted, %d skipped (total %d)",
+                    batches, inserted, len(batch) - inserted, created)
+        batch.clear()
+
+    async for block in iter_blocks(iter_lines(request.stream())):
+        batch.append(block)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+
+    if not batches:
+        raise HTTPException(400, "No question blocks found")
+    if created:
+        await refresh_question_bank(db)
+    return {"ok": True, "created": created, "skipped": skipped, "batches": batches}
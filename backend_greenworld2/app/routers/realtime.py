@@ -0,0 +1,50 @@
+# app/routers/realtime.py
+from fastapi import APIRouter, HTTPException, Query, WebSocket
+
+from app.auth import get_token_codec
+from app.db.database import AsyncSessionLocal
+from app.dependencies import user_from_token
+from app.realtime import CLOSE_UNAUTHORIZED, REALTIME_MAX_CONNECTIONS, Subscriber, get_broker, serve
+
+router = APIRouter(tags=["realtime"])
+
+# 1013 Try Again Later - узел заполнен
+CLOSE_BUSY = 1013
+
+@router.websocket("/ws")
+async def realtime_socket(websocket: WebSocket, token: str = Query(None)):
+    """
+    Поток событий текущего пользователя: tree, coins, notification (JSON-сообщения с полем type).
+    Токен - в ?token= (браузерный WebSocket не передает заголовки) или в Authorization: Bearer.
+    """
+    if get_broker().connections >= REALTIME_MAX_CONNECTIONS:
+        await websocket.close(code=CLOSE_BUSY)
+        return
+
+    if token is None:
+        scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+        token = token if scheme.lower() == "bearer" else None
+
+    async def authorize():
+        # сессия нужна только для проверки токена: открытый сокет не держит соединение с БД
+        async with AsyncSessionLocal() as db:
+            return await user_from_token(token, db)
+
+    try:
+        user = await authorize()
+    except HTTPException:
+        await websocket.close(code=CLOSE_UNAUTHORIZED)
+        return
+
+    async def still_authorized() -> bool:
+        # после request_recheck(): заблокированный пользователь или сменивший email отключается
+        try:
+            await authorize()
+            return True
+        except HTTPException:
+            return False
+
+    # токен уже проверен user_from_token, decode берет claims из кэша
+    expires_at = get_token_codec().decode(token).get("exp")
+    await websocket.accept()
+    await serve(websocket, Subscriber(user.id), authorize=still_authorized, expires_at=expires_at)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.schemas.tree_catalog import TreeCatalogOut
-from app.crud import get_tree_catalog, buy_and_plant_tree, init_tree_catalog
+from app.crud import buy_and_plant_tree, init_tree_catalog
+from app.catalog_cache import get_catalog_snapshot
 from app.dependencies import get_current_user
+from app.idempotency import IdempotentRequest, idempotency
 from app.models.users import User
 from app.models.trees import Tree
 from app.schemas.trees import TreeOut
@@ -13,19 +15,32 @@ from app.schemas.trees import TreeOut
 router = APIRouter(prefix="/tree-catalog", tags=["tree-catalog"])
 
 @router.get("/", response_model=List[TreeCatalogOut])
-async def get_catalog(db: AsyncSession = Depends(get_db)):
-    """Получить весь каталог деревьев"""
-    return await get_tree_catalog(db)
+async def get_catalog(request: Request, db: AsyncSession = Depends(get_read_db)):
+    """Получить весь каталог деревьев (с поддержкой If-None-Match / If-Modified-Since)"""
+    snapshot = await get_catalog_snapshot(db)
+    headers = {
+        "ETag": snapshot.etag,
+        "Last-Modified": snapshot.last_modified,
+        "Cache-Control": "no-cache",
+    }
+
+    if snapshot.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 @router.post("/buy/{tree_type_id}", response_model=TreeOut)
 async def buy_tree(
     tree_type_id: int,
     custom_name: str = None,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idem: IdempotentRequest = Depends(idempotency),
 ):
-    """Купить и посадить дерево из каталога"""
-    return await buy_and_plant_tree(db, current_user.id, tree_type_id, custom_name)
+    """Купить и посадить дерево из каталога (повтор с тем же Idempotency-Key вернет первый ответ)"""
+    return await idem.run(
+        lambda: buy_and_plant_tree(db, current_user.id, tree_type_id, custom_name, idempotency_key=idem.record_key)
+    )
 
 @router.post("/init")
 async def initialize_catalog(db: AsyncSession = Depends(get_db)):
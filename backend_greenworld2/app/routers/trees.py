@@ -10,6 +10,8 @@ from app.models.trees import Tree
 from app.models.users import User
 from app.crud import get_tree_owned, upgrade_tree, list_trees, update_tree as crud_update_tree
 from app.dependencies import get_current_user
+from app.idempotency import IdempotentRequest, idempotency
+from app.responses import ORJSONResponse
 
 router = APIRouter()
 
@@ -19,7 +21,9 @@ async def my_trees(
     user: User = Depends(get_current_user)
 ):
     """Получить все мои деревья"""
-    return await list_trees(db, user.id)
+    trees = await list_trees(db, user.id)
+    # строки уже в форме TreeOut: сериализуем сами, без проверки и jsonable_encoder на каждое дерево
+    return ORJSONResponse(trees)
 
 @router.get("/{tree_id}", response_model=TreeOut)
 async def get_tree_endpoint(
@@ -44,7 +48,8 @@ async def update_tree_endpoint(
 async def upgrade_tree_endpoint(
     tree_id: int, 
     db: AsyncSession = Depends(get_db), 
-    user: User = Depends(get_current_user)
+    user: User = Depends(get_current_user),
+    idem: IdempotentRequest = Depends(idempotency),
 ):
-    """Улучшить дерево"""
-    return await upgrade_tree(db, user.id, tree_id, use_coins=True)
\ No newline at end of file
+    """Улучшить дерево (повтор с тем же Idempotency-Key вернет первый ответ)"""
+    return await idem.run(lambda: upgrade_tree(db, user.id, tree_id, use_coins=True, idempotency_key=idem.record_key))
\ No newline at end of file
@@ -0,0 +1,19 @@
+# app/schemas/notifications.py
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel, conlist
+
+class NotificationOut(BaseModel):
+    id: int
+    message: str
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class NotificationsRead(BaseModel):
+    ids: Optional[conlist(int, min_items=1, max_items=1000)] = None  # конкретные уведомления
+    up_to: Optional[int] = None  # или все непрочитанные с id <= up_to
+
+class NotificationsReadResult(BaseModel):
+    updated: int
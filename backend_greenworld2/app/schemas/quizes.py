@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, conint, constr
 from typing import Optional, List, Dict
 
 # ----- QUESTION -----
@@ -16,7 +16,12 @@ class Question(QuestionBase):
     id: int
 
     class Config:
-        from_attributes = True
+        orm_mode = True
+
+# ----- QUIZ SESSION -----
+class QuizSession(BaseModel):
+    session_token: str  # подписанный список выданных id вопросов
+    questions: List[Question]
 
 # ----- QUIZ RESULT -----
 class QuizResultCreate(BaseModel):
@@ -27,17 +32,40 @@ class QuizResult(BaseModel):
     id: Optional[int] = None
     user_id: Optional[int] = None
     score: int
+    total_questions: Optional[int] = None
 
     class Config:
-        from_attributes = True
+        orm_mode = True
 
 # ----- QUIZ SUBMISSION -----
 class QuizSubmission(BaseModel):
     answers: Dict[str, str]
     test_type: int
-    skip: int
-    limit: int
+    session_token: str
     
+# ----- GAME RESULT -----
+# пределы одной игры: больше не набирается, а games_result.score - 32-битный Integer
+GAME_SCORE_MAX = 10_000
+GAME_DURATION_MAX = 24 * 60 * 60
+
+class GameResultCreate(BaseModel):
+    score: conint(ge=0, le=GAME_SCORE_MAX) = 0  # сумма очков игрока только растет (app/leaderboard.py)
+    duration_sec: conint(ge=0, le=GAME_DURATION_MAX) = 0
+    title: Optional[constr(max_length=100)] = None
+
 class UserRating(BaseModel):
     nickname: str
-    avg_percentage: float
\ No newline at end of file
+    avg_percentage: float
+
+# ----- LEADERBOARD -----
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    nickname: Optional[str] = None
+    total_score: int
+    games_played: int
+    avg_score: float
+
+class LeaderboardAround(BaseModel):
+    rank: Optional[int] = None  # None, если игрок еще не играл
+    entries: List[LeaderboardEntry]
@@ -13,4 +13,4 @@ class TreeCatalogOut(TreeCatalogBase):
     id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        orm_mode = True
\ No newline at end of file
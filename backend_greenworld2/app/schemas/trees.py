@@ -23,21 +23,4 @@ class TreeOut(BaseModel):
     tree_type_name: str  # Добавляем имя типа дерева
 
     class Config:
-        from_attributes = True
-        
-    # Добавляем кастомный метод для получения имени типа дерева
-    @classmethod
-    def from_orm(cls, obj):
-        # Создаем словарь с данными
-        data = {
-            'id': obj.id,
-            'created_by': obj.created_by,
-            'tree_type_id': obj.tree_type_id,
-            'name': obj.name,
-            'price': obj.price,
-            'lvl': obj.lvl,
-            'next_upgrade_at': obj.next_upgrade_at,
-            'created_at': obj.created_at,
-            'tree_type_name': obj.tree_type.name if obj.tree_type else "Unknown"
-        }
-        return cls(**data)
\ No newline at end of file
+        orm_mode = True
@@ -0,0 +1,51 @@
+# app/tasks.py
+import asyncio
+import os
+from celery import Celery
+from celery.signals import worker_ready
+from dotenv import load_dotenv
+
+from app.cache import REDIS_URL, get_redis
+from app.db.database import AsyncSessionLocal
+from app.game_ingest import flush_pending
+from app.logging_config import logger
+from app.models import notifications, tree_catalog, trees  # noqa: F401  регистрирует модели для связей User
+
+load_dotenv()
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", REDIS_URL or "redis://redis:6379/0")
+
+celery = Celery("greenworld", broker=CELERY_BROKER_URL)
+celery.conf.update(
+    task_ignore_result=True,
+    worker_prefetch_multiplier=1,
+)
+
+# Один event loop на процесс воркера: пул соединений движка привязан к своему loop
+_loop = None
+
+
+def run_async(coro):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+
+@celery.task(name="games.flush_results")
+def flush_game_results():
+    """Записать накопленные результаты игр пачками"""
+    redis = get_redis()
+    if redis is None:
+        logger.warning("REDIS_URL is not set, game result queue is disabled")
+        return 0
+    flushed = run_async(flush_pending(redis, AsyncSessionLocal))
+    if flushed:
+        logger.info("Game results flushed: %d", flushed)
+    return flushed
+
+
+@worker_ready.connect
+def _flush_on_start(**kwargs):
+    # очередь могла накопиться, пока воркер был остановлен
+    flush_game_results.delay()
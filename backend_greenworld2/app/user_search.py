@@ -0,0 +1,74 @@
+# app/user_search.py
+from sqlalchemy import column, table, text
+from sqlalchemy.exc import OperationalError
+
+from app.logging_config import logger
+from app.models.users import User
+
+# Поиск по подстроке имени.
+# PostgreSQL: ILIKE по GIN-индексу pg_trgm (миграция 20261017_0005).
+# SQLite: внешняя FTS5-таблица с токенизатором trigram поверх users, синхронизируется триггерами.
+# Триграммный индекс помогает только для строк от 3 символов; короче - обычный ILIKE.
+TRIGRAM_MIN_LENGTH = 3
+
+# Актуальная схема индекса для баз, созданных через create_all. Базы под Alembic получают
+# индекс из миграции 20261017_0005 (ее копия DDL заморожена): меняя схему здесь,
+# добавьте миграцию, которая переведет на нее существующие базы.
+SQLITE_FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "full_name, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ai AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_ad AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name); END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_au AFTER UPDATE OF full_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, full_name) VALUES ('delete', old.id, old.full_name); "
+    "INSERT INTO users_fts(rowid, full_name) VALUES (new.id, new.full_name); END",
+]
+
+users_fts = table("users_fts", column("rowid"), column("full_name"))
+
+_sqlite_fts = False
+
+
+def ensure_search_index(conn):
+    """
+    Создать FTS5-индекс имен для SQLite, если его нет (для баз, созданных через create_all).
+    Вызывается через conn.run_sync при старте; для PostgreSQL индекс создает миграция.
+    """
+    global _sqlite_fts
+    if conn.dialect.name != "sqlite":
+        return
+    exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'users_fts'")).first()
+    if not exists:
+        try:
+            for ddl in SQLITE_FTS_DDL:
+                conn.execute(text(ddl))
+            conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        except OperationalError as e:
+            # SQLite без FTS5 или токенизатора trigram (< 3.34): остается ILIKE
+            logger.warning("User search FTS index unavailable: %s", e)
+            return
+    _sqlite_fts = True
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def with_name_search(query, term: str):
+    """
+    Добавить к запросу по users поиск подстроки term в full_name без учета регистра.
+    Возвращает (запрос, колонка-ключ для сортировки и курсора).
+
+    С FTS5 ключом служит rowid индекса: тогда SQLite идет по совпадениям в порядке rowid
+    и останавливается на LIMIT, не собирая все совпадения в память.
+    """
+    if _sqlite_fts and len(term) >= TRIGRAM_MIN_LENGTH:
+        # фраза в кавычках - поиск подстроки; кавычки внутри удваиваются
+        phrase = '"' + term.replace('"', '""') + '"'
+        query = query.join(users_fts, users_fts.c.rowid == User.id).where(
+            text("users_fts MATCH :phrase").bindparams(phrase=phrase)
+        )
+        return query, users_fts.c.rowid
+    return query.where(User.full_name.ilike(f"%{_escape_like(term)}%", escape="\\")), User.id
@@ -0,0 +1,78 @@
+# app/weak_passwords.py
+import hashlib
+import os
+from array import array
+from bisect import bisect_left
+from dotenv import load_dotenv
+
+from app.logging_config import logger
+
+load_dotenv()
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+WEAK_PASSWORDS_FILE = os.getenv("WEAK_PASSWORDS_FILE", os.path.join(script_dir, "top_passwords.txt"))
+
+
+def _digest(password: str) -> int:
+    """64-битный отпечаток пароля (вместо хранения самих строк)"""
+    return int.from_bytes(hashlib.blake2b(password.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class WeakPasswordIndex:
+    """
+    Неизменяемый индекс слабых паролей.
+
+    Хранит отсортированный массив 64-битных отпечатков (8 байт на запись),
+    поэтому список уровня rockyou (~14M) занимает ~110 МБ, а 1M — ~8 МБ.
+    Проверка — бинарный поиск, O(log n), без обращений к диску.
+    """
+
+    __slots__ = ("_digests",)
+
+    def __init__(self, passwords=()):
+        digests = array("Q", sorted({_digest(p) for p in passwords}))
+        self._digests = digests
+
+    @classmethod
+    def from_file(cls, path: str) -> "WeakPasswordIndex":
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return cls(line.strip() for line in f if line.strip())
+
+    def __contains__(self, password: str) -> bool:
+        digests = self._digests
+        key = _digest(password)
+        i = bisect_left(digests, key)
+        return i < len(digests) and digests[i] == key
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    @property
+    def nbytes(self) -> int:
+        return self._digests.itemsize * len(self._digests)
+
+
+_index: WeakPasswordIndex | None = None
+
+
+def load_weak_passwords(path: str = WEAK_PASSWORDS_FILE) -> WeakPasswordIndex:
+    """Построить индекс (вызывается при старте приложения)"""
+    global _index
+    try:
+        _index = WeakPasswordIndex.from_file(path)
+        logger.info("Weak password index loaded: %d entries, %d bytes", len(_index), _index.nbytes)
+    except FileNotFoundError:
+        logger.warning("Weak password list not found: %s", path)
+        _index = WeakPasswordIndex()
+    return _index
+
+
+def get_weak_passwords() -> WeakPasswordIndex:
+    """Индекс слабых паролей; строится лениво при первом обращении"""
+    if _index is None:
+        return load_weak_passwords()
+    return _index
+
+
+def is_weak_password(password: str) -> bool:
+    return password in get_weak_passwords()
@@ -0,0 +1,8 @@
+# app/workers.py
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionWorker(UvicornWorker):
+    """Воркер gunicorn: uvloop и httptools явно - без них воркер не стартует, а не уходит молча на asyncio/h11"""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
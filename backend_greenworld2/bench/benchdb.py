@@ -0,0 +1,47 @@
+# bench/benchdb.py
+"""
+База для бенчмарков. Без DATABASE_URL - новая SQLite во временном каталоге.
+Бенчмарки пересоздают схему (drop_all) или пишут синтетические строки (вопросы из них
+попали бы игрокам), поэтому с постоянным DATABASE_URL работают только при явном флаге
+--i-know-this-drops-the-db: иначе случайно экспортированный URL рабочей базы стоил бы данных.
+
+Вызывать до импорта app: engine создается из DATABASE_URL при импорте.
+"""
+import os
+import sys
+import tempfile
+
+from sqlalchemy.engine import make_url
+
+DROP_FLAG = "--i-know-this-drops-the-db"
+
+
+def is_temporary(url: str) -> bool:
+    """SQLite в памяти или во временном каталоге"""
+    parsed = make_url(url)
+    if not parsed.get_backend_name().startswith("sqlite"):
+        return False
+    if parsed.database in (None, "", ":memory:"):
+        return True
+    path = os.path.realpath(parsed.database)
+    return path.startswith(os.path.realpath(tempfile.gettempdir()) + os.sep)
+
+
+def use_bench_database(name: str):
+    """
+    Задать DATABASE_URL временной SQLite <name>.db или проверить заданный: постоянная база
+    требует DROP_FLAG в аргументах (флаг убирается из sys.argv, чтобы argparse бенчмарка его не видел).
+    """
+    url = os.environ.get("DATABASE_URL")
+    if url is None:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/{name}.db"
+        return
+    if DROP_FLAG in sys.argv:
+        sys.argv.remove(DROP_FLAG)
+        return
+    if not is_temporary(url):
+        sys.exit(
+            f"{sys.argv[0]}: DATABASE_URL={make_url(url).render_as_string(hide_password=True)} "
+            f"is not a temporary database and this benchmark drops tables or writes synthetic rows. "
+            f"Unset DATABASE_URL to use a temporary SQLite, or pass {DROP_FLAG}."
+        )
@@ -0,0 +1,97 @@
+# bench/coin_ledger_bench.py
+"""
+Начисления монет: UPDATE строки users против append в coin_ledger при высокой параллельности,
+плюс стоимость чтения баланса до и после компакции.
+
+Разница заметна на PostgreSQL (DATABASE_URL=postgresql+asyncpg://...), где UPDATE одной
+"горячей" строки сериализуется блокировкой, а INSERT в журнал - нет. SQLite сериализует всех писателей.
+Схема пересоздается: постоянной базе нужен флаг --i-know-this-drops-the-db (bench/benchdb.py).
+
+    python -m bench.coin_ledger_bench [--writes 2000] [--users 10] [--concurrency 32]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("ledger")
+
+from sqlalchemy import insert, update
+
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.ledger import compact_balances, credit_coins, get_balance
+import app.crud  # noqa: F401 - регистрирует все модели
+from app.models.users import User
+
+
+async def row_update(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(User).where(User.id == user_id).values(coins=User.coins + 1))
+        await db.commit()
+
+
+async def ledger_append(user_id: int):
+    async with AsyncSessionLocal() as db:
+        await credit_coins(db, user_id, 1, reason="bench")
+        await db.commit()
+
+
+async def drive(fn, writes: int, users: int, concurrency: int) -> float:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with limit:
+            await fn(i % users + 1)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(writes)))
+    return writes / (time.perf_counter() - started)
+
+
+async def read_latency(user_id: int, reads: int = 200) -> float:
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        for _ in range(reads):
+            await get_balance(db, user_id)
+        return (time.perf_counter() - started) / reads * 1000
+
+
+async def main_async(args):
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"full_name": f"Bench {i}", "email_user": f"bench{i}@example.com", "hashed_password": "-", "coins": 0}
+            for i in range(args.users)
+        ])
+
+    print(f"row update:    {await drive(row_update, args.writes, args.users, args.concurrency):>8.0f} writes/s")
+    print(f"ledger append: {await drive(ledger_append, args.writes, args.users, args.concurrency):>8.0f} writes/s")
+
+    print(f"balance read, tail of {args.writes // args.users} entries: {await read_latency(1):.3f} ms")
+    if engine.dialect.name == "postgresql":
+        # PostgreSQL сворачивает окно со второго прохода: первый запоминает границу (ledger._settled_cutoff)
+        async with AsyncSessionLocal() as db:
+            await compact_balances(db, batch=args.writes)
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        folded = await compact_balances(db, batch=args.writes)
+        print(f"compaction: {folded} users in {(time.perf_counter() - started) * 1000:.1f} ms")
+    print(f"balance read after compaction: {await read_latency(1):.3f} ms")
+    async with AsyncSessionLocal() as db:
+        print(f"balance user 1: {await get_balance(db, 1)} (expected {2 * args.writes // args.users})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=8)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
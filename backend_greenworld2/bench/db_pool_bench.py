@@ -0,0 +1,100 @@
+# bench/db_pool_bench.py
+"""
+Пропускная способность читающих запросов (пользователь по id) при разном размере пула
+соединений под фиксированной конкурентностью; для сравнения - NullPool (прежнее
+поведение для SQLite: новое соединение на каждую сессию) и pool_pre_ping.
+
+    python -m bench.db_pool_bench [--concurrency 64] [--requests 20000]
+
+С DATABASE_URL=postgresql+asyncpg://... и --i-know-this-drops-the-db меряет PostgreSQL (схема пересоздается).
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+from bench.benchdb import use_bench_database
+
+use_bench_database("pool")
+
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.db.database import DATABASE_URL, Base, MeteredPool, engine, engine_options, pool_stats
+from app.models.users import User
+
+
+async def seed(users: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"full_name": f"Player {i}", "sex": "М", "email_user": f"p{i}@example.com",
+             "hashed_password": "-", "coins": 100}
+            for i in range(1, users + 1)
+        ])
+
+
+# оператор собирается один раз: меряем пул и драйвер, а не построение запроса
+USER_BY_ID = select(User.id, User.full_name, User.coins).where(User.id == bindparam("user_id"))
+
+
+async def run(label: str, bench_engine, args) -> None:
+    sessions = async_sessionmaker(bind=bench_engine, expire_on_commit=False, class_=AsyncSession)
+    rnd = random.Random(7)
+    user_ids = [rnd.randint(1, args.users) for _ in range(args.requests)]
+    latencies = []
+
+    async def worker(ids):
+        for user_id in ids:
+            started = time.perf_counter()
+            async with sessions() as db:
+                await db.execute(USER_BY_ID, {"user_id": user_id})
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(user_ids[i::args.concurrency]) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    stats = pool_stats(bench_engine)
+    waits = f"waits {stats['waits']:>6}  wait {stats['wait_ms_total'] / 1000:6.2f} s" if "waits" in stats else ""
+    print(f"{label:<22} {args.requests / elapsed:8.0f} req/s  p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms"
+          f"  p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms  {waits}")
+    await bench_engine.dispose()
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    await seed(args.users)
+    await engine.dispose()
+    print(f"{args.concurrency} concurrent clients, {args.requests} requests ({engine.dialect.name})")
+
+    url, options = engine_options(DATABASE_URL)
+    await run("NullPool", create_async_engine(url, **{**options, "poolclass": NullPool}), args)
+    for size in args.sizes:
+        pooled = {**options, "poolclass": MeteredPool, "pool_size": size, "max_overflow": 0}
+        await run(f"pool_size={size}", create_async_engine(url, **pooled), args)
+    pooled = {**options, "poolclass": MeteredPool, "pool_size": args.sizes[-1], "max_overflow": 0, "pool_pre_ping": True}
+    await run(f"pool_size={args.sizes[-1]} pre_ping", create_async_engine(url, **pooled), args)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
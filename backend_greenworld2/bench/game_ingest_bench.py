@@ -0,0 +1,133 @@
+# bench/game_ingest_bench.py
+"""
+Скорость записи результатов игр: по транзакции на результат (immediate)
+против пачек воркера (eventual). Если задан REDIS_URL, дополнительно
+прогоняется полный путь через очередь Redis.
+
+    python -m bench.game_ingest_bench [--results 20000] [--users 1000] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("games")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import delete, func, insert, select
+
+from app.cache import get_redis
+from app.crud import award_coins_atomic
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.game_ingest import PENDING_KEY, flush_pending, ingest_batch
+from app.models.coin_ledger import CoinLedger
+from app.models.gamesResults import GamesResult
+from app.models.player_stats import PlayerStats
+from app.models.users import User
+
+
+def make_items(args, rnd) -> list[dict]:
+    items = []
+    for _ in range(args.results):
+        score = rnd.randint(0, 100)
+        items.append({
+            "ingest_id": uuid.uuid4().hex, "user_id": rnd.randint(1, args.users), "coins": score // 2,
+            "title": "bench", "score": score, "duration_sec": rnd.randint(10, 300),
+        })
+    return items
+
+
+async def reset():
+    async with AsyncSessionLocal() as db:
+        for model in (GamesResult, CoinLedger, PlayerStats):
+            await db.execute(delete(model))
+        await db.commit()
+
+
+async def check(items: list[dict]) -> bool:
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(select(func.count()).select_from(GamesResult))).scalar_one()
+        coins = (await db.execute(select(func.coalesce(func.sum(CoinLedger.delta), 0)))).scalar_one()
+        score = (await db.execute(select(func.coalesce(func.sum(PlayerStats.total_score), 0)))).scalar_one()
+    return (rows, coins, score) == (len(items), sum(i["coins"] for i in items), sum(i["score"] for i in items))
+
+
+async def run_immediate(items, concurrency: int):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(item):
+        async with limit, AsyncSessionLocal() as db:
+            await award_coins_atomic(db, item["user_id"], item["coins"],
+                                     {"title": item["title"], "score": item["score"],
+                                      "duration_sec": item["duration_sec"]})
+
+    await asyncio.gather(*(one(item) for item in items))
+
+
+async def run_batched(items, batch_size: int):
+    for start in range(0, len(items), batch_size):
+        async with AsyncSessionLocal() as db:
+            await ingest_batch(db, items[start:start + batch_size])
+
+
+async def run_queue(redis, items, batch_size: int):
+    async with redis.pipeline(transaction=False) as pipe:
+        for item in items:
+            pipe.rpush(PENDING_KEY, json.dumps(item))
+        await pipe.execute()
+    await flush_pending(redis, AsyncSessionLocal, batch_size)
+
+
+async def measure(label, items, coro) -> bool:
+    await reset()
+    started = time.perf_counter()
+    await coro
+    elapsed = time.perf_counter() - started
+    ok = await check(items)
+    print(f"{label:>10}: {len(items) / elapsed:10.0f} rows/s  ({elapsed:.2f} s)  {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"full_name": f"Player {i}", "sex": "М", "email_user": f"p{i}@example.com", "hashed_password": "-", "coins": 0}
+            for i in range(1, args.users + 1)
+        ])
+        await db.commit()
+
+    items = make_items(args, random.Random(7))
+    ok = await measure("immediate", items[:args.immediate], run_immediate(items[:args.immediate], args.concurrency))
+    ok &= await measure("batched", items, run_batched(items, args.batch_size))
+    redis = get_redis()
+    if redis is not None:
+        await redis.delete(PENDING_KEY)
+        ok &= await measure("queue", items, run_queue(redis, items, args.batch_size))
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--results", type=int, default=20000)
+    # immediate на порядки медленнее, поэтому меряется на части результатов
+    parser.add_argument("--immediate", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+# bench/growth_bench.py
+"""
+Планировщик роста на большой таблице деревьев: сканирование окна дедлайнов
+по частичному индексу, пакетное созревание с уведомлениями и восстановление
+после перезапуска.
+
+    python -m bench.growth_bench [--trees 1000000] [--overdue 20000]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("growth")
+
+from sqlalchemy import func, insert, select, text
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.growth import GrowthScheduler
+from app.models.notifications import Notification
+from app.models.trees import Tree
+from app.models.users import User
+
+
+async def seed(args, now):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    rnd = random.Random(3)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"full_name": f"Gardener {i}", "sex": "М", "email_user": f"g{i}@example.com", "hashed_password": "-"}
+            for i in range(1, args.users + 1)
+        ])
+        for start in range(0, args.trees, 20000):
+            rows = []
+            for i in range(start, min(start + 20000, args.trees)):
+                if i < args.overdue:
+                    deadline, ready = now - timedelta(seconds=rnd.uniform(1, 3600)), False
+                else:
+                    # остальные созреют в течение суток; часть уже созрела и отмечена
+                    deadline, ready = now + timedelta(seconds=rnd.uniform(1, 86400)), rnd.random() < 0.2
+                rows.append({"created_by": rnd.randint(1, args.users), "tree_type_id": 1, "name": f"Tree {i}",
+                             "price": 10, "lvl": rnd.randint(1, 5), "next_upgrade_at": deadline, "is_ready": ready})
+            await db.execute(insert(Tree), rows)
+        await db.commit()
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    await seed(args, now)
+    print(f"{args.trees} trees seeded in {time.perf_counter() - started:.1f} s ({engine.dialect.name})")
+
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as conn:
+            plan = (await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id, next_upgrade_at FROM trees "
+                "WHERE is_ready = 0 AND next_upgrade_at <= '2100-01-01'"
+            ))).all()
+        print("plan:", plan[0][-1])
+
+    scheduler = GrowthScheduler(horizon=args.horizon)
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        loaded = await scheduler.scan(db, now)
+    print(f"scan: {loaded} deadlines in window of {args.horizon:.0f} s, {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    # прогоняем время до конца окна: созревают просроченные и все дедлайны окна
+    end = now + timedelta(seconds=args.horizon)
+    started = time.perf_counter()
+    fired = 0
+    while due := scheduler._pop_due(end.timestamp()):
+        async with AsyncSessionLocal() as db:
+            fired += await scheduler.fire(db, due, end)
+    elapsed = time.perf_counter() - started
+    print(f"fire: {fired} trees matured in {elapsed:.2f} s ({fired / elapsed:.0f} trees/s)")
+
+    async with AsyncSessionLocal() as db:
+        notified = (await db.execute(select(func.count()).select_from(Notification))).scalar_one()
+        expected = (await db.execute(select(func.count()).select_from(Tree).where(
+            Tree.is_ready == False, Tree.next_upgrade_at <= end))).scalar_one()  # noqa: E712
+
+    # перезапуск: новый планировщик восстанавливает окно из индекса, созревшие не возвращаются
+    restarted = GrowthScheduler(horizon=args.horizon)
+    async with AsyncSessionLocal() as db:
+        reloaded = await restarted.scan(db, end)
+    print(f"restart: {reloaded} deadlines reloaded for the next window")
+
+    ok = fired == notified == loaded and expected == 0
+    print("OK" if ok else f"MISMATCH fired={fired} notified={notified} loaded={loaded} left={expected}")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trees", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--overdue", type=int, default=20000)
+    parser.add_argument("--horizon", type=float, default=600)
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
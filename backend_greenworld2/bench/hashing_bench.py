@@ -0,0 +1,76 @@
+# bench/hashing_bench.py
+"""
+Задержка event loop во время "шторма логинов": bcrypt в цикле vs ограниченный пул.
+
+    python -m bench.hashing_bench [--logins 50] [--executor thread|process]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from fastapi import HTTPException
+
+from app.hashing import PasswordHasher, pwd_context, _percentile
+
+
+async def probe(stop: asyncio.Event, lags: list):
+    """Имитирует "посторонний" эндпоинт: замеряет, насколько опаздывает тик в 5 мс"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.005)
+        lags.append(time.perf_counter() - started - 0.005)
+
+
+async def storm(logins: int, hashed: str, hasher: PasswordHasher | None) -> dict:
+    stop, lags = asyncio.Event(), []
+    probe_task = asyncio.create_task(probe(stop, lags))
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        if hasher is None:
+            pwd_context.verify("Zx!qwerty12", hashed)
+            await asyncio.sleep(0)
+            return
+        try:
+            await hasher.verify("Zx!qwerty12", hashed)
+        except HTTPException:
+            rejected += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    return {
+        "elapsed_sec": round(elapsed, 2),
+        "rejected": rejected,
+        "loop_lag_ms_p50": round(_percentile(lags, 0.50) * 1000, 2),
+        "loop_lag_ms_p99": round(_percentile(lags, 0.99) * 1000, 2),
+        "loop_lag_ms_max": round(max(lags, default=0) * 1000, 2),
+    }
+
+
+async def main_async(args):
+    hashed = pwd_context.hash("Zx!qwerty12")
+    print("inline:", await storm(args.logins, hashed, None))
+    hasher = PasswordHasher(workers=args.workers, queue_size=args.queue, kind=args.executor)
+    try:
+        print(f"{args.executor} pool:", await storm(args.logins, hashed, hasher))
+        print("stats:", hasher.stats())
+    finally:
+        hasher.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue", type=int, default=64)
+    parser.add_argument("--executor", default="thread", choices=["thread", "process"])
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
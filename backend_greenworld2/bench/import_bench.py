@@ -0,0 +1,71 @@
+# bench/import_bench.py
+"""
+Пропускная способность потокового импорта вопросов и пиковая память процесса.
+
+    python -m bench.import_bench [--questions 500000] [--batch-size 1000]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("import")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import httpx
+
+from app.db.database import engine
+from app.dependencies import get_current_user
+from app.main import app
+
+
+async def body(questions: int, chunk_blocks: int = 500):
+    """Генератор тела запроса: клиент тоже не держит весь файл в памяти"""
+    buf = []
+    for i in range(questions):
+        buf.append(f"Вопрос номер {i}?\nПравильный {i}\nНеверный A\nНеверный B\nНеверный C\n\n")
+        if len(buf) == chunk_blocks:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+async def main_async(args):
+    engine.echo = False
+    app.dependency_overrides[get_current_user] = lambda: None
+    await app.router.startup()
+    # ASGITransport передает тело по частям (TestClient буферизует его целиком)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        url = f"/quizes/import/text?batch_size={args.batch_size}"
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        started = time.perf_counter()
+        r = await client.post(url, content=body(args.questions), timeout=None)
+        elapsed = time.perf_counter() - started
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(r.status_code, r.json())
+        print(f"{args.questions / elapsed:.0f} questions/s, {elapsed:.1f} s, "
+              f"peak RSS {rss_before / 1024:.0f} -> {rss_after / 1024:.0f} MB")
+
+        # повторный импорт: все вопросы - дубликаты
+        started = time.perf_counter()
+        r = await client.post(url, content=body(args.questions), timeout=None)
+        print("re-import:", r.json(), f"{time.perf_counter() - started:.1f} s")
+    await app.router.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
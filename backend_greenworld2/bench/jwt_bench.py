@@ -0,0 +1,58 @@
+# bench/jwt_bench.py
+"""
+Сколько токенов в секунду проверяет TokenCodec: с кэшем и без, HS256 и RS256.
+
+    python -m bench.jwt_bench [--tokens 1000] [--rounds 5]
+"""
+import argparse
+import sys
+import time
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk
+
+from app.auth import TokenCodec
+
+
+def rsa_codec(cache_size: int) -> TokenCodec:
+    private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    key = jwk.construct(pem, "RS256")
+    return TokenCodec("RS256", key, {"k1": key.public_key()}, kid="k1", cache_size=cache_size)
+
+
+def hs_codec(cache_size: int) -> TokenCodec:
+    secret = "bench-secret" * 4
+    return TokenCodec("HS256", secret, {None: secret}, cache_size=cache_size)
+
+
+def run(codec: TokenCodec, tokens: list, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            codec.decode(token)
+    return rounds * len(tokens) / (time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    exp = int(time.time()) + 3600
+    for name, factory in (("HS256", hs_codec), ("RS256", rsa_codec)):
+        uncached = factory(0)
+        tokens = [uncached.encode({"sub": f"user{i}@example.com", "exp": exp}) for i in range(args.tokens)]
+        cached = TokenCodec(uncached.algorithm, None, uncached._verification_keys, kid=uncached.kid,
+                            cache_size=args.tokens)
+        run(cached, tokens, 1)  # прогрев кэша
+        print(f"{name} uncached: {run(uncached, tokens, args.rounds):>12.0f} tokens/s")
+        print(f"{name} cached:   {run(cached, tokens, args.rounds):>12.0f} tokens/s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+# bench/leaderboard_bench.py
+"""
+Операции рейтинга в памяти на миллионах игроков: загрузка, обновление счета,
+место игрока, топ и соседи.
+
+    python -m bench.leaderboard_bench [--players 1000000] [--ops 100000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from app.leaderboard import MemoryLeaderboard
+
+
+def report(label: str, ops: int, elapsed: float):
+    print(f"{label:>8}: {ops / elapsed:12.0f} ops/s  ({elapsed * 1e6 / ops:.2f} us/op)")
+
+
+async def main_async(args):
+    rnd = random.Random(1)
+    board = MemoryLeaderboard()
+    scores = {user_id: rnd.randint(0, 100000) for user_id in range(1, args.players + 1)}
+
+    started = time.perf_counter()
+    board.replace(scores.items())
+    print(f"load: {args.players} players in {time.perf_counter() - started:.2f} s")
+
+    user_ids = [rnd.randint(1, args.players) for _ in range(args.ops)]
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        scores[user_id] += rnd.randint(0, 100)
+        await board.update(user_id, scores[user_id])
+    report("update", args.ops, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        await board.rank(user_id)
+    report("rank", args.ops, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        await board.entries(0, 10)
+    report("top10", args.ops, time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for user_id in user_ids:
+        rank = await board.rank(user_id)
+        await board.entries(max(rank - 5, 0), rank + 6)
+    report("around", args.ops, time.perf_counter() - started)
+
+    # проверка согласованности с полной сортировкой
+    expected = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    assert await board.entries(0, 100) == expected[:100]
+    probe = user_ids[0]
+    assert expected[await board.rank(probe)][0] == probe
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=1000000)
+    parser.add_argument("--ops", type=int, default=100000)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
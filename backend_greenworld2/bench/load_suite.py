@@ -0,0 +1,359 @@
+# bench/load_suite.py
+"""
+Нагрузочный прогон API: поднимает сервер на SQLite (по умолчанию) или PostgreSQL
+(DATABASE_URL), наполняет базу синтетическими игроками, деревьями, вопросами и
+результатами игр и гоняет сценарии игроков конкурентными клиентами:
+
+    новый игрок:       регистрация -> вход -> сессии игры
+    вернувшийся игрок: вход -> сессии игры
+    сессия игры:       каталог -> покупка -> улучшение -> мои деревья -> вопросы
+                       -> ответы -> результат игры -> профиль -> рейтинг
+
+Итог - пропускная способность и p50/p95/p99 по каждому маршруту. --save-baseline
+сохраняет его в JSON; --baseline сравнивает прогон с сохраненным и завершается
+с кодом 1 при регрессии (p95 или req/s хуже допуска, больше ошибок).
+
+    python -m bench.load_suite --save-baseline bench/load_baseline.json
+    python -m bench.load_suite --baseline bench/load_baseline.json [--tolerance 0.2]
+
+Сравнивать имеет смысл прогоны с теми же параметрами на той же машине.
+ВНИМАНИЕ: база из DATABASE_URL пересоздается (drop_all); постоянную базу бенчмарк
+трогает только с флагом --i-know-this-drops-the-db (bench/benchdb.py).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+from bench.benchdb import use_bench_database
+
+use_bench_database("load")
+
+import httpx
+from sqlalchemy import insert, select
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.crud import init_tree_catalog
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.hashing import hash_password, shutdown_password_hasher
+from app.models.gamesResults import GamesResult
+from app.models.player_stats import PlayerStats
+from app.models.questions import Question
+from app.models.tree_catalog import TreeCatalog
+from app.models.trees import Tree
+from app.models.users import User
+from bench.server_bench import free_port, launch
+
+PASSWORD = "Zx!qwerty12"
+
+# ответы, которые сценарий считает нормальными (например, 402 - кончились монеты)
+EXPECTED = {
+    "POST /tree-catalog/buy/{id}": {200, 402},
+    "POST /trees/{id}/upgrade": {200, 400, 402, 409},
+}
+
+
+async def seed(args) -> int:
+    """Синтетические данные; вернуть число игроков"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    rnd = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+    hashed = await hash_password(PASSWORD)
+    async with AsyncSessionLocal() as db:
+        await init_tree_catalog(db)
+        catalog = (await db.execute(select(TreeCatalog.id))).scalars().all()
+        await db.execute(insert(User), [
+            {"full_name": f"Игрок {i}", "sex": rnd.choice("МЖ"), "email_user": f"seed{i}@example.com",
+             "hashed_password": hashed, "coins": 1000, "is_active": True, "login_attempts": 0}
+            for i in range(1, args.users + 1)
+        ])
+        await db.execute(insert(Tree), [
+            {"created_by": user_id, "tree_type_id": rnd.choice(catalog), "name": f"Дерево {user_id}-{n}",
+             "price": 25, "lvl": rnd.randint(1, 5), "next_upgrade_at": now - timedelta(days=1), "created_at": now}
+            for user_id in range(1, args.users + 1) for n in range(args.trees_per_user)
+        ])
+        await db.execute(insert(Question), [
+            {"question_text": f"Вопрос {i}?", "correct_answer": "Да", "option1": "Нет",
+             "option2": "Может быть", "option3": "Не знаю"}
+            for i in range(args.questions)
+        ])
+        games = [
+            {"user_id": user_id, "title": "game", "score": rnd.randint(0, 100), "duration_sec": rnd.randint(10, 300)}
+            for user_id in range(1, args.users + 1) for _ in range(args.games_per_user)
+        ]
+        await db.execute(insert(GamesResult), games)
+        totals = {}
+        for game in games:
+            score, played = totals.get(game["user_id"], (0, 0))
+            totals[game["user_id"]] = (score + game["score"], played + 1)
+        if totals:
+            await db.execute(insert(PlayerStats), [
+                {"user_id": user_id, "total_score": score, "games_played": played}
+                for user_id, (score, played) in totals.items()
+            ])
+        await db.commit()
+    await engine.dispose()
+    shutdown_password_hasher()
+    return args.users
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (маршрут, статус, секунды)
+        self.enabled = True
+
+    async def call(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        if self.enabled:
+            self.samples.append((route, response.status_code, time.perf_counter() - started))
+        return response
+
+
+async def play_session(client: httpx.AsyncClient, rec: Recorder, headers: dict, rnd: random.Random):
+    catalog = (await rec.call(client, "GET /tree-catalog/", "GET", "/tree-catalog/")).json()
+    bought = await rec.call(client, "POST /tree-catalog/buy/{id}", "POST",
+                            f"/tree-catalog/buy/{rnd.choice(catalog)['id']}",
+                            headers={**headers, "Idempotency-Key": f"{rnd.getrandbits(64):016x}"})
+    if bought.status_code == 200:
+        tree_id = bought.json()["id"]
+        await rec.call(client, "POST /trees/{id}/upgrade", "POST", f"/trees/{tree_id}/upgrade", headers=headers)
+    await rec.call(client, "GET /trees", "GET", "/trees", headers=headers)
+
+    session = (await rec.call(client, "GET /quizes/questions/", "GET", "/quizes/questions/?limit=10",
+                              headers=headers)).json()
+    answers = {str(q["id"]): q["correct_answer"] if rnd.random() < 0.7 else q["option1"]
+               for q in session.get("questions", [])}
+    await rec.call(client, "POST /quizes/submit/", "POST", "/quizes/submit/", headers=headers,
+                   json={"answers": answers, "test_type": 1, "session_token": session.get("session_token", "")})
+    await rec.call(client, "POST /quizes/games/result", "POST", "/quizes/games/result", headers=headers,
+                   json={"score": rnd.randint(0, 100), "duration_sec": rnd.randint(10, 300)})
+    await rec.call(client, "GET /users/me", "GET", "/users/me", headers=headers)
+    await rec.call(client, "GET /leaderboard/top", "GET", "/leaderboard/top?limit=20")
+
+
+async def player(client: httpx.AsyncClient, rec: Recorder, args, client_id: int, session_no: int, seeded: int):
+    rnd = random.Random(args.seed * 1_000_003 + client_id * 1009 + session_no)
+    if rnd.random() < args.returning and seeded:
+        email = f"seed{rnd.randint(1, seeded)}@example.com"
+    else:
+        email = f"load-{args.seed}-{client_id}-{session_no}@example.com"
+        await rec.call(client, "POST /users/", "POST", "/users/", json={
+            "full_name": f"Новичок {client_id}-{session_no}", "sex": "М", "email_user": email,
+            "coins": 500, "password": PASSWORD,
+        })
+    login = await rec.call(client, "POST /auth/token", "POST", "/auth/token",
+                           data={"username": email, "password": PASSWORD})
+    if login.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    for _ in range(args.rounds):
+        await play_session(client, rec, headers, rnd)
+
+
+async def drive(base_url: str, args, seeded: int, rec: Recorder) -> float:
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        # прогрев: один игрок вне статистики
+        rec.enabled = False
+        await player(client, rec, args, client_id=-1, session_no=0, seeded=seeded)
+        rec.enabled = True
+
+        async def client_loop(client_id: int):
+            for session_no in range(args.sessions):
+                await player(client, rec, args, client_id, session_no, seeded)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(i) for i in range(args.clients)))
+        return time.perf_counter() - started
+
+
+def percentile(values: list[float], q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def summarize(samples: list, elapsed: float) -> dict:
+    routes = {}
+    for route in sorted({route for route, _, _ in samples}):
+        latencies = sorted(sec * 1000 for r, _, sec in samples if r == route)
+        statuses = {}
+        for r, status, _ in samples:
+            if r == route:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+        expected = EXPECTED.get(route, {200})
+        errors = sum(count for status, count in statuses.items() if int(status) not in expected)
+        routes[route] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p95_ms": round(percentile(latencies, 0.95), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "error_rate": round(errors / len(latencies), 4),
+            "statuses": statuses,
+        }
+    latencies = sorted(sec * 1000 for _, _, sec in samples)
+    errors = sum(route["error_rate"] * route["requests"] for route in routes.values())
+    total = {
+        "requests": len(samples),
+        "elapsed_s": round(elapsed, 2),
+        "rps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "error_rate": round(errors / len(samples), 4),
+    }
+    return {"total": total, "routes": routes}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report: dict):
+    print(f"{'route':<30} {'req':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<30} {stats['requests']:>6} {stats['rps']:>8.1f} {stats['p50_ms']:>8.2f}"
+              f" {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['error_rate']:>7.2%}")
+    total = report["total"]
+    print(f"{'total':<30} {total['requests']:>6} {total['rps']:>8.1f} {total['p50_ms']:>8.2f}"
+          f" {total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f} {total['error_rate']:>7.2%}"
+          f"  in {total['elapsed_s']} s")
+
+
+def compare(report: dict, baseline: dict, tolerance: float, slack_ms: float) -> list[str]:
+    """Регрессии прогона относительно базового: p95 и req/s хуже допуска, доля ошибок выше"""
+    if baseline["meta"]["params"] != report["meta"]["params"]:
+        print("warning: baseline was recorded with different parameters:", baseline["meta"]["params"])
+    problems = []
+    rows = [("total", report["total"], baseline["total"])]
+    rows += [(route, stats, baseline["routes"].get(route)) for route, stats in report["routes"].items()]
+    print(f"\n{'route':<30} {'p95 base':>9} {'p95 now':>9} {'Δ':>7}  {'rps base':>9} {'rps now':>9} {'Δ':>7}")
+    for route, now, base in rows:
+        if base is None:
+            print(f"{route:<30} (not in baseline)")
+            continue
+        p95_delta = now["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_delta = now["rps"] / base["rps"] - 1 if base["rps"] else 0.0
+        flags = []
+        if now["p95_ms"] > base["p95_ms"] * (1 + tolerance) + slack_ms:
+            flags.append("p95")
+        if now["rps"] < base["rps"] * (1 - tolerance):
+            flags.append("rps")
+        if now["error_rate"] > base["error_rate"] + 0.01:
+            flags.append("errors")
+        print(f"{route:<30} {base['p95_ms']:>9.2f} {now['p95_ms']:>9.2f} {p95_delta:>+7.0%}"
+              f"  {base['rps']:>9.1f} {now['rps']:>9.1f} {rps_delta:>+7.0%}  {' '.join(flags)}")
+        problems += [f"{route}: {flag}" for flag in flags]
+    for route in baseline["routes"].keys() - report["routes"].keys():
+        problems.append(f"{route}: missing")
+    return problems
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    seeded = await seed(args)
+    print(f"seeded {args.users} players, {args.users * args.trees_per_user} trees, {args.questions} questions, "
+          f"{args.users * args.games_per_user} game results ({engine.dialect.name})")
+
+    port = free_port()
+    env = {
+        **os.environ,
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(args.workers),
+        "LOG_CONSOLE": "false",
+        "LOG_DIR": tempfile.mkdtemp(),
+        "GROWTH_SCHEDULER": "off",
+        # без Redis: состояние лимитов и кэшей у каждого воркера свое (см. gunicorn.conf.py)
+        "ALLOW_PER_WORKER_STATE": os.getenv("ALLOW_PER_WORKER_STATE", "true"),
+        # все клиенты идут с одного адреса: лимиты по IP иначе мерили бы сами себя
+        "RATE_LIMIT_ENABLED": "false",
+    }
+    if args.server == "gunicorn":
+        command, workers = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app"], args.workers
+    else:
+        command, workers = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)], 1
+    server, startup, _ = launch(command, env, workers, port)
+    rec = Recorder()
+    try:
+        elapsed = await drive(f"http://127.0.0.1:{port}", args, seeded, rec)
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    report = summarize(rec.samples, elapsed)
+    report["meta"] = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "database": engine.dialect.name,
+        "python": platform.python_version(),
+        "cores": multiprocessing.cpu_count(),
+        "startup_s": round(startup, 2),
+        "params": {key: getattr(args, key) for key in (
+            "users", "trees_per_user", "questions", "games_per_user", "clients", "sessions", "rounds",
+            "returning", "seed", "server", "workers",
+        )},
+    }
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(report, json.load(f), args.tolerance, args.slack_ms)
+        if problems:
+            print("REGRESSION:", "; ".join(problems))
+            return 1
+        print("OK: within tolerance of baseline")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    scale = parser.add_argument_group("seed scale")
+    scale.add_argument("--users", type=int, default=1000)
+    scale.add_argument("--trees-per-user", type=int, default=5)
+    scale.add_argument("--questions", type=int, default=500)
+    scale.add_argument("--games-per-user", type=int, default=3)
+    load = parser.add_argument_group("load")
+    load.add_argument("--clients", type=int, default=16, help="конкурентных игроков")
+    load.add_argument("--sessions", type=int, default=3, help="игроков на клиента подряд")
+    load.add_argument("--rounds", type=int, default=3, help="сессий игры на игрока")
+    load.add_argument("--returning", type=float, default=0.5, help="доля вернувшихся (засеянных) игроков")
+    load.add_argument("--seed", type=int, default=42)
+    load.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    load.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    out = parser.add_argument_group("baseline")
+    out.add_argument("--output", help="записать отчет прогона в JSON")
+    out.add_argument("--save-baseline", help="сохранить прогон как базовый")
+    out.add_argument("--baseline", help="сравнить прогон с базовым")
+    out.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение p95 и req/s")
+    out.add_argument("--slack-ms", type=float, default=2.0, help="абсолютный запас p95 для быстрых маршрутов")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
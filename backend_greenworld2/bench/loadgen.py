@@ -0,0 +1,98 @@
+# bench/loadgen.py
+"""
+Генератор HTTP-нагрузки для бенчмарков сервера: keep-alive соединения на сырых
+asyncio-потоках (httpx сам упирается в ядро раньше сервера), несколько процессов.
+"""
+import asyncio
+import multiprocessing
+import time
+
+
+def build_request(method: str, path: str, headers: dict | None = None, body: bytes = b"") -> bytes:
+    lines = [f"{method} {path} HTTP/1.1", "Host: bench"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    if body or method not in ("GET", "HEAD"):
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+            break
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _connection(host: str, port: int, requests: list[bytes], offset: int, deadline: float, stats: dict):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            writer.write(requests[i % len(requests)])
+            status = await _read_response(reader)
+            stats["latencies"].append(time.perf_counter() - started)
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+            i += 1
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        stats["errors"] += 1
+        stats["last_error"] = repr(e)
+    finally:
+        writer.close()
+
+
+def _client_process(host, port, requests, connections, duration, first, results):
+    async def run():
+        stats = {"latencies": [], "statuses": {}, "errors": 0}
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(*(
+            _connection(host, port, requests, first + i, deadline, stats) for i in range(connections)
+        ))
+        return stats
+
+    results.put(asyncio.run(run()))
+
+
+def run_load(host: str, port: int, requests: list[bytes], connections: int = 64,
+             duration: float = 10.0, processes: int = 1) -> dict:
+    """Нагрузить сервер на duration секунд; запросы идут по кругу, у каждого соединения свой сдвиг"""
+    results = multiprocessing.Queue()
+    per_process = max(1, connections // processes)
+    workers = [
+        multiprocessing.Process(
+            target=_client_process,
+            args=(host, port, requests, per_process, duration, p * per_process, results),
+        )
+        for p in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    parts = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    latencies = sorted(latency for part in parts for latency in part["latencies"])
+    statuses = {}
+    for part in parts:
+        for status, count in part["statuses"].items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    def pct(q: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "rps": len(latencies) / duration,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "statuses": statuses,
+        "errors": sum(part["errors"] for part in parts),
+    }
@@ -0,0 +1,108 @@
+# bench/logging_bench.py
+"""
+Задержка "запросов" в event loop при логировании на уровне INFO: прежние синхронные
+FileHandler + StreamHandler с f-строками против QueueHandler с фоновым писателем,
+ленивым %-форматированием и семплированием. --fsync имитирует медленный диск.
+
+    python -m bench.logging_bench [--requests 20000] [--concurrency 100] [--fsync]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import QueueListener
+
+os.environ.setdefault("LOG_CONSOLE", "false")
+
+from app.logging_config import TEXT_FORMAT, NonBlockingQueueHandler, SamplingFilter
+
+
+class FsyncFileHandler(logging.FileHandler):
+    def flush(self):
+        super().flush()
+        if self.stream:
+            os.fsync(self.stream.fileno())
+
+
+def sinks(directory: str, name: str, fsync: bool) -> list[logging.Handler]:
+    file_handler = (FsyncFileHandler if fsync else logging.FileHandler)(os.path.join(directory, f"{name}.log"))
+    console = logging.StreamHandler(open(os.devnull, "w"))
+    for handler in (file_handler, console):
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return [file_handler, console]
+
+
+async def run(label: str, log: logging.Logger, args, eager: bool) -> float:
+    latencies = []
+
+    async def request(i: int):
+        started = time.perf_counter()
+        email = f"user{i}@example.com"
+        await asyncio.sleep(0)
+        if eager:
+            log.info(f"Authentication attempt for email: {email}")
+            log.info(f"User {email} authenticated successfully")
+        else:
+            log.debug("Authentication attempt for email: %s", email)
+            log.info("User %s authenticated successfully", email)
+        await asyncio.sleep(0)
+        latencies.append(time.perf_counter() - started)
+
+    async def client(ids):
+        for i in ids:
+            await request(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(range(c, args.requests, args.concurrency)) for c in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{label:<30} {args.requests / elapsed:9.0f} req/s  p50 {statistics.median(latencies) * 1e6:8.0f} us"
+          f"  p99 {latencies[int(len(latencies) * 0.99)] * 1e6:8.0f} us")
+    return elapsed
+
+
+async def main_async(args) -> int:
+    directory = tempfile.mkdtemp()
+    print(f"{args.requests} requests, {args.concurrency} concurrent, fsync={args.fsync}")
+
+    legacy = logging.getLogger("bench.legacy")
+    legacy.propagate = False
+    legacy.setLevel(logging.INFO)
+    for handler in sinks(directory, "legacy", args.fsync):
+        legacy.addHandler(handler)
+    await run("sync handlers, f-strings", legacy, args, eager=True)
+
+    for label, rates in (("queue handler", {}), ("queue handler, sampling 10%", {"bench.queued": 0.1})):
+        name = "bench.queued"
+        log = logging.getLogger(name)
+        log.handlers.clear()
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        handler = NonBlockingQueueHandler(queue.Queue(args.queue_size))
+        handler.addFilter(SamplingFilter(rates))
+        log.addHandler(handler)
+        listener = QueueListener(handler.queue, *sinks(directory, name, args.fsync))
+        listener.start()
+        await run(label, log, args, eager=False)
+        drain = time.perf_counter()
+        listener.stop()
+        print(f"{'':<30} writer drained in {time.perf_counter() - drain:.2f} s, dropped {handler.dropped}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--fsync", action="store_true", help="fsync после каждой записи (медленный диск)")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# bench/notifications_bench.py
+"""
+Рассылка уведомлений на 100k пользователей: executemany с ON CONFLICT DO NOTHING
+против построчной вставки, повторная рассылка (дедупликация), INSERT ... SELECT
+всем, лента непрочитанных по частичному индексу и массовое "прочитано".
+
+    python -m bench.notifications_bench [--users 100000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("notifications")
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.exc import IntegrityError
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models.notifications import Notification
+from app.models.users import User
+from app.notifications import broadcast, fan_out, mark_read, unread_feed
+
+
+async def seed(users: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"full_name": f"Gardener {i}", "sex": "М", "email_user": f"g{i}@example.com", "hashed_password": "-"}
+            for i in range(1, users + 1)
+        ])
+        await db.commit()
+
+
+async def timed(label: str, count: int, coro):
+    started = time.perf_counter()
+    result = await coro
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34} {elapsed:8.3f} s  {count / elapsed:10.0f} rows/s  -> {result}")
+    return result
+
+
+async def one_by_one(user_ids, message: str) -> int:
+    """Прежний подход: ORM-объект и flush на каждое уведомление"""
+    inserted = 0
+    async with AsyncSessionLocal() as db:
+        for user_id in user_ids:
+            db.add(Notification(user_id=user_id, message=message))
+            try:
+                await db.flush()
+                inserted += 1
+            except IntegrityError:
+                await db.rollback()
+        await db.commit()
+    return inserted
+
+
+async def batched(user_ids, message: str) -> int:
+    async with AsyncSessionLocal() as db:
+        inserted = await fan_out(db, user_ids, message)
+        await db.commit()
+    return len(inserted)
+
+
+async def broadcast_all(message: str) -> int:
+    async with AsyncSessionLocal() as db:
+        inserted = await broadcast(db, message)
+        await db.commit()
+    return inserted
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    await seed(args.users)
+    user_ids = list(range(1, args.users + 1))
+    sample = user_ids[:args.baseline]
+    print(f"{args.users} users ({engine.dialect.name})")
+
+    await timed(f"row-by-row ({len(sample)} rows)", len(sample), one_by_one(sample, "Row by row"))
+    fresh = await timed("fan_out executemany", len(user_ids), batched(user_ids, "Spring event"))
+    again = await timed("fan_out again (all duplicates)", len(user_ids), batched(user_ids, "Spring event"))
+    everyone = await timed("broadcast INSERT ... SELECT", len(user_ids), broadcast_all("Autumn event"))
+
+    # у одного пользователя длинная лента
+    heavy = user_ids[0]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Notification), [{"user_id": heavy, "message": f"Tree #{i} is ready"} for i in range(5000)])
+        await db.commit()
+
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as conn:
+            plan = (await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM notifications WHERE user_id = 1 AND is_read = 0 "
+                "ORDER BY id DESC LIMIT 51"
+            ))).all()
+        print("plan:", plan[0][-1])
+
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        pages, cursor, seen = 0, None, 0
+        while True:
+            rows, cursor = await unread_feed(db, heavy, limit=50, cursor=cursor)
+            pages += 1
+            seen += len(rows)
+            if cursor is None:
+                break
+        elapsed = time.perf_counter() - started
+    print(f"unread feed: {seen} rows in {pages} pages, {elapsed / pages * 1000:.2f} ms/page")
+
+    async with AsyncSessionLocal() as db:
+        first, _ = await unread_feed(db, heavy, limit=1)
+        started = time.perf_counter()
+        updated = await mark_read(db, heavy, up_to=first[0]["id"])
+        print(f"mark_read up_to: {updated} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
+        left = (await db.execute(select(func.count()).select_from(Notification).where(
+            Notification.user_id == heavy, Notification.is_read == False))).scalar_one()  # noqa: E712
+
+    ok = fresh == len(user_ids) and again == 0 and everyone == len(user_ids) and seen == 5003 and left == 0
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--baseline", type=int, default=5000, help="строк для построчной вставки")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
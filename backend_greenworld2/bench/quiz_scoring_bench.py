@@ -0,0 +1,99 @@
+# bench/quiz_scoring_bench.py
+"""
+Пропускная способность проверки викторины на большом банке вопросов:
+прежняя проверка запросом к БД против ключа ответов в памяти.
+
+    python -m bench.quiz_scoring_bench [--questions 100000] [--submissions 2000] [--per-quiz 25]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("quiz")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import insert, select
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models.questions import Question
+from app.question_bank import QuestionBank
+
+
+async def seed(questions: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        for start in range(0, questions, 10000):
+            await db.execute(insert(Question), [
+                {"question_text": f"Q{i}?", "correct_answer": f"A{i}",
+                 "option1": "B", "option2": "C", "option3": "D"}
+                for i in range(start, min(start + 10000, questions))
+            ])
+        await db.commit()
+
+
+async def score_from_db(db, question_ids, answers) -> int:
+    # проверка до появления ключа ответов: один запрос на каждую отправку
+    result = await db.execute(
+        select(Question.id, Question.correct_answer).where(Question.id.in_(question_ids))
+    )
+    return sum(1 for question_id, correct in result if answers.get(str(question_id)) == correct)
+
+
+async def run(label, submissions, score):
+    started = time.perf_counter()
+    total = 0
+    for question_ids, answers in submissions:
+        total += await score(question_ids, answers)
+    elapsed = time.perf_counter() - started
+    print(f"{label:>8}: {len(submissions) / elapsed:10.0f} submissions/s  (correct {total})")
+    return total
+
+
+async def main_async(args):
+    engine.echo = False
+    await seed(args.questions)
+
+    bank = QuestionBank()
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        await bank.refresh(db)
+    print(f"bank: {len(bank)} questions loaded in {time.perf_counter() - started:.2f} s")
+
+    rnd = random.Random(1)
+    submissions = []
+    for _ in range(args.submissions):
+        question_ids = bank.sample(args.per_quiz, rnd)
+        # примерно половина ответов верная
+        answers = {str(q): f"A{q - 1}" if rnd.random() < 0.5 else "B" for q in question_ids}
+        submissions.append((question_ids, answers))
+
+    async with AsyncSessionLocal() as db:
+        expected = await run("db", submissions, lambda q, a: score_from_db(db, q, a))
+
+    async def score_in_memory(question_ids, answers):
+        return bank.score(question_ids, answers)
+
+    got = await run("memory", submissions, score_in_memory)
+    assert got == expected, (got, expected)
+    await engine.dispose()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=100000)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--per-quiz", type=int, default=25)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
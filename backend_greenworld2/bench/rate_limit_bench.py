@@ -0,0 +1,134 @@
+# bench/rate_limit_bench.py
+"""
+Накладные расходы лимитера на запрос: бакеты в памяти, Redis на каждый запрос
+(пачка из одного токена) и Redis с локальными пачками токенов. Несколько
+экземпляров RedisRateLimiter над одним Redis изображают воркеры; в конце
+проверяется, что вместе они не пропустили больше лимита.
+
+    python -m bench.rate_limit_bench [--users 1000] [--requests 200000] [--workers 4]
+
+Без --redis-url используется fakeredis (pip install fakeredis lupa) - он живет
+в процессе, поэтому --rtt-ms добавляет задержку сети к каждому вызову Redis.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from app.rate_limit import Limit, MemoryRateLimiter, RedisRateLimiter
+
+
+class DelayedScript:
+    """Скрипт Redis с искусственным сетевым round trip"""
+
+    def __init__(self, script, rtt: float):
+        self._script = script
+        self._rtt = rtt
+
+    async def __call__(self, **kwargs):
+        await asyncio.sleep(self._rtt)
+        return await self._script(**kwargs)
+
+
+def make_redis(args):
+    if args.redis_url:
+        import redis.asyncio as aioredis
+        return lambda: aioredis.from_url(args.redis_url, decode_responses=True)
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("fakeredis is required without --redis-url: pip install fakeredis lupa")
+    server = fakeredis.FakeServer()
+    return lambda: fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+
+async def run(label: str, limiters: list, limit: Limit, args) -> None:
+    rnd = random.Random(11)
+    keys = [f"bench:user:{rnd.randint(1, args.users)}" for _ in range(args.requests)]
+    latencies = []
+    denied = 0
+
+    async def worker(worker_keys):
+        nonlocal denied
+        for i, key in enumerate(worker_keys):
+            limiter = limiters[i % len(limiters)]  # запросы пользователя попадают в разные воркеры
+            started = time.perf_counter()
+            if await limiter.hit(key, limit) > 0:
+                denied += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(keys[i::args.concurrency]) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    calls = sum(getattr(limiter, "remote", 0) for limiter in limiters)
+    print(f"{label:<26} {args.requests / elapsed:9.0f} checks/s  mean {elapsed / args.requests * 1e6:7.1f} us"
+          f"  p99 {latencies[int(len(latencies) * 0.99)] * 1e6:8.1f} us"
+          f"  redis calls/req {calls / args.requests:5.3f}  denied {denied}")
+
+
+async def burst(limiters: list, limit: Limit, args) -> int:
+    """Один пользователь шлет много запросов сразу во все воркеры; сколько пропущено"""
+    allowed = 0
+
+    async def attempt(i):
+        nonlocal allowed
+        if await limiters[i % len(limiters)].hit("bench:burst", limit) == 0:
+            allowed += 1
+
+    await asyncio.gather(*(attempt(i) for i in range(limit.amount * 3)))
+    return allowed
+
+
+async def main_async(args) -> int:
+    limit = Limit(args.limit)
+    print(f"limit {args.limit}, {args.users} users, {args.requests} checks, "
+          f"{args.workers} workers, {args.concurrency} concurrent, rtt {args.rtt_ms} ms")
+    await run("memory (per worker)", [MemoryRateLimiter() for _ in range(args.workers)], limit, args)
+
+    new_redis = make_redis(args)
+
+    def limiters(lease_fraction: float) -> list:
+        result = []
+        for _ in range(args.workers):
+            limiter = RedisRateLimiter(new_redis(), lease_fraction=lease_fraction, prefix=f"bench{lease_fraction}")
+            if args.rtt_ms:
+                limiter._script = DelayedScript(limiter._script, args.rtt_ms / 1000)
+            result.append(limiter)
+        return result
+
+    await new_redis().flushall()
+    await run("redis, every request", limiters(0), limit, args)
+    await new_redis().flushall()
+    await run(f"redis, lease {args.lease_fraction:g}", limiters(args.lease_fraction), limit, args)
+
+    await new_redis().flushall()
+    allowed = await burst(limiters(args.lease_fraction), limit, args)
+    ok = allowed <= limit.amount
+    print(f"burst of {limit.amount * 3} requests across {args.workers} workers: "
+          f"{allowed} allowed (limit {limit.amount})")
+    print("OK" if ok else "LIMIT EXCEEDED")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", default="600/minute")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4, help="экземпляров лимитера над одним Redis")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--lease-fraction", type=float, default=0.1)
+    parser.add_argument("--rtt-ms", type=float, default=0.0)
+    parser.add_argument("--redis-url")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+# bench/realtime_bench.py
+"""
+WebSocket-узел под нагрузкой: N одновременных сокетов к одному процессу uvicorn,
+память на соединение и задержка доставки событий coins после POST результата игры.
+
+Сервер запускается отдельным процессом (каждому процессу нужно N дескрипторов).
+
+    python -m bench.realtime_bench [--sockets 10000] [--events 500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("METRICS_TOKEN", "bench-metrics")
+from bench.benchdb import use_bench_database
+
+use_bench_database("realtime")
+
+import httpx
+from sqlalchemy import insert
+from websockets.asyncio.client import connect
+
+import app.crud  # noqa: F401  регистрирует все модели
+from app.auth import create_access_token
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models.users import User
+
+
+async def seed(users: int) -> list[str]:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [
+            {"full_name": f"Player {i}", "sex": "М", "email_user": f"p{i}@example.com",
+             "hashed_password": "-", "coins": 100}
+            for i in range(1, users + 1)
+        ])
+        await db.commit()
+    await engine.dispose()
+    return [create_access_token({"sub": f"p{i}@example.com"}) for i in range(1, users + 1)]
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, server: subprocess.Popen):
+    for _ in range(300):
+        if server.poll() is not None:
+            raise RuntimeError("server exited")
+        try:
+            await client.get("/metrics")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    tokens = await seed(args.sockets)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "GROWTH_SCHEDULER": "off"},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    sockets = []
+    readers = []
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30,
+                                     headers={"Authorization": f"Bearer {os.environ['METRICS_TOKEN']}"}) as client:
+            await wait_ready(client, server)
+            base_rss = rss_kb(server.pid)
+
+            received = {}  # user_id -> время получения события coins
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def open_socket(user_id: int, token: str):
+                async with gate:
+                    ws = await connect(f"ws://127.0.0.1:{port}/ws?token={token}", ping_interval=None)
+                sockets.append(ws)
+
+                async def read():
+                    async for message in ws:
+                        if json.loads(message)["type"] == "coins":
+                            received[user_id] = time.perf_counter()
+                readers.append(asyncio.create_task(read()))
+
+            started = time.perf_counter()
+            await asyncio.gather(*(open_socket(i + 1, t) for i, t in enumerate(tokens)))
+            elapsed = time.perf_counter() - started
+            metrics = (await client.get("/metrics")).json()["realtime"]
+            per_socket = (rss_kb(server.pid) - base_rss) / len(sockets)
+            print(f"{len(sockets)} sockets open in {elapsed:.1f} s ({len(sockets) / elapsed:.0f}/s), "
+                  f"server connections={metrics['connections']}, ~{per_socket:.1f} KB RSS per socket")
+
+            # результат игры -> событие coins в сокет игрока; задержка от отправки POST до получения события
+            sample = random.Random(5).sample(range(1, args.sockets + 1), args.events)
+            latencies = []
+            for user_id in sample:
+                sent = time.perf_counter()
+                await client.post("/quizes/games/result", json={"score": 10, "duration_sec": 5},
+                                  headers={"Authorization": f"Bearer {tokens[user_id - 1]}"})
+                for _ in range(1000):
+                    if user_id in received:
+                        break
+                    await asyncio.sleep(0.001)
+                if user_id in received:
+                    latencies.append((received[user_id] - sent) * 1000)
+            latencies.sort()
+            print(f"coins events delivered {len(latencies)}/{len(sample)}: "
+                  f"p50 {statistics.median(latencies):.2f} ms, p99 {latencies[int(len(latencies) * 0.99) - 1]:.2f} ms")
+            print("server:", (await client.get("/metrics")).json()["realtime"])
+            ok = metrics["connections"] == args.sockets and len(latencies) == len(sample)
+    finally:
+        for task in readers:
+            task.cancel()
+        await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+        server.terminate()
+        server.wait()
+
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=200, help="одновременных рукопожатий")
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
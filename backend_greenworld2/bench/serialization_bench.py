@@ -0,0 +1,151 @@
+# bench/serialization_bench.py
+"""
+Цена сериализации ответа на больших списках по эндпоинтам: прежний путь FastAPI
+(проверка response_model + jsonable_encoder + stdlib json), тот же путь с
+ORJSONResponse (класс по умолчанию) и прямая отдача строк из БД в ORJSONResponse.
+
+    python -m bench.serialization_bench [--rows 100 1000 10000] [--repeat 20]
+
+Строки берутся из настоящих запросов эндпоинтов к временной SQLite; меряется
+только построение тела ответа.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+from bench.benchdb import use_bench_database
+
+use_bench_database("serialization")
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import insert, select
+
+from app.crud import init_tree_catalog, list_trees, search_users
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models.notifications import Notification
+from app.models.questions import Question
+from app.models.trees import Tree
+from app.models.users import User
+from app.notifications import unread_feed
+from app.responses import ORJSONResponse
+from app.routers.quizes import QUESTION_COLUMNS
+from app.schemas.notifications import NotificationOut
+from app.schemas.quizes import QuizSession
+from app.schemas.trees import TreeOut
+from app.schemas.users import UserInDB
+
+
+async def seed(rows: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as db:
+        await init_tree_catalog(db)
+        await db.execute(insert(User), [
+            {"full_name": f"Садовник {i}", "sex": "Ж", "email_user": f"g{i}@example.com",
+             "hashed_password": "-", "coins": i}
+            for i in range(1, rows + 1)
+        ])
+        await db.execute(insert(Tree), [
+            {"created_by": 1, "tree_type_id": i % 5 + 1, "name": f"Дерево {i}", "price": 25, "lvl": i % 5 + 1,
+             "next_upgrade_at": now + timedelta(minutes=i), "created_at": now}
+            for i in range(rows)
+        ])
+        await db.execute(insert(Question), [
+            {"question_text": f"Сколько лет растет дуб номер {i}?", "correct_answer": "100",
+             "option1": "10", "option2": "50", "option3": "500"}
+            for i in range(rows)
+        ])
+        await db.execute(insert(Notification), [
+            {"user_id": 1, "message": f"Дерево {i} выросло", "is_read": False, "created_at": now}
+            for i in range(rows)
+        ])
+        await db.commit()
+
+
+async def endpoint_rows(rows: int) -> dict:
+    """Для каждого эндпоинта: схема ответа, содержимое для прежнего пути и строки для прямого"""
+    async with AsyncSessionLocal() as db:
+        trees = (await list_trees(db, 1))[:rows]
+        users, _ = await search_users(db, limit=rows)
+        notifications, _ = await unread_feed(db, 1, limit=rows)
+        # прежний /quizes/questions/ отдавал ORM-объекты через orm_mode
+        orm_questions = (await db.execute(select(Question).limit(rows))).scalars().all()
+        question_rows = [row._mapping for row in await db.execute(select(*QUESTION_COLUMNS).limit(rows))]
+    return {
+        "/trees": (List[TreeOut], trees, trees),
+        "/quizes/questions/": (
+            QuizSession,
+            {"session_token": "t" * 120, "questions": orm_questions},
+            {"session_token": "t" * 120, "questions": question_rows},
+        ),
+        "/users/": (List[UserInDB], users, users),
+        "/notifications/unread": (List[NotificationOut], notifications, notifications),
+    }
+
+
+async def timed(build, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await build()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def fastapi_path(field, content, response_class):
+    """Путь FastAPI для значения, возвращенного эндпоинтом: serialize_response (проверка + jsonable_encoder), render"""
+    async def build() -> bytes:
+        return response_class(await serialize_response(field=field, response_content=content)).body
+    return build
+
+
+def direct_path(rows):
+    async def build() -> bytes:
+        return ORJSONResponse(rows).body
+    return build
+
+
+async def main_async(args) -> int:
+    engine.echo = False
+    await seed(max(args.rows))
+    print(f"{'endpoint':<22} {'rows':>6} {'validate+json':>14} {'validate+orjson':>16} {'direct orjson':>14}"
+          f" {'speedup':>8}  (ms per response)")
+    ok = True
+    for rows in args.rows:
+        for path, (model, before, direct) in (await endpoint_rows(rows)).items():
+            field = create_response_field(name="Response", type_=model)
+            old = await timed(fastapi_path(field, before, JSONResponse), args.repeat)
+            validated_orjson = await timed(fastapi_path(field, before, ORJSONResponse), args.repeat)
+            fast = await timed(direct_path(direct), args.repeat)
+
+            # тело то же с точностью до порядка ключей
+            same = json.loads(await fastapi_path(field, before, JSONResponse)()) == json.loads(await direct_path(direct)())
+            ok = ok and same
+            print(f"{path:<22} {rows:>6} {old:>14.2f} {validated_orjson:>16.2f} {fast:>14.2f} {old / fast:>7.1f}x"
+                  f"{'' if same else '  BODY MISMATCH'}")
+    print("OK" if ok else "MISMATCH")
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    return asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# bench/server_bench.py
+"""
+Продакшн-запуск против прежнего: время холодного старта (до "Application startup
+complete" во всех воркерах) и запросы в секунду для uvicorn одним процессом и
+gunicorn (gunicorn.conf.py) с 1 и N воркерами. Каждый запуск - на новой SQLite.
+
+    python -m bench.server_bench [--workers 1 4] [--duration 10] [--connections 64]
+
+Нагрузку дает bench.loadgen отдельными процессами (--clients); на машине с малым
+числом ядер клиенты и воркеры делят одни ядра - сравнивать стоит при cores > N.
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from bench.loadgen import build_request, run_load
+
+STARTED = "Application startup complete"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def launch(command: list[str], env: dict, workers: int, port: int) -> tuple[subprocess.Popen, float, float]:
+    """Запустить сервер; вернуть процесс, время до старта всех воркеров и до первого ready"""
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    all_started = threading.Event()
+    booted = []
+
+    def watch():
+        for line in server.stderr:
+            if STARTED in line:
+                booted.append(time.perf_counter())
+                if len(booted) == workers:
+                    all_started.set()
+
+    threading.Thread(target=watch, daemon=True).start()
+    ready_at = None
+    while ready_at is None:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with {server.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health/ready", timeout=1) as response:
+                if response.status == 200:
+                    ready_at = time.perf_counter()
+        except OSError:
+            time.sleep(0.02)
+    if not all_started.wait(60):
+        raise RuntimeError(f"only {len(booted)} of {workers} workers started")
+    return server, booted[-1] - started, ready_at - started
+
+
+def run(label: str, command: list[str], workers: int, args) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/server.db",
+        "BIND": f"127.0.0.1:{port}",
+        "WEB_CONCURRENCY": str(workers),
+        "LOG_CONSOLE": "false",
+        "LOG_DIR": tempfile.mkdtemp(),
+        "GROWTH_SCHEDULER": "off",
+        # без Redis: состояние лимитов и кэшей у каждого воркера свое (см. gunicorn.conf.py)
+        "ALLOW_PER_WORKER_STATE": os.getenv("ALLOW_PER_WORKER_STATE", "true"),
+    }
+    command = [part.format(port=port) for part in command]
+    server, startup, ready = launch(command, env, workers, port)
+    try:
+        requests = [build_request("GET", path) for path in args.paths]
+        run_load("127.0.0.1", port, requests, connections=args.connections, duration=1.0, processes=args.clients)
+        stats = run_load("127.0.0.1", port, requests, connections=args.connections,
+                         duration=args.duration, processes=args.clients)
+    finally:
+        server.terminate()
+        server.wait(30)
+    print(f"{label:<22} startup {startup:6.2f} s  first ready {ready:6.2f} s  {stats['rps']:8.0f} req/s"
+          f"  p50 {stats['p50_ms']:6.2f} ms  p99 {stats['p99_ms']:7.2f} ms  errors {stats['errors']}"
+          f"  statuses {stats['statuses']}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, max(2, multiprocessing.cpu_count())}))
+    parser.add_argument("--paths", nargs="+", default=["/tree-catalog/", "/health/live"])
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=max(1, multiprocessing.cpu_count() // 2),
+                        help="процессов-генераторов нагрузки")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SECRET_KEY", "bench-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+    print(f"{multiprocessing.cpu_count()} cores, {args.connections} connections, {args.clients} client processes, "
+          f"paths {args.paths}")
+
+    # прежний CMD без --reload: один процесс, цикл и парсер по умолчанию
+    run("uvicorn, 1 process", [sys.executable, "-m", "uvicorn", "app.main:app", "--port", "{port}",
+                               "--log-level", "info"], 1, args)
+    for workers in args.workers:
+        run(f"gunicorn, {workers} workers", [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                                             "app.main:app"], workers, args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+# bench/trees_bench.py
+"""
+GET /trees для пользователя с большим числом деревьев: прежняя загрузка ORM-объектов
+с JOIN владельца и типа против выборки колонок с именем типа из снимка каталога.
+
+    python -m bench.trees_bench [--trees 1000] [--repeat 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("trees")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+import httpx
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
+
+from app.crud import list_trees
+from app.db.database import AsyncSessionLocal, engine
+from app.dependencies import get_current_user
+from app.main import app
+from app.models.trees import Tree
+from app.models.users import User
+from app.schemas.trees import TreeOut
+
+
+async def old_list_trees(db, user_id):
+    # до изменения: lazy="joined" на Tree.user и Tree.tree_type, TreeOut из ORM-объекта
+    result = await db.execute(
+        select(Tree).options(joinedload(Tree.user), joinedload(Tree.tree_type)).where(Tree.created_by == user_id)
+    )
+    return [
+        TreeOut(
+            id=t.id, created_by=t.created_by, tree_type_id=t.tree_type_id, name=t.name, price=t.price,
+            lvl=t.lvl, next_upgrade_at=t.next_upgrade_at, created_at=t.created_at,
+            tree_type_name=t.tree_type.name if t.tree_type else "Unknown",
+        )
+        for t in result.unique().scalars().all()
+    ]
+
+
+async def timed(label, repeat, fn):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"  {label:<26} p50={statistics.median(samples):7.2f} ms  "
+          f"p95={samples[min(len(samples) - 1, int(len(samples) * 0.95))]:7.2f} ms")
+
+
+async def main_async(args):
+    engine.echo = False
+    await app.router.startup()
+    async with AsyncSessionLocal() as db:
+        user = User(full_name="Bench Gardener", sex="М", email_user="gardener@example.com",
+                    hashed_password="-" * 60, coins=0)
+        db.add(user)
+        await db.commit()
+        user_id = user.id
+        await db.execute(insert(Tree), [
+            {"created_by": user_id, "tree_type_id": i % 4 + 1, "name": f"Tree {i}", "price": 10, "lvl": 1}
+            for i in range(args.trees)
+        ])
+        await db.commit()
+
+    async def query(fn):
+        async with AsyncSessionLocal() as db:
+            return await fn(db, user_id)
+
+    old, new = await query(old_list_trees), await query(list_trees)
+    assert [t.dict() for t in old] == [TreeOut(**t).dict() for t in new]
+
+    print(f"{args.trees} trees ({engine.dialect.name}):")
+    await timed("crud: joined ORM (old)", args.repeat, lambda: query(old_list_trees))
+    await timed("crud: columns + catalog", args.repeat, lambda: query(list_trees))
+
+    app.dependency_overrides[get_current_user] = lambda: user
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        r = await client.get("/trees")
+        assert r.status_code == 200, r.text[:200]
+        # тело совпадает с тем, что отдавала сериализация FastAPI через response_model
+        assert r.json() == [json.loads(t.json()) for t in old]
+        await timed("GET /trees", args.repeat, lambda: client.get("/trees"))
+    await app.router.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trees", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
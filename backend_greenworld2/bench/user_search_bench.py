@@ -0,0 +1,115 @@
+# bench/user_search_bench.py
+"""
+Задержка поиска пользователей по имени на большой таблице: прежний запрос
+(ILIKE без лимита, полные ORM-объекты) против страницы с курсором по индексу.
+
+По умолчанию временная SQLite-база (FTS5 trigram); для PostgreSQL (pg_trgm)
+задайте DATABASE_URL, примените миграции и передайте --i-know-this-drops-the-db
+(бенчмарк пишет синтетических пользователей, см. bench/benchdb.py).
+
+    python -m bench.user_search_bench [--users 1000000] [--repeat 20]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+from bench.benchdb import use_bench_database
+
+use_bench_database("search")
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+
+from sqlalchemy import func, insert, select
+
+from app.crud import search_users
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.models.users import User
+from app.user_search import ensure_search_index
+
+FIRST = ["Иван", "Мария", "Пётр", "Анна", "Сергей", "Ольга", "Дмитрий", "Елена", "Алексей", "Наталья"]
+LAST = ["Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов", "Михайлов", "Новиков", "Фёдоров"]
+
+# частый, редкий и короткий (без триграммного индекса) запрос
+TERMS = ["иван", "99999", "Ан"]
+
+
+async def seed(users: int):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        existing = (await db.execute(select(func.count()).select_from(User))).scalar_one()
+    if existing < users:
+        async with AsyncSessionLocal() as db:
+            rnd = random.Random(5)
+            for start in range(existing, users, 20000):
+                await db.execute(insert(User), [
+                    {"full_name": f"{rnd.choice(LAST)} {rnd.choice(FIRST)} {i}", "sex": "М",
+                     "email_user": f"user{i}@example.com", "hashed_password": "-" * 60, "coins": 0}
+                    for i in range(start, min(start + 20000, users))
+                ])
+            await db.commit()
+    # индекс строится один раз после загрузки, а не триггером на каждую строку
+    async with engine.begin() as conn:
+        await conn.run_sync(ensure_search_index)
+
+
+async def old_search(db, term):
+    result = await db.execute(select(User).where(User.full_name.ilike(f"%{term}%")))
+    return result.scalars().all()
+
+
+async def first_page(db, term, cursor=None):
+    users, _ = await search_users(db, full_name=term, limit=50, cursor=cursor)
+    return users
+
+
+async def timed(label, repeat, fn):
+    samples = []
+    count = 0
+    for _ in range(repeat):
+        async with AsyncSessionLocal() as db:
+            started = time.perf_counter()
+            count = len(await fn(db))
+            samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"  {label:<22} rows={count:<7} p50={statistics.median(samples):8.1f} ms  "
+          f"p95={samples[min(len(samples) - 1, int(len(samples) * 0.95))]:8.1f} ms")
+
+
+async def main_async(args):
+    engine.echo = False
+    started = time.perf_counter()
+    await seed(args.users)
+    print(f"{args.users} users ready in {time.perf_counter() - started:.1f} s ({engine.dialect.name})")
+
+    for term in TERMS:
+        print(f"term {term!r}:")
+        await timed("old: ILIKE, all rows", max(args.repeat // 5, 2), lambda db: old_search(db, term))
+        await timed("new: first page", args.repeat, lambda db: first_page(db, term))
+
+        # курсор из середины выдачи: следующая страница не дороже первой
+        async with AsyncSessionLocal() as db:
+            cursor = None
+            for _ in range(20):
+                _, cursor = await search_users(db, full_name=term, limit=50, cursor=cursor)
+                if cursor is None:
+                    break
+        if cursor is not None:
+            await timed("new: page 21", args.repeat,
+                        lambda db: first_page(db, term, cursor))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(main_async(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
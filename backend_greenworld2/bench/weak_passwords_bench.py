@@ -0,0 +1,61 @@
+# bench/weak_passwords_bench.py
+"""
+Замер индекса слабых паролей: время проверки и память в зависимости от размера списка.
+
+    python -m bench.weak_passwords_bench [--sizes 10000,100000,1000000]
+"""
+import argparse
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from app.weak_passwords import WeakPasswordIndex
+
+
+def random_password(rnd: random.Random) -> str:
+    return "".join(rnd.choices(string.ascii_letters + string.digits, k=rnd.randint(6, 14)))
+
+
+def bench(size: int, checks: int) -> dict:
+    rnd = random.Random(size)
+    passwords = [random_password(rnd) for _ in range(size)]
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = WeakPasswordIndex(passwords)
+    build_sec = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    probes = [rnd.choice(passwords) if i % 2 else random_password(rnd) for i in range(checks)]
+    started = time.perf_counter()
+    for p in probes:
+        p in index
+    per_check = (time.perf_counter() - started) / checks
+
+    return {
+        "size": size,
+        "resident_bytes": index.nbytes,
+        "build_peak_bytes": peak,
+        "build_sec": round(build_sec, 3),
+        "check_us": round(per_check * 1e6, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--checks", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    print(f"{'size':>10} {'resident MB':>12} {'build peak MB':>14} {'build s':>8} {'check us':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = bench(size, args.checks)
+        print(f"{r['size']:>10} {r['resident_bytes'] / 2**20:>12.2f} {r['build_peak_bytes'] / 2**20:>14.2f} "
+              f"{r['build_sec']:>8} {r['check_us']:>9}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
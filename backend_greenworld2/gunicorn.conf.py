@@ -0,0 +1,82 @@
+# gunicorn.conf.py
+# Продакшн-запуск: gunicorn -c gunicorn.conf.py app.main:app
+import asyncio
+import itertools
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+# .env читается до решений ниже: иначе REDIS_URL и *_BACKEND из него появятся только при импорте app
+load_dotenv()
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+# воркер асинхронный и занимает одно ядро целиком: по воркеру на ядро
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+if workers > 1:
+    # воркеры не делят один файл с ротацией: логи идут в stdout, ротирует платформа
+    # (app/logging_config.py читает LOG_FILE при импорте приложения, уже после этого файла)
+    os.environ.setdefault("LOG_FILE", "false")
+
+# состояние, которое должно быть общим для воркеров: в memory у каждого воркера свое
+# (лимиты умножаются на число воркеров, повтор запроса или токена уходит в другой воркер)
+SHARED_STATE_BACKENDS = [
+    "RATE_LIMIT_BACKEND",
+    "LOGIN_GUARD_BACKEND",
+    "IDEMPOTENCY_BACKEND",
+    "IDENTITY_CACHE_BACKEND",
+    "REALTIME_BACKEND",
+    "QUIZ_SESSION_BACKEND",
+]
+if workers > 1 and os.getenv("REDIS_URL"):
+    for name in SHARED_STATE_BACKENDS:
+        os.environ.setdefault(name, "redis")
+worker_class = "app.workers.ProductionWorker"
+# приложение импортируется один раз в мастере, воркеры получают его готовым через fork
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+
+def check_shared_state(workers: int):
+    """Несколько воркеров без Redis для общего состояния - ошибка конфигурации, а не тихая деградация"""
+    if workers <= 1 or os.getenv("ALLOW_PER_WORKER_STATE", "false").lower() == "true":
+        return
+    redis_url = os.getenv("REDIS_URL")
+    local = [name for name in SHARED_STATE_BACKENDS if not redis_url or os.getenv(name, "memory") != "redis"]
+    if local:
+        raise RuntimeError(
+            f"{workers} workers need shared state in Redis, but these backends are per-worker: "
+            f"{', '.join(local)}. Set REDIS_URL (and the backends to redis), run one worker "
+            "(WEB_CONCURRENCY=1) or set ALLOW_PER_WORKER_STATE=true."
+        )
+
+
+def on_starting(server):
+    """Схема и каталог - один раз в мастере до запуска воркеров (см. app/bootstrap.py)"""
+    check_shared_state(server.cfg.workers)
+    from app.bootstrap import BOOTSTRAPPED_ENV, bootstrap
+    from app.db.database import dispose_engines
+
+    async def run():
+        try:
+            await bootstrap()
+        finally:
+            # соединения мастера не должны достаться воркерам после fork
+            await dispose_engines()
+
+    asyncio.run(run())
+    os.environ[BOOTSTRAPPED_ENV] = "1"
+
+
+def pre_fork(server, worker):
+    # слот - наименьший свободный номер среди живых воркеров: замена воркера пишет в его файл
+    taken = {getattr(w, "log_slot", None) for w in server.WORKERS.values()}
+    worker.log_slot = next(slot for slot in itertools.count() if slot not in taken)
+
+
+def post_fork(server, worker):
+    """Свой файл логов у каждого воркера, если LOG_FILE включен (см. app/logging_config.py)"""
+    from app.logging_config import open_worker_log
+
+    open_worker_log(worker.log_slot)
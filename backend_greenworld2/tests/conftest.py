@@ -0,0 +1,12 @@
+# tests/conftest.py
+import os
+import tempfile
+
+# до импорта app: модули читают окружение при импорте
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("LOG_CONSOLE", "false")
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp())
+# тесты пересоздают схему: никогда не берем DATABASE_URL из окружения или .env
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
@@ -0,0 +1,149 @@
+# tests/test_economy_concurrency.py
+"""
+Сотни одновременных покупок и улучшений деревьев: баланс, уровни и журнал сходятся.
+
+Для PostgreSQL задайте TEST_DATABASE_URL (база пересоздается).
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+
+from app.crud import buy_and_plant_tree, calc_cost, init_tree_catalog, upgrade_tree
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.ledger import compact_balances, get_balance
+from app.models.coin_ledger import CoinLedger
+from app.models.tree_catalog import TreeCatalog
+from app.models.trees import Tree
+from app.models.users import User
+
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+    return asyncio.run(scenario())
+
+
+async def call(fn, *args):
+    """Результат операции или код HTTPException; каждая операция - в своей сессии"""
+    async with AsyncSessionLocal() as db:
+        try:
+            return await fn(db, *args)
+        except HTTPException as e:
+            return e.status_code
+
+
+async def setup(coins: int, trees: int = 0, seed: int = 0) -> tuple[int, dict]:
+    """Пользователь с балансом coins и trees деревьями разных уровней и цен, готовыми к улучшению"""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    rnd = random.Random(seed)
+    async with AsyncSessionLocal() as db:
+        await init_tree_catalog(db)
+        user = User(full_name="Stress Test", sex="М", email_user="stress@example.com", hashed_password="-", coins=coins)
+        db.add(user)
+        await db.flush()
+        catalog = (await db.execute(select(TreeCatalog.id))).scalars().all()
+        if trees:
+            await db.execute(insert(Tree), [
+                {"created_by": user.id, "tree_type_id": rnd.choice(catalog), "name": f"Дерево {i}",
+                 "price": rnd.choice([10, 25, 40]), "lvl": rnd.randint(1, 4),
+                 "next_upgrade_at": datetime.now(timezone.utc) - timedelta(days=1)}
+                for i in range(trees)
+            ])
+        await db.commit()
+        rows = (await db.execute(select(Tree.id, Tree.price, Tree.lvl).where(Tree.created_by == user.id))).all()
+    return user.id, {row.id: row for row in rows}
+
+
+async def tree_levels(user_id: int) -> dict:
+    async with AsyncSessionLocal() as db:
+        return dict((await db.execute(select(Tree.id, Tree.lvl).where(Tree.created_by == user_id))).all())
+
+
+async def balance(user_id: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await get_balance(db, user_id)
+
+
+def test_concurrent_upgrades_level_each_tree_once():
+    async def scenario():
+        start = 1_000_000
+        user_id, before = await setup(start, trees=100)
+        # 500 улучшений одновременно, по 5 на дерево: после первого дерево уходит на кулдаун
+        jobs = [call(upgrade_tree, user_id, tree_id) for tree_id in before for _ in range(5)]
+        random.Random(1).shuffle(jobs)
+        results = await asyncio.gather(*jobs)
+
+        upgraded = [r for r in results if isinstance(r, dict)]
+        assert len(upgraded) == len(before)
+        assert sorted(r for r in results if not isinstance(r, dict)) == [409] * (len(jobs) - len(before))
+
+        after = await tree_levels(user_id)
+        assert after == {tree_id: row.lvl + 1 for tree_id, row in before.items()}
+        spent = sum(calc_cost(row.price, row.lvl) for row in before.values())
+        assert await balance(user_id) == start - spent
+
+        async with AsyncSessionLocal() as db:
+            entries = (await db.execute(
+                select(CoinLedger.delta).where(CoinLedger.user_id == user_id, CoinLedger.reason == "upgrade_tree")
+            )).scalars().all()
+        assert len(entries) == len(before) and -sum(entries) == spent
+
+        async with AsyncSessionLocal() as db:
+            await compact_balances(db)
+        async with AsyncSessionLocal() as db:
+            mirrored = (await db.execute(select(User.coins).where(User.id == user_id))).scalar_one()
+        assert await balance(user_id) == mirrored == start - spent
+
+    run(scenario())
+
+
+def test_concurrent_upgrades_never_overdraw():
+    async def scenario():
+        user_id, before = await setup(0, trees=300, seed=2)
+        costs = sorted(calc_cost(row.price, row.lvl) for row in before.values())
+        start = sum(costs[:100])  # хватает ровно на сотню самых дешевых улучшений
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(CoinLedger), [{"user_id": user_id, "delta": start, "reason": "test"}])
+            await db.commit()
+
+        results = await asyncio.gather(*(call(upgrade_tree, user_id, tree_id) for tree_id in before))
+        after = await tree_levels(user_id)
+
+        assert set(r for r in results if not isinstance(r, dict)) <= {402}
+        # неудачное списание откатывает и уровень
+        upgraded = [tree_id for tree_id, lvl in after.items() if lvl != before[tree_id].lvl]
+        assert len(upgraded) == sum(isinstance(r, dict) for r in results)
+        assert all(after[tree_id] == before[tree_id].lvl + 1 for tree_id in upgraded)
+        spent = sum(calc_cost(before[tree_id].price, before[tree_id].lvl) for tree_id in upgraded)
+        final = await balance(user_id)
+        assert final == start - spent
+        assert final >= 0
+
+    run(scenario())
+
+
+def test_concurrent_buys_never_overdraw():
+    async def scenario():
+        user_id, _ = await setup(0)
+        async with AsyncSessionLocal() as db:
+            tree_type = (await db.execute(select(TreeCatalog).order_by(TreeCatalog.id))).scalars().first()
+            start = tree_type.price * 100 + tree_type.price // 2  # на 100 покупок и остаток
+            await db.execute(insert(CoinLedger), [{"user_id": user_id, "delta": start, "reason": "test"}])
+            await db.commit()
+
+        results = await asyncio.gather(*(call(buy_and_plant_tree, user_id, tree_type.id) for _ in range(300)))
+
+        assert sum(not isinstance(r, int) for r in results) == 100
+        assert sorted(r for r in results if isinstance(r, int)) == [402] * 200
+        assert len(await tree_levels(user_id)) == 100
+        assert await balance(user_id) == start - 100 * tree_type.price
+
+    run(scenario())
@@ -0,0 +1,78 @@
+# tests/test_game_ingest.py
+"""
+Очередь результатов игр (GAME_RESULT_MODE=eventual): пачка, которую не удается записать,
+не останавливает разбор очереди и после нескольких попыток уходит в dead letter.
+"""
+import asyncio
+import json
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from app import game_ingest
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.game_ingest import ATTEMPTS_KEY, BATCHES_KEY, DEAD_KEY, PENDING_KEY, flush_pending
+from app.models.gamesResults import GamesResult
+from app.models.users import User
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+    return asyncio.run(scenario())
+
+
+def item(user_id: int, score: int) -> str:
+    return json.dumps({"ingest_id": uuid.uuid4().hex, "user_id": user_id, "coins": 0,
+                       "title": "game", "score": score, "duration_sec": 10})
+
+
+async def setup() -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        user = User(full_name="Ingest Test", sex="М", email_user="ingest@example.com", hashed_password="-", coins=0)
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def results_count() -> int:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(func.count()).select_from(GamesResult))).scalar_one()
+
+
+def test_failing_batch_does_not_block_queue(monkeypatch):
+    async def scenario():
+        user_id = await setup()
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        # результат, который не влезает ни в одну целочисленную колонку
+        poison = item(user_id, 2 ** 70)
+        await redis.rpush(PENDING_KEY, item(user_id, 5), poison, item(user_id, 7), item(user_id, 9))
+
+        # первая пачка падает, вторая записывается; упавшая ждет повтора
+        assert await flush_pending(redis, AsyncSessionLocal, batch_size=2) == 2
+        assert await redis.llen(PENDING_KEY) == 0
+        assert await redis.zcard(BATCHES_KEY) == 1
+        assert await results_count() == 2
+
+        # повторы сразу, без ожидания GAME_INGEST_STALE_SECONDS
+        monkeypatch.setattr(game_ingest, "GAME_INGEST_STALE_SECONDS", -1)
+        for _ in range(game_ingest.GAME_INGEST_MAX_ATTEMPTS - 2):
+            assert await flush_pending(redis, AsyncSessionLocal, batch_size=2) == 0
+        # последняя попытка: исправные результаты записаны по одному, испорченный - в DEAD_KEY
+        assert await flush_pending(redis, AsyncSessionLocal, batch_size=2) == 1
+
+        assert await results_count() == 3
+        assert await redis.lrange(DEAD_KEY, 0, -1) == [poison]
+        assert await redis.zcard(BATCHES_KEY) == 0
+        assert await redis.hlen(ATTEMPTS_KEY) == 0
+
+    run(scenario())
@@ -0,0 +1,197 @@
+# tests/test_login_guard.py
+"""
+Защита входа: задержка после неудач, блокировка аккаунта в БД и сброс после успешного входа.
+Каждый сценарий проверяется с хранилищем в памяти и с Redis (fakeredis).
+"""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event, select
+
+from app import crud, login_guard
+from app.crud import authenticate_user
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.login_guard import LoginGuard, MemoryFailureStore, RedisFailureStore, backoff_delay, sliding_count
+from app.models.users import User
+
+fakeredis = pytest.importorskip("fakeredis")
+
+EMAIL = "guard@example.com"
+IP = "203.0.113.7"
+
+
+def run(coro):
+    async def scenario():
+        try:
+            return await coro
+        finally:
+            await engine.dispose()
+    return asyncio.run(scenario())
+
+
+def memory_store():
+    return MemoryFailureStore(window=900)
+
+
+def redis_store():
+    return RedisFailureStore(fakeredis.aioredis.FakeRedis(decode_responses=True), window=900)
+
+
+@pytest.fixture(params=[memory_store, redis_store], ids=["memory", "redis"])
+def guard(request, monkeypatch):
+    """Свой LoginGuard вместо общего; пароль проверяется без bcrypt, вызовы считаются"""
+    guard = LoginGuard(request.param())
+    guard.db_reads = 0
+    guard.password_checks = 0
+    get_user_by_email = crud.get_user_by_email
+
+    async def counting_get_user(db, email):
+        guard.db_reads += 1
+        return await get_user_by_email(db, email)
+
+    async def fake_verify(password, hashed_password):
+        guard.password_checks += 1
+        return password == "right"
+
+    monkeypatch.setattr(crud, "get_login_guard", lambda: guard)
+    monkeypatch.setattr(crud, "get_user_by_email", counting_get_user)
+    monkeypatch.setattr(crud, "verify_password", fake_verify)
+    return guard
+
+
+async def setup() -> int:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        user = User(full_name="Guard Test", sex="М", email_user=EMAIL, hashed_password="-", coins=0)
+        db.add(user)
+        await db.commit()
+        return user.id
+
+
+async def login(password: str, ip: str | None = IP):
+    """Результат authenticate_user или код HTTPException"""
+    async with AsyncSessionLocal() as db:
+        try:
+            return await authenticate_user(db, EMAIL, password, ip=ip)
+        except HTTPException as e:
+            return e.status_code, e.headers
+
+
+def test_backoff_doubles_after_free_attempts(monkeypatch):
+    monkeypatch.setattr(login_guard, "LOGIN_BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(login_guard, "LOGIN_BACKOFF_MAX", 10.0)
+    assert [backoff_delay(n, 3) for n in range(1, 9)] == [0, 0, 0, 1, 2, 4, 8, 10]
+    # дробная оценка скользящего окна не дает лишней задержки
+    assert backoff_delay(3.9, 3) == 0
+
+
+def test_sliding_count_weights_previous_window():
+    assert sliding_count(10, 2, 100, now=1000) == 12  # начало окна: предыдущее целиком
+    assert sliding_count(10, 2, 100, now=1075) == pytest.approx(4.5)
+
+
+def test_blocked_attempt_is_rejected_before_db_and_password_check(guard):
+    async def scenario():
+        await setup()
+        await guard.store.block({f"account:{EMAIL}": 30})
+
+        status, headers = await login("right")
+        assert status == 429
+        assert 29 <= int(headers["Retry-After"]) <= 30
+        assert guard.db_reads == 0 and guard.password_checks == 0
+        assert guard.rejected == 1
+
+        # блокировка адреса тоже действует, в том числе на другой аккаунт с него
+        await guard.store.reset([f"account:{EMAIL}"])
+        await guard.store.block({f"ip:{IP}": 30})
+        assert (await login("right"))[0] == 429
+        assert (await login("right", ip="198.51.100.1")) is not False
+        assert guard.db_reads == 1
+
+    run(scenario())
+
+
+def test_lockout_is_written_only_on_transition(guard, monkeypatch):
+    # задержки выключены, чтобы каждая попытка доходила до проверки пароля
+    monkeypatch.setattr(login_guard, "LOGIN_ACCOUNT_FREE_ATTEMPTS", 100)
+    monkeypatch.setattr(login_guard, "LOGIN_LOCKOUT_ATTEMPTS", 3)
+    updates = []
+
+    def count_updates(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE USERS"):
+            updates.append(statement)
+
+    async def scenario():
+        user_id = await setup()
+        event.listen(engine.sync_engine, "before_cursor_execute", count_updates)
+        try:
+            assert await login("wrong") is False
+            assert await login("wrong") is False
+            assert updates == []
+
+            assert await login("wrong") is False
+            assert len(updates) == 1
+            assert guard.lockouts == 1
+
+            # заблокированный аккаунт: пароль не проверяется, строка больше не пишется
+            checks = guard.password_checks
+            assert await login("wrong") is False
+            assert await login("right") is False
+            assert guard.password_checks == checks
+            assert len(updates) == 1 and guard.lockouts == 1
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", count_updates)
+
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(select(User).where(User.id == user_id))).scalar_one()
+            assert user.is_active is False
+            assert user.login_attempts == 3
+
+    run(scenario())
+
+
+def test_success_resets_account_but_not_address(guard):
+    async def scenario():
+        await setup()
+        # две неудачи: обе в пределах бесплатных попыток аккаунта и адреса
+        assert await login("wrong") is False
+        assert await login("wrong") is False
+
+        user = await login("right")
+        assert user is not False and user.email_user == EMAIL
+
+        # счетчик аккаунта сброшен: неудача снова первая; адрес помнит все три
+        account, address = await guard.store.add_failure([f"account:{EMAIL}", f"ip:{IP}"])
+        assert account == pytest.approx(1, abs=0.01)
+        assert address >= 3
+
+    run(scenario())
+
+
+def test_redis_store_fails_open():
+    server = fakeredis.FakeServer()
+    server.connected = False
+    guard = LoginGuard(RedisFailureStore(fakeredis.aioredis.FakeRedis(server=server), window=900))
+
+    async def scenario():
+        assert await guard.retry_after(EMAIL, IP) == 0
+        assert await guard.failure(EMAIL, IP) == 0
+        await guard.success(EMAIL)
+
+    asyncio.run(scenario())
+    assert guard.rejected == 0
+
+
+def test_memory_store_block_expires():
+    store = memory_store()
+
+    async def scenario():
+        await store.block({"account:x": 0.05})
+        assert await store.blocked_for(["account:x"]) > 0
+        await asyncio.sleep(0.06)
+        assert await store.blocked_for(["account:x"]) <= 0
+
+    asyncio.run(scenario())
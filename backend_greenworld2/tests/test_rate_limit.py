@@ -0,0 +1,72 @@
+# tests/test_rate_limit.py
+"""
+Лимиты запросов: несколько экземпляров RedisRateLimiter над одним Redis (fakeredis)
+изображают воркеры; вместе они пропускают ровно лимит, не больше и не меньше.
+"""
+import asyncio
+import random
+
+import pytest
+
+from app.rate_limit import Limit, MemoryRateLimiter, RedisRateLimiter
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def workers(count: int) -> list[RedisRateLimiter]:
+    server = fakeredis.FakeServer()
+    return [RedisRateLimiter(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+            for _ in range(count)]
+
+
+async def allowed_before_first_denial(limiters: list, limit: Limit, requests: int, seed: int = 0) -> tuple[int, int]:
+    """Сколько запросов пропущено до первого 429 и всего; воркер для запроса выбирается случайно"""
+    rnd = random.Random(seed)
+    first_denial = None
+    allowed = 0
+    for _ in range(requests):
+        if await rnd.choice(limiters).hit("user:1", limit) == 0:
+            allowed += 1
+        elif first_denial is None:
+            first_denial = allowed
+    return first_denial, allowed
+
+
+def test_lease_size_bounded_by_refill():
+    assert Limit("50/hour").lease_size(0.1, 5) == 1
+    assert Limit("100/minute").lease_size(0.1, 5) == 8
+    assert Limit("1000/second").lease_size(0.1, 5) == 100
+
+
+def test_slow_limit_is_shared_exactly_across_workers():
+    # 50/hour за пару секунд почти не пополняется: все 50 - и только они - проходят до первого отказа
+    limit = Limit("50/hour")
+    first_denial, allowed = asyncio.run(allowed_before_first_denial(workers(8), limit, 200))
+    assert first_denial == 50
+    assert allowed == 50
+
+
+def test_fast_limit_never_exceeds_total_across_workers():
+    limit = Limit("100/minute")
+    limiters = workers(4)
+    first_denial, allowed = asyncio.run(allowed_before_first_denial(limiters, limit, 1000, seed=3))
+    # токены лежат в пачках воркеров, но общий бакет не отдает больше лимита (плюс пополнение за прогон)
+    assert 100 <= allowed <= 102
+    # до первого отказа в пачках других воркеров застревает не больше пачки на воркер
+    assert first_denial >= 100 - len(limiters) * limit.lease_size(0.1, 5)
+    assert sum(limiter.remote for limiter in limiters) < allowed
+
+
+def test_memory_limiter_refills():
+    limiter = MemoryRateLimiter()
+    limit = Limit("2/second")
+
+    async def scenario():
+        assert await limiter.hit("k", limit) == 0
+        assert await limiter.hit("k", limit) == 0
+        retry = await limiter.hit("k", limit)
+        assert 0 < retry <= 0.5
+        await asyncio.sleep(retry)
+        assert await limiter.hit("k", limit) == 0
+
+    asyncio.run(scenario())